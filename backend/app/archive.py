@@ -0,0 +1,229 @@
+"""Cold storage for old transactions.
+
+With `archive.enabled`, transactions dated before the archive *watermark* are
+moved into a separate SQLite file (`archive.path`) holding the same columns
+and indexes. Ledger entries and rollups never move, so balances, reports and
+goal projections are unchanged. Account rows stay as well: the ledger and the
+rollups reference them.
+
+Reads stay transparent and lazy. A newest-first page is read from the hot
+table first and only completed from the archive when it reaches past the
+watermark (see `extend`). `get` answers single lookups the hot table misses.
+Archived rows are read-only, except that they are purged when their account
+is deleted.
+
+`run` moves rows in three steps:
+1. It publishes the new watermark.
+2. It waits `refresh_seconds` until every worker has re-read it.
+3. It copies rows into the archive and deletes them from the hot table, one
+   chunk per user at a time.
+A crash in between leaves a row in both stores, and readers drop the second
+copy. Archived descriptions leave the search index with their hot rows.
+"""
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+import heapq, logging, pathlib, threading, time
+
+from sqlalchemy import Column, Index, String, Table, create_engine, delete, event, insert, select
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+
+from . import instrumentation, models
+from .config import root_dir, section
+
+logger = logging.getLogger(__name__)
+
+ID_CHUNK = 1000
+
+ArchiveBase = declarative_base()
+
+
+def _copy(table) -> Table:
+    """The hot table's columns and indexes, without its foreign keys and checks."""
+    columns = [Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable) for c in table.columns]
+    copy = Table(table.name, ArchiveBase.metadata, *columns)
+    for index in table.indexes:
+        Index(index.name, *(copy.c[c.name] for c in index.columns))
+    return copy
+
+
+class Transaction(ArchiveBase):
+    __table__ = _copy(models.Transaction.__table__)
+
+
+meta = Table(
+    "archive_meta", ArchiveBase.metadata,
+    Column("key", String, primary_key=True),
+    Column("value", String, nullable=True),
+)
+
+
+@lru_cache(maxsize=1)
+def settings() -> dict:
+    cfg = section("archive")
+    path = pathlib.Path(cfg.get("path", "archive.db"))
+    return {
+        "enabled": bool(cfg.get("enabled", False)),
+        "path": path if path.is_absolute() else root_dir / path,
+        "transaction_age_days": int(cfg.get("transaction_age_days", 730)),
+        "refresh_seconds": float(cfg.get("refresh_seconds", 30)),
+    }
+
+
+def enabled() -> bool:
+    return settings()["enabled"]
+
+
+@lru_cache(maxsize=1)
+def engine():
+    from . import database
+
+    database.init()  # the SQLite PRAGMAs come from the same settings
+    archive_engine = create_engine(f"sqlite:///{settings()['path']}", connect_args={"check_same_thread": False})
+    event.listen(archive_engine, "connect", database._sqlite_pragmas)
+    instrumentation.instrument_engine(archive_engine)
+    ArchiveBase.metadata.create_all(archive_engine)
+    return archive_engine
+
+
+def session() -> Session:
+    return _sessionmaker()()
+
+
+@lru_cache(maxsize=1)
+def _sessionmaker():
+    return sessionmaker(bind=engine(), autoflush=False, expire_on_commit=False)
+
+
+# Watermark
+
+_watermark = (None, float("-inf"))  # (value, monotonic time read)
+_watermark_lock = threading.Lock()
+
+
+def watermark() -> Optional[datetime]:
+    """Transactions dated before this may be archived; re-read every refresh_seconds."""
+    global _watermark
+    if not enabled():
+        return None
+    value, read_at = _watermark
+    if time.monotonic() - read_at < settings()["refresh_seconds"]:
+        return value
+    with _watermark_lock:
+        with engine().connect() as conn:
+            raw = conn.scalar(select(meta.c.value).where(meta.c.key == "watermark"))
+        _watermark = (datetime.fromisoformat(raw) if raw else None, time.monotonic())
+        return _watermark[0]
+
+
+def _publish(cutoff: datetime) -> None:
+    with engine().begin() as conn:
+        conn.execute(delete(meta).where(meta.c.key == "watermark"))
+        conn.execute(insert(meta), [{"key": "watermark", "value": cutoff.isoformat()}])
+
+
+# Reads
+
+def merge(hot: list, cold: list, limit: int) -> list:
+    """Newest-first union of two pages fetched with limit + 1, minus rows both still hold."""
+    seen = {r.id for r in hot}
+    rows = hot + [r for r in cold if r.id not in seen]
+    rows.sort(key=lambda r: (r.date, r.id), reverse=True)
+    return rows[:limit + 1]
+
+
+def extend(rows: list, limit: int, build) -> list:
+    """Complete a newest-first hot page (fetched with limit + 1) from the archive if needed.
+
+    `build(T)` returns the page's query against transaction entity `T`. The
+    archive is only read when the hot page runs out, or ends, below the
+    watermark.
+    """
+    mark = watermark()
+    if mark is None or (len(rows) > limit and rows[-1].date >= mark):
+        return rows
+    with session() as adb:
+        return merge(rows, adb.execute(build(Transaction)).all(), limit)
+
+
+def oldest_first(hot, build, key=lambda r: (r["date"], r["id"])):
+    """Merge an oldest-first stream of hot rows with the archive's, for exports."""
+    if watermark() is None:
+        yield from hot
+        return
+    with session() as adb:
+        cold = (row._asdict() for row in adb.execute(build(Transaction)))
+        last = None
+        for row in heapq.merge(cold, hot, key=key):
+            if row["id"] != last:
+                yield row
+            last = row["id"]
+
+
+def get(tx_id: str) -> Optional[Transaction]:
+    if not enabled():
+        return None
+    with session() as adb:
+        return adb.get(Transaction, tx_id)
+
+
+def existing(tx_ids) -> set:
+    """The ids among `tx_ids` already archived; writes check them as they check the hot table."""
+    ids = list(tx_ids)
+    if not ids or watermark() is None:
+        return set()
+    found = set()
+    with session() as adb:
+        for i in range(0, len(ids), ID_CHUNK):
+            found.update(adb.scalars(select(Transaction.id).where(Transaction.id.in_(ids[i:i + ID_CHUNK]))))
+    return found
+
+
+def account_transaction_ids(account_id: str) -> list:
+    """Ids of the archived transactions touching `account_id`."""
+    if not enabled():
+        return []
+    from . import queries
+
+    with session() as adb:
+        return adb.scalars(queries.transaction_ids_for_account(account_id, Transaction)).all()
+
+
+def forget(tx_ids: list) -> None:
+    """Purge archived transactions (their account was deleted)."""
+    if not tx_ids:
+        return
+    with session() as adb:
+        for i in range(0, len(tx_ids), ID_CHUNK):
+            adb.execute(delete(Transaction).where(Transaction.id.in_(tx_ids[i:i + ID_CHUNK])))
+        adb.commit()
+
+
+# Moving rows
+
+def run(db: Session, cutoff: datetime, chunk_size: int = 1000, grace: float = None) -> int:
+    """Move every hot transaction dated before `cutoff` into the archive; returns the count."""
+    T = models.Transaction
+    t = T.__table__
+    if (watermark() or datetime.min) < cutoff:
+        _publish(cutoff)
+        # Workers re-read the watermark every refresh_seconds; until they all
+        # have, one could still expect these rows in the hot table only
+        time.sleep(settings()["refresh_seconds"] + 1 if grace is None else grace)
+
+    moved = 0
+    for user_id in db.scalars(select(models.User.id)).all():
+        while True:
+            rows = db.execute(
+                select(t).where(T.user_id == user_id, T.date < cutoff).order_by(T.date, T.id).limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            with session() as adb:
+                adb.execute(insert(Transaction.__table__).prefix_with("OR REPLACE"), [r._asdict() for r in rows])
+                adb.commit()
+            db.execute(delete(T).where(T.id.in_([r.id for r in rows])).execution_options(synchronize_session=False))
+            db.commit()
+            moved += len(rows)
+    logger.info("Archived %d transaction(s) dated before %s", moved, cutoff)
+    return moved
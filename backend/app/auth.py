@@ -1,31 +1,64 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.hash import bcrypt
+import time
+
+from .cache import TTLCache
+from .config import section
 
 SECRET_KEY = "CHANGE_ME_SECRET"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 30  # 30 days
 
+# Verified payloads keyed by token signature; the HMAC check runs once per token
+_decoded_tokens = TTLCache(maxsize=4096, ttl=300)
+
+
+def bcrypt_rounds() -> int:
+    return int(section("security").get("bcrypt_rounds", 12))
+
+
+# passlib and jose (with its crypto backends) are imported on first use, not at worker start
+@lru_cache(maxsize=1)
+def _bcrypt():
+    from passlib.hash import bcrypt
+    return bcrypt.using(rounds=bcrypt_rounds())
+
 
 def hash_password(password: str) -> str:
-    return bcrypt.hash(password)
+    return _bcrypt().hash(password)
 
 
 def verify_password(password: str, password_hash: str) -> bool:
-    return bcrypt.verify(password, password_hash)
+    return _bcrypt().verify(password, password_hash)
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """True when the hash was made with a different cost than bcrypt_rounds()."""
+    return _bcrypt().needs_update(password_hash)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
+    from jose import jwt
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
 def decode_access_token(token: str) -> Optional[dict]:
+    signature = token.rpartition(".")[2]
+    cached = _decoded_tokens.get(signature)
+    if cached is not None and cached[0] == token:
+        payload = cached[1]
+        if payload.get("exp", 0) > time.time():
+            return payload
+        _decoded_tokens.pop(signature)
+        return None
+    from jose import JWTError, jwt
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         return None
+    _decoded_tokens.set(signature, (token, payload))
+    return payload
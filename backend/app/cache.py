@@ -0,0 +1,221 @@
+from collections import OrderedDict, defaultdict
+from typing import Optional
+import logging
+import math
+import threading
+import time
+
+from .metrics import Counter
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - only needed for cache.backend: redis
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Thread-safe LRU mapping whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float = None) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SizedLRU:
+    """Thread-safe LRU of byte strings bounded by their total size, with a TTL.
+
+    Each entry may name dependencies; `evict(*deps)` drops every entry that
+    named any of them. `generation` moves with every evict, so a value built
+    while an evict ran can be refused by `set` instead of caching stale data.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, ttl: float = 60.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self.generation = 0
+        self._data = OrderedDict()  # key -> (expires, value, deps)
+        self._deps = defaultdict(set)  # dep -> keys
+        self._lock = threading.Lock()
+        self.hits, self.misses = Counter(), Counter()
+        self.evictions = Counter()      # dropped to stay under max_bytes
+        self.invalidations = Counter()  # dropped by evict()
+
+    def get(self, key) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] < time.monotonic():
+                self._remove(key)
+                item = None
+            if item is not None:
+                self._data.move_to_end(key)
+        (self.misses if item is None else self.hits).inc()
+        return None if item is None else item[1]
+
+    def set(self, key, value: bytes, deps=(), generation: int = None) -> None:
+        if len(value) > self.max_bytes:
+            return
+        dropped = 0
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._remove(key)
+            self._data[key] = (time.monotonic() + self.ttl, value, tuple(deps))
+            self.size += len(value)
+            for dep in deps:
+                self._deps[dep].add(key)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._data)))
+                dropped += 1
+        if dropped:
+            self.evictions.inc(dropped)
+
+    def evict(self, *deps) -> int:
+        with self._lock:
+            self.generation += 1
+            keys = set().union(*(self._deps.pop(dep, ()) for dep in deps))
+            for key in keys:
+                self._remove(key)
+        if keys:
+            self.invalidations.inc(len(keys))
+        return len(keys)
+
+    def _remove(self, key) -> None:
+        item = self._data.pop(key, None)
+        if item is None:
+            return
+        self.size -= len(item[1])
+        for dep in item[2]:
+            keys = self._deps.get(dep)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._deps[dep]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._deps.clear()
+            self.size = 0
+            self.generation += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def snapshot(self) -> dict:
+        return {
+            "backend": "memory",
+            "entries": len(self._data),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits.value,
+            "misses": self.misses.value,
+            "evictions": self.evictions.value,
+            "invalidations": self.invalidations.value,
+        }
+
+
+class RedisCache:
+    """The SizedLRU interface on a Redis-compatible server, shared by every worker.
+
+    Size bounds are the server's (`maxmemory` with an `allkeys-lru` policy);
+    each dependency is a set of the keys that named it. Calls are synchronous,
+    so the server should be local. A server error counts as a miss and is
+    logged, never raised to the request.
+    """
+
+    generation = None  # evicts from other workers cannot be observed here
+
+    def __init__(self, url: str, ttl: float = 60.0, prefix: str = "money-saver:"):
+        if redis is None:
+            raise RuntimeError("cache.backend 'redis' requires the redis package (pip install redis)")
+        self._client = redis.Redis.from_url(url)
+        self.url = url
+        self.ttl = max(1, math.ceil(ttl))
+        self.prefix = prefix
+        self.hits, self.misses = Counter(), Counter()
+        self.invalidations, self.errors = Counter(), Counter()
+
+    def get(self, key) -> Optional[bytes]:
+        try:
+            value = self._client.get(self.prefix + key)
+        except redis.RedisError:
+            self._failed("get")
+            value = None
+        (self.misses if value is None else self.hits).inc()
+        return value
+
+    def set(self, key, value: bytes, deps=(), generation: int = None) -> None:
+        pipe = self._client.pipeline(transaction=False)
+        pipe.set(self.prefix + key, value, ex=self.ttl)
+        for dep in deps:
+            pipe.sadd(f"{self.prefix}dep:{dep}", self.prefix + key)
+            pipe.expire(f"{self.prefix}dep:{dep}", self.ttl)
+        try:
+            pipe.execute()
+        except redis.RedisError:
+            self._failed("set")
+
+    def evict(self, *deps) -> int:
+        dep_keys = [f"{self.prefix}dep:{dep}" for dep in deps]
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for dep_key in dep_keys:
+                pipe.smembers(dep_key)
+            keys = set().union(*pipe.execute())
+            self._client.delete(*keys, *dep_keys)
+        except redis.RedisError:
+            self._failed("evict")
+            return 0
+        if keys:
+            self.invalidations.inc(len(keys))
+        return len(keys)
+
+    def _failed(self, op: str) -> None:
+        self.errors.inc()
+        logger.warning("Redis cache %s failed", op, exc_info=True)
+
+    def snapshot(self) -> dict:
+        return {
+            "backend": "redis",
+            "hits": self.hits.value,
+            "misses": self.misses.value,
+            "invalidations": self.invalidations.value,
+            "errors": self.errors.value,
+        }
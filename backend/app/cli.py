@@ -0,0 +1,130 @@
+"""Maintenance commands: python -m app.cli <command> [options]"""
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+from .database import SessionLocal, init, sync_schema
+from . import archive, importer, ledger, models, recurring, rollups, search
+
+
+def cmd_migrate(args) -> int:
+    sync_schema()
+    print("Schema is up to date")
+    return 0
+
+
+def cmd_rebuild_balances(args) -> int:
+    sync_schema()
+    with SessionLocal() as db:
+        if args.backfill:
+            seeded = ledger.backfill(db)
+            db.commit()
+            print(f"Seeded opening entries for {seeded} account(s)")
+        mismatches = ledger.rebuild(db, fix=args.fix, batch_size=args.batch_size)
+    for account_id, cached, total in mismatches:
+        print(f"{account_id}: cached {cached} != ledger {total}")
+    if not mismatches:
+        print("All balances match the ledger")
+        return 0
+    if args.fix:
+        print(f"Rewrote {len(mismatches)} balance(s) from the ledger")
+        return 0
+    return 1
+
+
+def cmd_rebuild_rollups(args) -> int:
+    sync_schema()
+    with SessionLocal() as db:
+        written = rollups.rebuild(db, batch_size=args.batch_size)
+    print(f"Wrote {written} rollup row(s) from the ledger")
+    return 0
+
+
+def cmd_run_recurring(args) -> int:
+    sync_schema()
+    with SessionLocal() as db:
+        stats = recurring.run_due(db, batch_size=args.batch_size)
+    print(f"Posted {stats['posted']} transaction(s) from {stats['rules']} due rule(s); "
+          f"{stats['duplicates']} already posted, {stats['paused']} rule(s) paused")
+    return 0
+
+
+def cmd_rebuild_search(args) -> int:
+    sync_schema()
+    indexed = search.rebuild(init())
+    print(f"Indexed {indexed} transaction description(s)")
+    return 0
+
+
+def cmd_archive(args) -> int:
+    if not archive.enabled():
+        print("Archiving is disabled (archive.enabled in settings.yaml)", file=sys.stderr)
+        return 2
+    sync_schema()
+    age = args.age_days if args.age_days is not None else archive.settings()["transaction_age_days"]
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    with SessionLocal() as db:
+        moved = archive.run(db, today - timedelta(days=age), chunk_size=args.chunk_size, grace=args.grace)
+    print(f"Archived {moved} transaction(s) older than {age} day(s)")
+    return 0
+
+
+def cmd_import_transactions(args) -> int:
+    sync_schema()
+    with SessionLocal() as db:
+        user = db.query(models.User).filter(models.User.email == args.user).first()
+        if user is None:
+            print(f"No user with email {args.user}", file=sys.stderr)
+            return 2
+        with open(args.file, "r", encoding="utf-8-sig", newline="") as f:
+            result = importer.import_stream(db, user.id, f, args.format, args.account_id, args.chunk_size)
+    print(f"Imported {result.imported}, duplicates {result.duplicates}, rejected {result.rejected}")
+    for err in result.errors:
+        print(f"  row {err.row}: {err.detail}")
+    return 1 if result.rejected else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("migrate", help="create missing tables, columns and indexes (run before starting workers)")
+    p.set_defaults(func=cmd_migrate)
+
+    p = sub.add_parser("rebuild-balances", help="verify (and optionally fix) balances against the ledger")
+    p.add_argument("--fix", action="store_true", help="rewrite mismatched balances from the ledger")
+    p.add_argument("--backfill", action="store_true", help="seed opening entries for accounts that predate the ledger")
+    p.add_argument("--batch-size", type=int, default=1000)
+    p.set_defaults(func=cmd_rebuild_balances)
+
+    p = sub.add_parser("rebuild-rollups", help="recompute the daily/monthly account rollups from the ledger")
+    p.add_argument("--batch-size", type=int, default=1000)
+    p.set_defaults(func=cmd_rebuild_rollups)
+
+    p = sub.add_parser("run-recurring", help="post every recurring transaction that is due (e.g. from cron)")
+    p.add_argument("--batch-size", type=int, default=200)
+    p.set_defaults(func=cmd_run_recurring)
+
+    p = sub.add_parser("rebuild-search", help="refill the transaction search index (SQLite, e.g. after VACUUM)")
+    p.set_defaults(func=cmd_rebuild_search)
+
+    p = sub.add_parser("archive", help="move old transactions into the archive database (e.g. nightly from cron)")
+    p.add_argument("--age-days", type=int, help="archive transactions older than this (default: archive.transaction_age_days)")
+    p.add_argument("--grace", type=float, help="seconds to wait after moving the watermark (default: archive.refresh_seconds + 1)")
+    p.add_argument("--chunk-size", type=int, default=1000)
+    p.set_defaults(func=cmd_archive)
+
+    p = sub.add_parser("import-transactions", help="bulk import a CSV or OFX file for a user")
+    p.add_argument("file")
+    p.add_argument("--user", required=True, help="email of the owning user")
+    p.add_argument("--format", choices=("csv", "ofx"), default="csv")
+    p.add_argument("--account-id", help="target account for OFX statements")
+    p.add_argument("--chunk-size", type=int, default=1000)
+    p.set_defaults(func=cmd_import_transactions)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+from functools import lru_cache
+import os, pathlib
+
+
+root_dir = pathlib.Path(__file__).resolve().parents[1]
+# MONEY_SAVER_SETTINGS points at an alternate settings file (benchmarks, tests, deployments)
+settings_file = pathlib.Path(os.getenv("MONEY_SAVER_SETTINGS", root_dir / "settings.yaml"))
+
+
+@lru_cache(maxsize=1)
+def load_settings() -> dict:
+    if not settings_file.exists():
+        return {}
+    import yaml  # only needed once per process
+
+    with open(settings_file, "r", encoding="utf-8") as f:
+        try:
+            return yaml.safe_load(f) or {}
+        except Exception:
+            return {}
+
+
+def section(name: str) -> dict:
+    return load_settings().get(name) or {}
@@ -1,48 +1,315 @@
-from sqlalchemy import create_engine
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event, exc, inspect, make_url, text
 from sqlalchemy.orm import declarative_base, sessionmaker
-import os, pathlib, yaml
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.schema import CreateColumn
+import logging, os, threading, time
 
+from . import instrumentation, metrics
+from .config import load_settings, section
 
-# Load from settings.yaml if available
-root_dir = pathlib.Path(__file__).resolve().parents[1]
-settings_file = root_dir / "settings.yaml"
-db_url_from_yaml = None
-if settings_file.exists():
-    with open(settings_file, "r", encoding="utf-8") as f:
+logger = logging.getLogger(__name__)
+
+
+# Sync <-> async driver pairs. An async URL (or engine.async in settings.yaml)
+# turns on async mode; the sync engine is kept for the CLI and schema sync.
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "sqlite+pysqlite": "sqlite+aiosqlite", "mssql+pyodbc": "mssql+aioodbc"}
+SYNC_DRIVERS = {"sqlite+aiosqlite": "sqlite", "mssql+aioodbc": "mssql+pyodbc"}
+
+# Filled in by init(): importing this module reads no settings and opens nothing
+DATABASE_URL = None
+ASYNC_MODE = False
+IS_SQLITE = False
+SQLITE_PRAGMAS = {}
+engine = None
+async_engine = None
+AsyncSessionLocal = None
+_init_lock = threading.Lock()
+
+
+def _database_url(data: dict) -> str:
+    """settings.yaml `database_url` or `database:` (SQL Server), else DATABASE_URL."""
+    if "database_url" in data:
+        return data["database_url"]
+    if "database" in data:
+        db_cfg = data["database"] or {}
+        srv = db_cfg.get("server", ".\\SQLEXPRESS")
+        dbname = db_cfg.get("mm_name", "MoneySaver")
+        user = db_cfg.get("user") or ""
+        pwd = db_cfg.get("password") or ""
+        driver = db_cfg.get("driver", "ODBC Driver 17 for SQL Server").replace(" ", "+")
+        if user:
+            return f"mssql+pyodbc://{user}:{pwd}@{srv}/{dbname}?driver={driver}"
+        return f"mssql+pyodbc://@{srv}/{dbname}?driver={driver}&trusted_connection=yes"
+    return os.getenv("DATABASE_URL", "sqlite:///./money_saver.db")
+
+
+class PoolStats:
+    """Counters and checkout wait times for one engine's pool, fed by pool events."""
+
+    def __init__(self):
+        self.wait = metrics.Histogram()
+        self.checkouts = metrics.Counter()
+        self.timeouts = metrics.Counter()
+        self.connects = metrics.Counter()
+        self.closes = metrics.Counter()
+        self.invalidations = metrics.Counter()
+
+
+pool_stats = {"sync": PoolStats(), "async": PoolStats()}
+
+
+class _TimedGet:
+    # Class attribute rather than instance: Pool.recreate() builds a fresh instance on dispose
+    stats: PoolStats
+
+    def _do_get(self):
+        start = time.perf_counter()
         try:
-            data = yaml.safe_load(f) or {}
-            if "database_url" in data:
-                db_url_from_yaml = data["database_url"]
-            elif "database" in data:
-                db_cfg = data["database"] or {}
-                srv = db_cfg.get("server", ".\\SQLEXPRESS")
-                dbname = db_cfg.get("mm_name", "MoneySaver")
-                user = db_cfg.get("user") or ""
-                pwd = db_cfg.get("password") or ""
-                driver = db_cfg.get("driver", "ODBC Driver 17 for SQL Server").replace(" ", "+")
-                if user:
-                    db_url_from_yaml = f"mssql+pyodbc://{user}:{pwd}@{srv}/{dbname}?driver={driver}"
-                else:
-                    db_url_from_yaml = f"mssql+pyodbc://@{srv}/{dbname}?driver={driver}&trusted_connection=yes"
-        except Exception:
-            pass
-
-DATABASE_URL = db_url_from_yaml or os.getenv("DATABASE_URL", "sqlite:///./money_saver.db")
-
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
-)
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts.inc()
+            raise
+        finally:
+            self.stats.wait.observe(time.perf_counter() - start)
+
+
+class TimedQueuePool(_TimedGet, QueuePool):
+    stats = pool_stats["sync"]
+
+
+class TimedAsyncQueuePool(_TimedGet, AsyncAdaptedQueuePool):
+    stats = pool_stats["async"]
+
+
+def _instrument(sync_engine, stats: PoolStats) -> None:
+    event.listen(sync_engine, "checkout", lambda *a: stats.checkouts.inc())
+    event.listen(sync_engine, "connect", lambda *a: stats.connects.inc())
+    event.listen(sync_engine, "close", lambda *a: stats.closes.inc())
+    event.listen(sync_engine, "close_detached", lambda *a: stats.closes.inc())
+    event.listen(sync_engine, "invalidate", lambda *a: stats.invalidations.inc())
+    if IS_SQLITE:
+        event.listen(sync_engine, "connect", _sqlite_pragmas)
+    instrumentation.instrument_engine(sync_engine)
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        if value is not None:
+            cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+class _Sessionmaker(sessionmaker):
+    """Binds itself to the engine on first use, so callers can import it freely."""
+
+    def __call__(self, **local_kw):
+        if engine is None:
+            init()
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _Sessionmaker(autocommit=False, autoflush=False)
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def init():
+    """Read settings and build the engine(s) once; returns the sync engine.
+
+    Run by the app's lifespan hook, and on first use by anything that needs a
+    session before that (CLI, scripts, clients that skip lifespan).
+    """
+    global DATABASE_URL, ASYNC_MODE, IS_SQLITE, SQLITE_PRAGMAS, engine, async_engine, AsyncSessionLocal
+    if engine is not None:
+        return engine
+    with _init_lock:
+        if engine is not None:
+            return engine
+        DATABASE_URL = _database_url(load_settings())
+        engine_cfg = section("engine")
+        url = make_url(DATABASE_URL)
+        ASYNC_MODE = bool(engine_cfg.get("async", False)) or url.drivername in SYNC_DRIVERS
+        sync_url = url.set(drivername=SYNC_DRIVERS.get(url.drivername, url.drivername))
+        IS_SQLITE = sync_url.get_backend_name() == "sqlite"
+        connect_args = {"check_same_thread": False} if IS_SQLITE else {}
+
+        # In-memory SQLite keeps its single-connection pool; everything else is a tunable QueuePool
+        pooled = not (IS_SQLITE and (sync_url.database in (None, "", ":memory:") or "memory" in str(sync_url.query)))
+        pool_args = {
+            "pool_size": int(engine_cfg.get("pool_size", 5)),
+            "max_overflow": int(engine_cfg.get("max_overflow", 10)),
+            "pool_timeout": float(engine_cfg.get("pool_timeout", 30)),
+            "pool_recycle": int(engine_cfg.get("pool_recycle", 1800)),
+            "pool_pre_ping": bool(engine_cfg.get("pool_pre_ping", True)),
+        } if pooled else {}
+
+        SQLITE_PRAGMAS = {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 268435456,
+            "busy_timeout": 5000,
+            **(engine_cfg.get("sqlite") or {}),
+        }
+
+        sync_engine = create_engine(
+            sync_url, connect_args=connect_args, **pool_args, **({"poolclass": TimedQueuePool} if pooled else {})
+        )
+        _instrument(sync_engine, pool_stats["sync"])
+        SessionLocal.configure(bind=sync_engine)
+
+        if ASYNC_MODE:
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+            async_url = url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+            async_engine = create_async_engine(
+                async_url, connect_args=connect_args, **pool_args, **({"poolclass": TimedAsyncQueuePool} if pooled else {})
+            )
+            _instrument(async_engine.sync_engine, pool_stats["async"])
+            # Objects stay loaded after commit; there is no implicit IO to lazy-refresh them
+            AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+        # Last: a non-None engine means everything above is ready
+        engine = sync_engine
+    return engine
+
+
+async def dispose() -> None:
+    """Close pooled connections (lifespan shutdown)."""
+    if async_engine is not None:
+        await async_engine.dispose()
+    if engine is not None:
+        engine.dispose()
+
+
+def pool_status() -> dict:
+    """Live pool occupancy plus cumulative counters for each engine in use."""
+    engines = {"sync": init()}
+    if async_engine is not None:
+        engines["async"] = async_engine.sync_engine
+    report = {}
+    for name, eng in engines.items():
+        pool, stats = eng.pool, pool_stats[name]
+        live = {}
+        if isinstance(pool, QueuePool):
+            live = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+            }
+        report[name] = {
+            "pool": type(pool).__name__,
+            **live,
+            "checkouts": stats.checkouts.value,
+            "timeouts": stats.timeouts.value,
+            "connects": stats.connects.value,
+            "closes": stats.closes.value,
+            "invalidations": stats.invalidations.value,
+            "wait_seconds": stats.wait.snapshot(),
+        }
+    return report
+
+
+class ThreadedSession:
+    """AsyncSession-shaped wrapper that runs a sync Session in the threadpool.
+
+    Lets the async handlers run unchanged on the sync engine: each awaited call
+    borrows a worker thread only for the duration of that statement.
+    """
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    @property
+    def info(self):
+        return self.sync_session.info
+
+    def add(self, obj):
+        self.sync_session.add(obj)
+
+    def add_all(self, objs):
+        self.sync_session.add_all(objs)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def execute(self, statement, params=None, execution_options=None, **kwargs):
+        # Match AsyncSession: rows are fetched before control returns to the loop
+        options = {**(execution_options or {}), "prebuffer_rows": True}
+        return await self.run_sync(
+            lambda s: s.execute(statement, params, execution_options=options, **kwargs)
+        )
+
+    async def scalar(self, statement, params=None, **kwargs):
+        return await self.run_sync(lambda s: s.scalar(statement, params, **kwargs))
+
+    async def scalars(self, statement, params=None, **kwargs):
+        return (await self.execute(statement, params, **kwargs)).scalars()
+
+    async def get(self, entity, ident, **kwargs):
+        return await self.run_sync(lambda s: s.get(entity, ident, **kwargs))
+
+    async def delete(self, obj):
+        await self.run_sync(lambda s: s.delete(obj))
+
+    async def flush(self):
+        await self.run_sync(lambda s: s.flush())
+
+    async def commit(self):
+        await self.run_sync(lambda s: s.commit())
+
+    async def rollback(self):
+        await self.run_sync(lambda s: s.rollback())
+
+    async def refresh(self, obj):
+        await self.run_sync(lambda s: s.refresh(obj))
+
+    async def close(self):
+        await self.run_sync(lambda s: s.close())
+
+
+async def get_db():
+    """Request-scoped session: AsyncSession in async mode, else ThreadedSession."""
+    if engine is None:
+        init()
+    if ASYNC_MODE:
+        async with AsyncSessionLocal() as session:
+            yield session
+    else:
+        session = ThreadedSession(SessionLocal())
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+def sync_schema(bind=None) -> None:
+    """create_all, plus the columns and indexes it skips on tables that already exist.
 
+    New columns must be nullable or carry a server_default to be added this way.
+    """
+    from . import models, search  # models registers the tables on Base.metadata
 
+    bind = bind or init()
+    Base.metadata.create_all(bind=bind)
+    inspector = inspect(bind)
+    add = "ADD" if bind.dialect.name == "mssql" else "ADD COLUMN"
+    unavailable = set()
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable and column.server_default is None:
+                    logger.warning("Cannot add NOT NULL column %s.%s without a server default; migrate it manually",
+                                   table.name, column.name)
+                    unavailable.add(column)
+                    continue
+                ddl = CreateColumn(column).compile(dialect=bind.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} {add} {ddl}"))
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if not unavailable.intersection(index.columns):
+                index.create(bind=bind, checkfirst=True)
+    search.ensure_index(bind)
@@ -1,14 +1,57 @@
-from fastapi import Depends, HTTPException, status
+from dataclasses import dataclass
+from email.utils import format_datetime
+from datetime import timezone
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from .cache import TTLCache
 from .database import get_db
-from . import models, auth
+from . import models, auth, versions
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# Per-process; other workers may serve a stale token_version for up to the TTL
+USER_CACHE_TTL_SECONDS = 60
+_users = TTLCache(maxsize=2048, ttl=USER_CACHE_TTL_SECONDS)
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Detached snapshot of a users row, safe to share across sessions."""
+    id: str
+    first_name: str
+    last_name: str
+    email: str
+    token_version: int
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Caller identity taken from the token's `sub` and `ver` claims."""
+    id: str
+    token_version: int
+
+
+def invalidate_user(user_id: str) -> None:
+    _users.pop(user_id)
+
+
+async def _load_user(user_id: str, db: AsyncSession) -> Optional[CachedUser]:
+    user = _users.get(user_id)
+    if user is None:
+        row = await db.get(models.User, user_id)
+        if row is None:
+            return None
+        user = CachedUser(row.id, row.first_name, row.last_name, row.email, row.token_version or 0)
+        _users.set(user_id, user)
+    return user
+
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> models.User:
+async def _authenticate(token: str, db: AsyncSession) -> CachedUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -20,7 +63,50 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     user_id: str = payload.get("sub")
     if user_id is None:
         raise credentials_exception
-    user = db.query(models.User).get(user_id)
-    if user is None:
+    user = await _load_user(user_id, db)
+    if user is None or user.token_version != payload.get("ver", 0):
         raise credentials_exception
     return user
+
+
+async def get_current_principal(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> Principal:
+    """Token-derived identity; only touches the database on a user-cache miss."""
+    user = await _authenticate(token, db)
+    return Principal(user.id, user.token_version)
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> CachedUser:
+    return await _authenticate(token, db)
+
+
+async def conditional_get(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+) -> int:
+    """ETag/Last-Modified from the user's data version; 304 on a matching If-None-Match.
+
+    Runs before the endpoint, so a 304 costs one primary-key lookup and no
+    list query or serialization. If-Modified-Since alone is not honoured: its
+    one-second resolution could hide a second write within the same second.
+    """
+    U = models.User
+    version, modified = (await db.execute(
+        select(U.data_version, U.data_modified_at).where(U.id == current_user.id)
+    )).one()
+    headers = {
+        "ETag": versions.etag(current_user.id, version or 0),
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization",
+    }
+    if modified is not None:
+        headers["Last-Modified"] = format_datetime(modified.replace(tzinfo=timezone.utc), usegmt=True)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {t.strip() for t in if_none_match.split(",")}
+        # Weak comparison: W/"x" and "x" match
+        if "*" in tags or headers["ETag"] in tags or headers["ETag"][2:] in tags:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return version
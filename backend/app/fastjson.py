@@ -0,0 +1,52 @@
+"""Direct JSON encoding for list endpoints.
+
+Rows selected as plain columns are encoded straight to bytes, skipping the
+response_model validate/serialize round trip FastAPI would otherwise run on
+every row. Uses orjson when installed, else the stdlib encoder; both produce
+the same wire format as the Pydantic schemas (ISO dates, floats, nulls).
+"""
+from datetime import date, datetime
+from decimal import Decimal
+import json
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def dumps(content) -> bytes:
+        # orjson handles datetimes natively; naive ones keep no offset, as Pydantic does
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+else:
+    def dumps(content) -> bytes:
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        # Bytes are already encoded (e.g. served from response_cache)
+        return content if isinstance(content, bytes) else dumps(content)
+
+
+def rows(result) -> list:
+    """Plain dicts from a column-select result, keyed by column label."""
+    return [row._asdict() for row in result]
+
+
+def respond(content, response: Response = None) -> FastJSONResponse:
+    """Encoded response carrying any headers dependencies set on `response` (e.g. ETag)."""
+    return FastJSONResponse(content, headers=response.headers if response is not None else None)
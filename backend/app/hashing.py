@@ -0,0 +1,51 @@
+"""Password hashing off the request threadpool.
+
+bcrypt is deliberately slow, so hashing and verification run on a small
+dedicated thread pool (the bcrypt C code releases the GIL). The pool admits at
+most `hash_workers + hash_queue` jobs; beyond that callers get a 429 instead of
+queueing behind a login storm and starving the rest of the API.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import asyncio
+import threading
+
+from fastapi import HTTPException, status
+
+from . import auth
+from .config import section
+
+
+class HashPool:
+    def __init__(self, workers: int, queue: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(workers + queue)
+
+    async def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many concurrent sign-ins, retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+
+@lru_cache(maxsize=1)
+def pool() -> HashPool:
+    cfg = section("security")
+    return HashPool(workers=int(cfg.get("hash_workers", 2)), queue=int(cfg.get("hash_queue", 32)))
+
+
+async def hash_password(password: str) -> str:
+    return await pool().run(auth.hash_password, password)
+
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    return await pool().run(auth.verify_password, password, password_hash)
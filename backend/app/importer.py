@@ -0,0 +1,189 @@
+"""Streaming CSV/OFX transaction import.
+
+Rows are parsed lazily from a text stream and written in fixed-size chunks:
+one duplicate-id query, one ownership query, one multi-row INSERT and one
+balance update per account for each chunk, then a commit. Re-running an import
+is safe; rows whose id already exists are counted as duplicates.
+"""
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Iterable, Iterator, Optional
+import csv, hashlib, re
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from . import archive, ledger, models, schemas, versions
+
+MAX_REPORTED_ERRORS = 50
+CSV_FIELDS = ("id", "date", "type", "amount", "description", "account_id", "from_account_id", "to_account_id")
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)")
+
+
+class _IdMinter:
+    """Deterministic ids for rows that don't carry one, so re-imports dedupe.
+
+    Identical rows within one file get distinct ids via an occurrence counter.
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.seen = {}
+
+    def __call__(self, *parts) -> str:
+        key = "|".join("" if p is None else str(p) for p in parts)
+        n = self.seen.get(key, 0)
+        self.seen[key] = n + 1
+        return f"{self.prefix}-" + hashlib.sha1(f"{key}|{n}".encode()).hexdigest()[:24]
+
+
+def parse_csv(lines: Iterable[str]) -> Iterator[dict]:
+    """Rows from a CSV with a header naming any of CSV_FIELDS."""
+    mint = _IdMinter("csv")
+    for row in csv.DictReader(lines):
+        row = {k.strip().lower(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k}
+        data = {f: row.get(f) or None for f in CSV_FIELDS}
+        if not data["id"]:
+            data["id"] = mint(*(data[f] for f in CSV_FIELDS[1:]))
+        yield data
+
+
+def _ofx_date(value: str) -> Optional[str]:
+    # OFX dates look like 20240131120000.000[-5:EST]; the time part is optional
+    digits = re.match(r"\d{8}(\d{6})?", value or "")
+    if not digits:
+        return None
+    fmt = "%Y%m%d%H%M%S" if digits.group(1) else "%Y%m%d"
+    return datetime.strptime(digits.group(0), fmt).isoformat()
+
+
+def parse_ofx(lines: Iterable[str], account_id: str) -> Iterator[dict]:
+    """Deposits/withdrawals into `account_id` from OFX <STMTTRN> records.
+
+    Handles both SGML (unclosed tags) and XML flavours, one record at a time.
+    """
+    mint = _IdMinter(f"ofx-{account_id}")
+    current = None
+    for line in lines:
+        for closing, tag, value in _OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                if not closing:
+                    current = {}
+                elif current is not None:
+                    yield _ofx_row(current, account_id, mint)
+                    current = None
+            elif current is not None and not closing:
+                current[tag] = value.strip()
+
+
+def _ofx_row(rec: dict, account_id: str, mint: _IdMinter) -> dict:
+    try:
+        amount = Decimal(rec.get("TRNAMT", ""))
+    except InvalidOperation:
+        amount = None
+    fitid = rec.get("FITID")
+    return {
+        "id": f"ofx-{account_id}-{fitid}" if fitid else mint(*sorted(rec.items())),
+        "date": _ofx_date(rec.get("DTPOSTED", "")),
+        "type": None if amount is None else ("deposit" if amount >= 0 else "withdrawal"),
+        "amount": None if amount is None else str(abs(amount)),
+        "description": rec.get("NAME") or rec.get("MEMO") or rec.get("TRNTYPE") or "Imported",
+        "account_id": account_id,
+    }
+
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[list]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _validate(raw: dict) -> schemas.TransactionCreate:
+    tx = schemas.TransactionCreate(**raw)
+    if tx.type in ('deposit', 'withdrawal') and not tx.account_id:
+        raise ValueError('account_id required for deposit/withdrawal')
+    if tx.type == 'transfer' and not (tx.from_account_id and tx.to_account_id):
+        raise ValueError('from_account_id and to_account_id required for transfer')
+    if tx.date is None:
+        tx.date = datetime.utcnow()
+    elif tx.date.tzinfo is not None:
+        tx.date = tx.date.astimezone(timezone.utc).replace(tzinfo=None)
+    return tx
+
+
+def _referenced_accounts(tx) -> set:
+    return {a for a in (tx.account_id, tx.from_account_id, tx.to_account_id) if a}
+
+
+def import_rows(db: Session, user_id: str, rows: Iterable[dict], chunk_size: int = 1000) -> schemas.ImportResult:
+    result = schemas.ImportResult()
+    T, A = models.Transaction, models.Account
+    row_no = 0
+
+    def reject(n, detail):
+        result.rejected += 1
+        if len(result.errors) < MAX_REPORTED_ERRORS:
+            result.errors.append(schemas.ImportRowError(row=n, detail=detail))
+
+    for chunk in _chunks(rows, chunk_size):
+        valid = []
+        for raw in chunk:
+            row_no += 1
+            try:
+                valid.append((row_no, _validate(raw)))
+            except ValidationError as e:
+                reject(row_no, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+            except ValueError as e:
+                reject(row_no, str(e))
+
+        ids = {tx.id for _, tx in valid}
+        existing = set(db.execute(select(T.id).where(T.id.in_(ids))).scalars()) if ids else set()
+        existing |= archive.existing(ids)
+        account_ids = set().union(*(_referenced_accounts(tx) for _, tx in valid)) if valid else set()
+        owned = dict(
+            db.execute(select(A.id, A.status).where(A.id.in_(account_ids), A.user_id == user_id)).all()
+        ) if account_ids else {}
+
+        batch, seen = [], set()
+        for n, tx in valid:
+            if tx.id in existing or tx.id in seen:
+                result.duplicates += 1
+                continue
+            missing = _referenced_accounts(tx) - owned.keys()
+            if missing:
+                reject(n, f"unknown account {sorted(missing)[0]}")
+                continue
+            deleting = sorted(a for a in _referenced_accounts(tx) if owned[a] == 'deleting')
+            if deleting:
+                reject(n, f"account {deleting[0]} is being deleted")
+                continue
+            seen.add(tx.id)
+            batch.append(tx)
+
+        if batch:
+            version = versions.touch(db, user_id, accounts=set().union(*(_referenced_accounts(tx) for tx in batch)))
+            # Core insert: executemany without per-row ORM bookkeeping
+            db.execute(insert(T.__table__), [{**tx.model_dump(), "user_id": user_id, "version": version} for tx in batch])
+            ledger.post_many(db, user_id, batch)
+            db.commit()
+            result.imported += len(batch)
+    return result
+
+
+def import_stream(db: Session, user_id: str, lines: Iterable[str], fmt: str = "csv",
+                  account_id: Optional[str] = None, chunk_size: int = 1000) -> schemas.ImportResult:
+    if fmt == "ofx":
+        if not account_id:
+            raise ValueError("account_id is required for OFX imports")
+        rows = parse_ofx(lines, account_id)
+    else:
+        rows = parse_csv(lines)
+    return import_rows(db, user_id, rows, chunk_size=chunk_size)
@@ -0,0 +1,276 @@
+"""Per-request timing: query count, DB time, handler and serialization time.
+
+Cursor events on every engine add to the stats of the request they run under
+(a context variable, so threadpool and greenlet hops are followed). Each
+response carries the numbers in a `Server-Timing` header and they are folded
+into per-route histograms served at `/metrics`.
+
+With `profiling.enabled` in settings.yaml, `?profile=1` on any request runs a
+sampling profiler for its duration and writes the stacks in folded format
+(one `frame;frame;frame count` line per stack) for flamegraph.pl/speedscope.
+Only the threads working for that request are sampled; see `Sampler`.
+"""
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from functools import lru_cache, wraps
+from time import perf_counter
+import asyncio, pathlib, sys, threading
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+from . import metrics
+from .config import section
+
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+
+@lru_cache(maxsize=1)
+def profiling() -> dict:
+    """profiling section of settings.yaml, read on the first request."""
+    cfg = section("profiling")
+    return {
+        "enabled": bool(cfg.get("enabled", False)),
+        "interval": float(cfg.get("interval_ms", 1)) / 1000,
+        "output_dir": pathlib.Path(cfg.get("output_dir", "profiles")),
+    }
+
+
+class RequestStats:
+    __slots__ = ("start", "queries", "db", "handler_start", "handler_end", "threads")
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.handler_start = self.handler_end = None
+        self.threads = set()  # threadpool threads running a sync endpoint for the request
+
+    def timings(self, end: float) -> dict:
+        """Seconds per phase; deps covers routing, auth and other dependencies."""
+        total = end - self.start
+        if self.handler_start is None:
+            return {"db": self.db, "total": total}
+        return {
+            "db": self.db,
+            "deps": self.handler_start - self.start,
+            "handler": self.handler_end - self.handler_start,
+            "serialize": end - self.handler_end,
+            "total": total,
+        }
+
+
+_current: ContextVar = ContextVar("request_stats", default=None)
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.phases = {}
+        self.queries = metrics.Histogram(QUERY_BUCKETS)
+
+    def observe(self, timings: dict, queries: int) -> None:
+        for phase, seconds in timings.items():
+            if phase not in self.phases:
+                self.phases[phase] = metrics.Histogram()
+            self.phases[phase].observe(seconds)
+        self.queries.observe(queries)
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.queries.count,
+            "queries": self.queries.snapshot(),
+            **{f"{phase}_seconds": h.snapshot() for phase, h in self.phases.items()},
+        }
+
+
+_routes = {}
+_routes_lock = threading.Lock()
+
+
+def _route_metrics(key: str) -> RouteMetrics:
+    route = _routes.get(key)
+    if route is None:
+        with _routes_lock:
+            route = _routes.setdefault(key, RouteMetrics())
+    return route
+
+
+def snapshot() -> dict:
+    return {key: route.snapshot() for key, route in sorted(_routes.items())}
+
+
+# Engines
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    starts = conn.info.get("query_start")
+    if stats is not None and starts:
+        stats.db += perf_counter() - starts.pop()
+        stats.queries += 1
+
+
+def instrument_engine(sync_engine) -> None:
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# Routes
+
+def _timed(call):
+    if asyncio.iscoroutinefunction(call):
+        @wraps(call)
+        async def endpoint(*args, **kwargs):
+            stats = _current.get()
+            if stats is None:
+                return await call(*args, **kwargs)
+            stats.handler_start = perf_counter()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                stats.handler_end = perf_counter()
+    else:
+        @wraps(call)
+        def endpoint(*args, **kwargs):
+            stats = _current.get()
+            if stats is None:
+                return call(*args, **kwargs)
+            stats.handler_start = perf_counter()
+            ident = threading.get_ident()
+            stats.threads.add(ident)
+            try:
+                return call(*args, **kwargs)
+            finally:
+                stats.threads.discard(ident)
+                stats.handler_end = perf_counter()
+    return endpoint
+
+
+def instrument_routes(app) -> None:
+    """Time the endpoint function of every route registered so far."""
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            # The request handler calls dependant.call, so swapping it is enough
+            route.dependant.call = _timed(route.dependant.call)
+
+
+# Profiler
+
+class Sampler(threading.Thread):
+    """Samples one request's stacks until stopped; counts folded stacks.
+
+    Created on the event loop inside the request's task. The loop thread is
+    sampled only while that task is the one running on it, and threadpool
+    threads only while they run the request's sync endpoint, so concurrent
+    requests stay out of each other's profiles. Sync dependencies and the
+    aiosqlite worker thread are not followed, so their time is missing from
+    the profile.
+    """
+
+    def __init__(self, stats: RequestStats, interval: float = None):
+        super().__init__(daemon=True, name="profile-sampler")
+        self.interval = interval or profiling()["interval"]
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+        self._threads = stats.threads
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._task = asyncio.current_task()
+
+    def _sampled_threads(self) -> list:
+        idents = list(self._threads)
+        if asyncio.current_task(self._loop) is self._task:
+            idents.append(self._loop_thread)
+        return idents
+
+    def run(self) -> None:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in self._sampled_threads():
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({pathlib.Path(code.co_filename).name}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident) or str(ident))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def dump(self, label: str) -> pathlib.Path:
+        output_dir = profiling()["output_dir"]
+        output_dir.mkdir(parents=True, exist_ok=True)
+        safe = "".join(ch if ch.isalnum() else "_" for ch in label).strip("_")
+        path = output_dir / f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{safe}.folded"
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+# Middleware
+
+def _server_timing(timings: dict, queries: int) -> bytes:
+    parts = []
+    for phase, seconds in timings.items():
+        desc = f';desc="{queries} queries"' if phase == "db" else ""
+        parts.append(f"{phase};dur={seconds * 1000:.3f}{desc}")
+    return ", ".join(parts).encode("latin-1")
+
+
+def _wants_profile(scope) -> bool:
+    return profiling()["enabled"] and b"profile=1" in scope.get("query_string", b"").split(b"&")
+
+
+class InstrumentationMiddleware:
+    """Pure ASGI, so the header is added to the response start without buffering the body."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        sampler = None
+        if _wants_profile(scope):
+            sampler = Sampler(stats)
+            sampler.start()
+        result = {}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                end = perf_counter()
+                result["timings"], result["queries"] = stats.timings(end), stats.queries
+                headers = list(message.get("headers", ()))
+                headers.append((b"server-timing", _server_timing(result["timings"], stats.queries)))
+                if sampler is not None:
+                    sampler.stop()
+                    path = sampler.dump(f"{scope['method']} {scope['path']}")
+                    headers.append((b"x-profile", str(path).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if sampler is not None and sampler.is_alive():
+                sampler.stop()
+            if "timings" in result:
+                route = scope.get("route")
+                key = f"{scope['method']} {route.path}" if route is not None else "unmatched"
+                _route_metrics(key).observe(result["timings"], result["queries"])
@@ -0,0 +1,299 @@
+"""Account lifecycle operations as chunked background jobs.
+
+A job row is written (and, for deletes, its accounts marked `deleting`) in the
+request's transaction; the work then runs on a small dedicated thread pool
+with its own sessions, committing after every bounded chunk:
+
+  close/restore  one set-based UPDATE per `chunk_size` accounts
+  delete         per account, `chunk_size` transactions at a time, then its
+                 ledger rows in chunks, its archived transactions, rollups,
+                 rules and the row itself
+
+so no single write transaction holds SQLite's lock for long and the API keeps
+answering in between. Each chunk updates the job's progress, served at
+`GET /jobs/{id}`. Every chunk is safe to repeat, so a job interrupted by a
+shutdown or crash is simply run again: queued jobs on startup, and running
+ones once they stop reporting progress for `stale_seconds`, checked on startup
+and every `sweep_seconds` by `Sweeper`.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
+import asyncio, json, logging, threading, uuid
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from . import archive, models, queries, recurring, versions
+from .config import section
+
+logger = logging.getLogger(__name__)
+
+_stopping = threading.Event()
+_submitted = set()  # ids handed to this process's pool and not yet returned
+
+
+@lru_cache(maxsize=1)
+def settings() -> dict:
+    cfg = section("jobs")
+    return {
+        "workers": int(cfg.get("workers", 1)),
+        "chunk_size": int(cfg.get("chunk_size", 1000)),
+        "stale_seconds": int(cfg.get("stale_seconds", 300)),
+        "sweep_seconds": float(cfg.get("sweep_seconds", 60)),
+    }
+
+
+@lru_cache(maxsize=1)
+def pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=settings()["workers"], thread_name_prefix="jobs")
+
+
+def create(db: Session, user_id: str, kind: str, account_ids: list, reason: str = None) -> models.Job:
+    """Add a queued job for `account_ids` (already checked to be the user's); the caller commits.
+
+    Accounts being deleted leave the active list straight away.
+    """
+    A = models.Account
+    ids = list(dict.fromkeys(account_ids))
+    params = {"account_ids": ids, "reason": reason}
+    if kind == "delete_accounts":
+        # What a failed delete puts the accounts back to
+        params["previous"] = dict(db.execute(select(A.id, A.status).where(A.id.in_(ids))).all())
+    job = models.Job(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        kind=kind,
+        params=json.dumps(params),
+        status="queued",
+        total=len(ids),
+        done=0,
+        rows=0,
+    )
+    db.add(job)
+    if kind == "delete_accounts":
+        versions.touch(db, user_id, accounts=ids)
+        db.execute(
+            update(A).where(A.id.in_(ids)).values(status="deleting").execution_options(synchronize_session=False)
+        )
+    return job
+
+
+def exceeds_chunk(db: Session, account_id: str) -> bool:
+    """Whether deleting the account would take more than one chunk of transactions."""
+    size = settings()["chunk_size"]
+    ids = queries.transaction_ids_for_account(account_id).limit(size + 1).subquery()
+    return db.scalar(select(func.count()).select_from(ids)) > size
+
+
+def start(job_id: str) -> None:
+    _submitted.add(job_id)
+    pool().submit(run, job_id)
+
+
+# Work
+
+def _progress(db: Session, job_id: str, done: int, rows: int) -> None:
+    J = models.Job
+    db.execute(
+        update(J).where(J.id == job_id)
+        .values(done=J.done + done, rows=J.rows + rows, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def _set_status(db: Session, job_id: str, from_status: str, to_status: str, **values) -> bool:
+    J = models.Job
+    now = datetime.utcnow()
+    changed = db.execute(
+        update(J).where(J.id == job_id, J.status == from_status)
+        .values(status=to_status, updated_at=now, **values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return bool(changed)
+
+
+def _set_account_status(db: Session, job_id: str, user_id: str, ids: list, size: int, to_status: str, reason=None) -> bool:
+    A = models.Account
+    from_status = "active" if to_status == "closed" else "closed"
+    # As restore_account does: a restored account carries no closing reason
+    reason = reason if to_status == "closed" else None
+    for i in range(0, len(ids), size):
+        if _stopping.is_set():
+            return False
+        chunk = ids[i:i + size]
+        changed = db.scalars(
+            select(A.id).where(A.id.in_(chunk), A.user_id == user_id, A.status == from_status)
+        ).all()
+        if changed:
+            versions.touch(db, user_id, accounts=changed)
+            db.execute(
+                update(A).where(A.id.in_(changed))
+                .values(status=to_status, closed_reason=reason)
+                .execution_options(synchronize_session=False)
+            )
+        _progress(db, job_id, len(chunk), len(changed))
+    return True
+
+
+def _delete_accounts(db: Session, job_id: str, user_id: str, ids: list, size: int) -> bool:
+    A, T, L = models.Account, models.Transaction, models.LedgerEntry
+    for account_id in ids:
+        if db.scalar(select(A.user_id).where(A.id == account_id)) != user_id:
+            _progress(db, job_id, 1, 0)  # already gone (a repeated chunk) or not the user's
+            continue
+        while True:
+            if _stopping.is_set():
+                return False
+            tx_ids = db.scalars(queries.transaction_ids_for_account(account_id).limit(size)).all()
+            if not tx_ids:
+                break
+            versions.touch(db, user_id, deleted={'transaction': tx_ids})
+            db.execute(delete(T).where(T.id.in_(tx_ids)).execution_options(synchronize_session=False))
+            _progress(db, job_id, 0, len(tx_ids))
+        while True:
+            if _stopping.is_set():
+                return False
+            entry_ids = db.scalars(select(L.id).where(L.account_id == account_id).limit(size)).all()
+            if not entry_ids:
+                break
+            db.execute(delete(L).where(L.id.in_(entry_ids)).execution_options(synchronize_session=False))
+            db.commit()
+        archived = archive.account_transaction_ids(account_id)
+        if archived:
+            versions.touch(db, user_id, deleted={'transaction': archived})
+        R = models.AccountRollup
+        db.execute(delete(R).where(R.account_id == account_id).execution_options(synchronize_session=False))
+        db.execute(
+            delete(models.RecurringRule).where(recurring.references(account_id))
+            .execution_options(synchronize_session=False)
+        )
+        versions.touch(db, user_id, deleted={'account': [account_id]})
+        db.execute(delete(A).where(A.id == account_id).execution_options(synchronize_session=False))
+        _progress(db, job_id, 1, 1 + len(archived))
+        archive.forget(archived)
+    return True
+
+
+def _release(db: Session, user_id: str, previous: dict) -> None:
+    """Give the accounts a failed delete left behind their status from before the job."""
+    A = models.Account
+    left = db.scalars(select(A.id).where(A.id.in_(list(previous)), A.status == "deleting")).all()
+    if left:
+        versions.touch(db, user_id, accounts=left)
+        for account_id in left:
+            db.execute(
+                update(A).where(A.id == account_id).values(status=previous[account_id])
+                .execution_options(synchronize_session=False)
+            )
+    db.commit()
+
+
+def run(job_id: str) -> None:
+    """Claim a queued job and work through it; puts it back in the queue if stopped midway."""
+    try:
+        _run(job_id)
+    finally:
+        _submitted.discard(job_id)
+
+
+def _run(job_id: str) -> None:
+    from .database import SessionLocal
+
+    with SessionLocal() as db:
+        # done restarts with every run: repeated chunks are counted again, not twice
+        if not _set_status(db, job_id, "queued", "running", started_at=datetime.utcnow(), done=0):
+            return  # another worker has it
+        J = models.Job
+        user_id, kind, params = db.execute(select(J.user_id, J.kind, J.params).where(J.id == job_id)).one()
+        params = json.loads(params)
+        ids, size = params["account_ids"], settings()["chunk_size"]
+        try:
+            if kind == "delete_accounts":
+                finished = _delete_accounts(db, job_id, user_id, ids, size)
+            else:
+                to_status = "closed" if kind == "close_accounts" else "active"
+                finished = _set_account_status(db, job_id, user_id, ids, size, to_status, params.get("reason"))
+        except Exception as exc:
+            db.rollback()
+            logger.exception("Job %s failed", job_id)
+            if kind == "delete_accounts":
+                # Accounts already removed stay removed; the rest can be used, or deleted, again
+                _release(db, user_id, params.get("previous") or dict.fromkeys(ids, "active"))
+            _set_status(db, job_id, "running", "failed", error=str(exc)[:500], finished_at=datetime.utcnow())
+            return
+        if finished:
+            _set_status(db, job_id, "running", "succeeded", finished_at=datetime.utcnow())
+        else:
+            _set_status(db, job_id, "running", "queued")
+
+
+def sweep() -> int:
+    """Queue again the running jobs that stopped reporting progress, and start every queued
+    job this process does not already have; returns how many were started.
+    """
+    from .database import SessionLocal
+
+    J = models.Job
+    stale = datetime.utcnow() - timedelta(seconds=settings()["stale_seconds"])
+    mine = J.id.not_in(list(_submitted))
+    with SessionLocal() as db:
+        db.execute(
+            update(J).where(J.status == "running", J.updated_at < stale, mine)
+            .values(status="queued", updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        ids = db.scalars(select(J.id).where(J.status == "queued", mine).order_by(J.created_at)).all()
+    for job_id in ids:
+        start(job_id)
+    return len(ids)
+
+
+def resume() -> int:
+    """Queue again the jobs a previous process left behind and start them; returns how many."""
+    _stopping.clear()
+    return sweep()
+
+
+class Sweeper:
+    """Calls `sweep` on a worker thread every `interval` seconds, so a job orphaned by a
+    crashed worker is picked up without waiting for the next restart.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._loop(), name="jobs-sweeper")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            # resume() has just swept on startup
+            await asyncio.sleep(self.interval)
+            try:
+                started = await run_in_threadpool(sweep)
+                if started:
+                    logger.info("Job sweep started %d job(s)", started)
+            except Exception:
+                logger.exception("Job sweep failed")
+
+
+def shutdown() -> None:
+    """Stop after the current chunk; unfinished jobs go back to the queue."""
+    _stopping.set()
+    pool().shutdown(wait=True)
+    pool.cache_clear()
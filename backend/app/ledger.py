@@ -0,0 +1,234 @@
+"""Append-only double-entry ledger.
+
+Every balance change is written as one ledger row per leg (transfers write two),
+and `Account.balance` is a materialized cache of the sum of those rows. Balances
+are only ever moved with `UPDATE ... SET balance = balance + :delta`, so
+concurrent posts to the same account cannot lose updates. The daily/monthly
+rollups in `rollups` are updated from the same rows in the same transaction.
+"""
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import case, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from . import models, response_cache, rollups, versions
+
+CENT = Decimal('0.01')
+
+
+def legs(tx):
+    """(account_id, kind, signed amount) for each balance leg of a transaction."""
+    amt = Decimal(str(tx.amount))
+    if tx.type == 'deposit' and tx.account_id:
+        return [(tx.account_id, 'deposit', amt)]
+    if tx.type == 'withdrawal' and tx.account_id:
+        return [(tx.account_id, 'withdrawal', -amt)]
+    if tx.type == 'transfer' and tx.from_account_id and tx.to_account_id:
+        return [(tx.from_account_id, 'transfer_out', -amt), (tx.to_account_id, 'transfer_in', amt)]
+    return []
+
+
+def _entry(account_id, user_id, kind, amount, effective_date, transaction_id=None):
+    return {
+        "account_id": account_id,
+        "user_id": user_id,
+        "transaction_id": transaction_id,
+        "kind": kind,
+        "amount": amount,
+        "effective_date": effective_date,
+        "posted_at": datetime.utcnow(),
+    }
+
+
+def _insert(db: Session, entries) -> None:
+    db.execute(insert(models.LedgerEntry.__table__), entries)
+    rollups.apply(db, entries)
+    response_cache.stale(db, accounts={e["account_id"] for e in entries})
+
+
+def _backdate_openings(db: Session, entries) -> None:
+    """Move opening entries back to the earliest new transaction leg before them.
+
+    An account's opening balance is dated when the account was created (or
+    backfilled). A transaction backdated past that would otherwise leave the
+    opening amount out of every balance before it, in the rollups and reports.
+    """
+    earliest = {}
+    for e in entries:
+        if e["kind"] != "opening":
+            account_id = e["account_id"]
+            earliest[account_id] = min(earliest.get(account_id, e["effective_date"]), e["effective_date"])
+    if not earliest:
+        return
+    L = models.LedgerEntry
+    moved = [
+        row for row in db.execute(
+            select(L.id, L.account_id, L.user_id, L.amount, L.effective_date)
+            .where(L.account_id.in_(list(earliest)), L.kind == "opening")
+        )
+        if row.effective_date > earliest[row.account_id]
+    ]
+    shifts = []
+    for row in moved:
+        when = earliest[row.account_id]
+        db.execute(
+            update(L).where(L.id == row.id).values(effective_date=when).execution_options(synchronize_session=False)
+        )
+        shifts.append(_entry(row.account_id, row.user_id, "opening", -row.amount, row.effective_date))
+        shifts.append(_entry(row.account_id, row.user_id, "opening", row.amount, when))
+    if shifts:
+        rollups.apply(db, shifts)
+
+
+def append(db: Session, entries, **values) -> dict:
+    """Insert ledger rows and apply their net effect to the cached balances.
+
+    Returns the per-account deltas that were applied.
+    """
+    if not entries:
+        return {}
+    _insert(db, entries)
+    deltas = defaultdict(Decimal)
+    for e in entries:
+        deltas[e["account_id"]] += e["amount"]
+    apply_deltas(db, deltas, **values)
+    return deltas
+
+
+def apply_deltas(db: Session, deltas: dict, **values) -> None:
+    """One atomic increment per account; extra `values` are set alongside."""
+    A = models.Account
+    for account_id, delta in deltas.items():
+        db.execute(
+            update(A)
+            .where(A.id == account_id)
+            .values(balance=A.balance + delta, **values)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def post(db: Session, tx, **values) -> dict:
+    entries = [_entry(acc, tx.user_id, kind, amt, tx.date, tx.id) for acc, kind, amt in legs(tx)]
+    deltas = append(db, entries, last_tx_date=tx.date, **values)
+    _backdate_openings(db, entries)
+    return deltas
+
+
+def post_many(db: Session, user_id: str, txs) -> dict:
+    """Post a batch of transactions with a single balance update per account.
+
+    `last_tx_date` only moves forward, since a batch may be older than the
+    account's existing history.
+    """
+    A = models.Account
+    entries, latest = [], {}
+    for tx in txs:
+        for acc, kind, amt in legs(tx):
+            entries.append(_entry(acc, user_id, kind, amt, tx.date, tx.id))
+            if acc not in latest or tx.date > latest[acc]:
+                latest[acc] = tx.date
+    if not entries:
+        return {}
+    _insert(db, entries)
+    _backdate_openings(db, entries)
+    deltas = defaultdict(Decimal)
+    for e in entries:
+        deltas[e["account_id"]] += e["amount"]
+    for account_id, delta in deltas.items():
+        newest = latest[account_id]
+        db.execute(
+            update(A)
+            .where(A.id == account_id)
+            .values(
+                balance=A.balance + delta,
+                last_tx_date=case(
+                    (or_(A.last_tx_date.is_(None), A.last_tx_date < newest), newest),
+                    else_=A.last_tx_date,
+                ),
+            )
+            .execution_options(synchronize_session=False)
+        )
+    return deltas
+
+
+def reverse(db: Session, tx, **values) -> dict:
+    """Append compensating legs for a transaction that is being removed."""
+    entries = [_entry(acc, tx.user_id, kind, -amt, tx.date, tx.id) for acc, kind, amt in legs(tx)]
+    return append(db, entries, **values)
+
+
+def open_account(db: Session, account) -> None:
+    """Record the starting balance of a newly inserted account.
+
+    The account row already carries the balance, so no increment is applied.
+    """
+    if account.balance:
+        _insert(db, [_entry(account.id, account.user_id, 'opening', Decimal(str(account.balance)), datetime.utcnow())])
+
+
+def adjust(db: Session, account, new_balance) -> None:
+    """Move an account to `new_balance` through an adjustment entry."""
+    delta = Decimal(str(new_balance)) - Decimal(str(account.balance or 0))
+    if delta:
+        append(db, [_entry(account.id, account.user_id, 'adjustment', delta, datetime.utcnow())])
+
+
+def backfill(db: Session) -> int:
+    """Seed an opening entry for accounts that predate the ledger.
+
+    The current balance already includes their earlier transactions, so it
+    becomes the opening amount. Returns the number of accounts seeded.
+    """
+    A, L, T = models.Account, models.LedgerEntry, models.Transaction
+    has_entries = select(L.id).where(L.account_id == A.id).exists()
+    rows = db.execute(select(A.id, A.user_id, A.balance).where(~has_entries)).all()
+    # Dated at the account's first transaction, so balances from then on include it
+    first = {}
+    for column in (T.account_id, T.from_account_id, T.to_account_id):
+        for account_id, when in db.execute(
+            select(column, func.min(T.date)).where(column.in_(select(A.id).where(~has_entries))).group_by(column)
+        ):
+            first[account_id] = min(first.get(account_id, when), when)
+    now = datetime.utcnow()
+    entries = [_entry(r.id, r.user_id, 'opening', Decimal(str(r.balance or 0)), first.get(r.id, now)) for r in rows]
+    if entries:
+        _insert(db, entries)
+    return len(entries)
+
+
+def rebuild(db: Session, fix: bool = False, batch_size: int = 1000):
+    """Compare every cached balance with its ledger sum in one streaming pass.
+
+    Returns a list of (account_id, cached, ledger) mismatches; with `fix` the
+    cached balances are rewritten from the ledger.
+    """
+    A, L = models.Account, models.LedgerEntry
+    sums = select(L.account_id, func.sum(L.amount).label("total")).group_by(L.account_id).subquery()
+    stmt = (
+        select(A.id, A.balance, func.coalesce(sums.c.total, 0))
+        .outerjoin(sums, sums.c.account_id == A.id)
+        .execution_options(yield_per=batch_size)
+    )
+    mismatches = []
+    for account_id, cached, total in db.execute(stmt):
+        # SQLite sums NUMERIC as floating point; compare at cent precision
+        cached = Decimal(str(cached or 0)).quantize(CENT)
+        total = Decimal(str(total)).quantize(CENT)
+        if cached != total:
+            mismatches.append((account_id, cached, total))
+    if fix:
+        for start in range(0, len(mismatches), batch_size):
+            chunk = mismatches[start:start + batch_size]
+            db.execute(
+                update(A).execution_options(synchronize_session=False),
+                [{"id": account_id, "balance": total} for account_id, _, total in chunk],
+            )
+            owners = defaultdict(list)
+            for account_id, user_id in db.execute(select(A.id, A.user_id).where(A.id.in_([m[0] for m in chunk]))):
+                owners[user_id].append(account_id)
+            for user_id, account_ids in owners.items():
+                versions.touch(db, user_id, accounts=account_ids)
+        db.commit()
+    return mismatches
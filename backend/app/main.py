@@ -1,12 +1,38 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import text
+import time
 
-from .database import Base, engine
-from .routers import accounts, transactions, auth as auth_router
+from . import database, instrumentation, jobs, recurring, response_cache
+from .config import section
+from .database import get_db, pool_status, sync_schema
+from .routers import accounts, batch, dashboard, goals, jobs as jobs_router, reports, sync, transactions, auth as auth_router, recurring as recurring_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Settings and engine load here rather than at import; DDL only when asked for
+    database.init()
+    if section("startup").get("migrate", True):
+        await run_in_threadpool(sync_schema)
+    await run_in_threadpool(jobs.resume)
+    sweeper = jobs.Sweeper(jobs.settings()["sweep_seconds"])
+    sweeper.start()
+    scheduler = recurring.scheduler()
+    if scheduler is not None:
+        scheduler.start()
+    yield
+    if scheduler is not None:
+        await scheduler.stop()
+    await sweeper.stop()
+    await run_in_threadpool(jobs.shutdown)
+    await database.dispose()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Money Saver API", version="0.1.0")
+    app = FastAPI(title="Money Saver API", version="0.1.0", lifespan=lifespan)
 
     # CORS (adjust origins as needed)
     app.add_middleware(
@@ -15,20 +41,44 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"]
         ,
-        allow_headers=["*"]
+        allow_headers=["*"],
+        expose_headers=["ETag", "Last-Modified", "Server-Timing"],
     )
-
-    # Create tables on startup if they don't exist
-    Base.metadata.create_all(bind=engine)
+    # Inside CORS: per-request query count and phase timings
+    app.add_middleware(instrumentation.InstrumentationMiddleware)
 
     app.include_router(auth_router.router)
     app.include_router(accounts.router, prefix="/accounts", tags=["accounts"])
     app.include_router(transactions.router, prefix="/transactions", tags=["transactions"])
+    app.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"])
+    app.include_router(goals.router, prefix="/goals", tags=["goals"])
+    app.include_router(recurring_router.router, prefix="/recurring", tags=["recurring"])
+    app.include_router(reports.router, prefix="/reports", tags=["reports"])
+    app.include_router(sync.router, prefix="/sync", tags=["sync"])
+    app.include_router(batch.router, prefix="/batch", tags=["batch"])
+    app.include_router(jobs_router.router, prefix="/jobs", tags=["jobs"])
 
     @app.get("/health")
     def health() -> dict:
         return {"status": "ok"}
 
+    @app.get("/health/db")
+    async def health_db(db=Depends(get_db)) -> dict:
+        """Round-trip a trivial query and report connection pool telemetry."""
+        start = time.perf_counter()
+        await db.execute(text("SELECT 1"))
+        return {
+            "status": "ok",
+            "ping_ms": round((time.perf_counter() - start) * 1000, 3),
+            "pools": pool_status(),
+        }
+
+    @app.get("/metrics")
+    def metrics() -> dict:
+        """Per-route latency/query histograms since startup, plus pool and response cache telemetry."""
+        return {"routes": instrumentation.snapshot(), "pools": pool_status(), "cache": response_cache.snapshot()}
+
+    instrumentation.instrument_routes(app)
     return app
 
 
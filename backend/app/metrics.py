@@ -0,0 +1,70 @@
+"""In-process counters and histograms, cheap enough to update on every event."""
+from bisect import bisect_left
+import threading
+
+# Seconds; the last bucket is +Inf
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation (0 when empty).
+
+        inf when it is past the last bound; `snapshot` reports that as "+Inf",
+        since JSON has no infinity.
+        """
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.bounds + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        cumulative, buckets = 0, {}
+        for bound, n in zip(self.bounds + (float("inf"),), self.counts):
+            cumulative += n
+            buckets[_label(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "p50": _json_bound(self.quantile(0.5)),
+            "p95": _json_bound(self.quantile(0.95)),
+            "p99": _json_bound(self.quantile(0.99)),
+            "buckets": buckets,
+        }
+
+
+def _label(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else str(bound)
+
+
+def _json_bound(bound: float):
+    """A quantile as JSON can carry it: the number, or "+Inf" past the last bucket."""
+    return "+Inf" if bound == float("inf") else bound
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n: int = 1) -> None:
+        with self._lock:
+            self.value += n
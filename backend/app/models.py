@@ -1,10 +1,9 @@
-from sqlalchemy import Column, Date, DateTime, Enum, ForeignKey, Integer, Numeric, String, CheckConstraint
+from sqlalchemy import Column, Date, DateTime, Enum, ForeignKey, Index, Integer, Numeric, String, CheckConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
-from passlib.hash import bcrypt
-
 from .database import Base
+from . import auth
 
 
 class Account(Base):
@@ -22,6 +21,8 @@ class Account(Base):
     goal_frequency = Column(String, nullable=True)  # daily, weekly, monthly
     last_tx_date = Column(DateTime, nullable=True)
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    # users.data_version of the write that last touched this row (delta sync)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Only link transactions where this account_id matches the Transaction.account_id (deposits/withdrawals)
     transactions = relationship(
@@ -32,6 +33,11 @@ class Account(Base):
         foreign_keys="Transaction.account_id",
     )
 
+    __table_args__ = (
+        Index("ix_accounts_user_status", "user_id", "status"),
+        Index("ix_accounts_user_version", "user_id", "version"),
+    )
+
 
 class Transaction(Base):
     __tablename__ = "transactions"
@@ -47,6 +53,7 @@ class Transaction(Base):
     to_account_id = Column(String, ForeignKey("accounts.id"), nullable=True)
     # Owner of this transaction
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
 
     account = relationship("Account", foreign_keys=[account_id], back_populates="transactions")
     from_account = relationship("Account", foreign_keys=[from_account_id])
@@ -55,6 +62,124 @@ class Transaction(Base):
     __table_args__ = (
         CheckConstraint("(type in ('deposit','withdrawal') and account_id is not null) or (type = 'transfer' and from_account_id is not null and to_account_id is not null)",
                         name="transactions_type_accounts_check"),
+        # Keyset pagination: every listing page is a single seek on (user_id, date, id)
+        Index("ix_transactions_user_date_id", "user_id", "date", "id"),
+        Index("ix_transactions_user_type_date_id", "user_id", "type", "date", "id"),
+        # One index per account column; "touching account X" is a UNION of three seeks
+        Index("ix_transactions_account_date_id", "account_id", "date", "id"),
+        Index("ix_transactions_from_account_date_id", "from_account_id", "date", "id"),
+        Index("ix_transactions_to_account_date_id", "to_account_id", "date", "id"),
+        Index("ix_transactions_user_version_id", "user_id", "version", "id"),
+    )
+
+
+class RecurringRule(Base):
+    """A transaction posted on a cadence by the scheduler in `recurring`."""
+    __tablename__ = "recurring_rules"
+
+    id = Column(String, primary_key=True, index=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    type = Column(String, nullable=False)  # deposit | withdrawal | transfer
+    amount = Column(Numeric(12, 2), nullable=False)
+    description = Column(String, nullable=False)
+    account_id = Column(String, ForeignKey("accounts.id"), nullable=True)
+    from_account_id = Column(String, ForeignKey("accounts.id"), nullable=True)
+    to_account_id = Column(String, ForeignKey("accounts.id"), nullable=True)
+    cadence = Column(String, nullable=False)  # daily | weekly | monthly
+    start_date = Column(DateTime, nullable=False)  # first occurrence; later ones are counted from it
+    end_date = Column(DateTime, nullable=True)
+    # Occurrences posted so far; the next one falls on next_run
+    runs = Column(Integer, nullable=False, default=0, server_default="0")
+    next_run = Column(DateTime, nullable=True)
+    status = Column(String, nullable=False, default="active")  # active | paused | finished
+    paused_reason = Column(String, nullable=True)
+
+    __table_args__ = (
+        # The scheduler's only lookup: active rules with next_run <= now
+        Index("ix_recurring_rules_status_next_run", "status", "next_run"),
+        Index("ix_recurring_rules_user_id", "user_id"),
+    )
+
+
+class LedgerEntry(Base):
+    """One balance leg; Account.balance is the materialized sum of these rows."""
+    __tablename__ = "ledger_entries"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    account_id = Column(String, ForeignKey("accounts.id"), nullable=False)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    # Not a foreign key: entries outlive the transactions they record
+    transaction_id = Column(String, nullable=True)
+    kind = Column(String, nullable=False)  # opening | adjustment | deposit | withdrawal | transfer_in | transfer_out
+    amount = Column(Numeric(12, 2), nullable=False)  # signed effect on the account balance
+    effective_date = Column(DateTime, nullable=False)
+    posted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_ledger_entries_account_id_id", "account_id", "id"),
+        # Finds an account's opening entry, to move it back before backdated legs
+        Index("ix_ledger_entries_account_kind", "account_id", "kind"),
+    )
+
+
+class AccountRollup(Base):
+    """Per-account flows and closing balance for one day or month, kept by the ledger."""
+    __tablename__ = "account_rollups"
+
+    account_id = Column(String, ForeignKey("accounts.id"), primary_key=True)
+    period = Column(String, primary_key=True)  # day | month
+    period_start = Column(Date, primary_key=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    deposits = Column(Numeric(14, 2), nullable=False, default=0)
+    withdrawals = Column(Numeric(14, 2), nullable=False, default=0)
+    transfers_in = Column(Numeric(14, 2), nullable=False, default=0)
+    transfers_out = Column(Numeric(14, 2), nullable=False, default=0)
+    adjustments = Column(Numeric(14, 2), nullable=False, default=0)  # opening balances and manual edits
+    closing_balance = Column(Numeric(14, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_account_rollups_user_period_start", "user_id", "period", "period_start"),
+    )
+
+
+class Tombstone(Base):
+    """Deleted account/transaction ids, kept so delta sync can propagate deletes."""
+    __tablename__ = "tombstones"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    entity = Column(String, nullable=False)  # account | transaction
+    entity_id = Column(String, nullable=False)
+    version = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_tombstones_user_version", "user_id", "version"),
+    )
+
+
+class Job(Base):
+    """A chunked background operation over many rows, run by `jobs`."""
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True, index=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    kind = Column(String, nullable=False)  # close_accounts | restore_accounts | delete_accounts
+    params = Column(String, nullable=False)  # JSON: account_ids, reason
+    status = Column(String, nullable=False, default="queued")  # queued | running | succeeded | failed
+    total = Column(Integer, nullable=False, default=0)  # accounts to process
+    done = Column(Integer, nullable=False, default=0)   # accounts processed
+    rows = Column(Integer, nullable=False, default=0)   # rows changed or removed so far
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    # Bumped after every chunk; a running job that stops updating is picked up again
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_status_updated_at", "status", "updated_at"),
+        Index("ix_jobs_user_created_at", "user_id", "created_at"),
     )
 
 
@@ -66,13 +191,18 @@ class User(Base):
     last_name = Column(String, nullable=False)
     email = Column(String, unique=True, nullable=False, index=True)
     password_hash = Column(String, nullable=False)
+    # Bumped to revoke every token issued before a password change
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped by every write to the user's accounts/transactions; drives ETags
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
+    data_modified_at = Column(DateTime, nullable=True)
 
     accounts = relationship("Account", backref="user")
 
     def set_password(self, password: str):
-        self.password_hash = bcrypt.hash(password)
+        self.password_hash = auth.hash_password(password)
 
     def verify_password(self, password: str) -> bool:
-        return bcrypt.verify(password, self.password_hash)
+        return auth.verify_password(password, self.password_hash)
 
 
@@ -0,0 +1,87 @@
+from datetime import datetime
+import base64, json
+
+from fastapi import HTTPException
+from sqlalchemy import Float, and_, cast, func, or_, select, union, union_all
+from sqlalchemy.orm import aliased
+
+from . import models, schemas
+
+# Wire order of the response schemas, for the plain-column fast path
+TRANSACTION_FIELDS = tuple(schemas.Transaction.model_fields)
+ACCOUNT_FIELDS = tuple(schemas.Account.model_fields)
+_MONEY = {"amount", "balance", "goal_amount"}
+
+
+# Each column has its own (column, date, id) index, so "touching account X" is
+# answered as a UNION of three index seeks instead of an OR-filtered scan.
+def _account_columns(T=None):
+    T = T or models.Transaction
+    return (T.account_id, T.from_account_id, T.to_account_id)
+
+
+def columns(entity, fields):
+    """Labelled columns for `fields`; money is CAST to FLOAT, skipping the Decimal round trip."""
+    return [
+        cast(getattr(entity, f), Float).label(f) if f in _MONEY else getattr(entity, f).label(f)
+        for f in fields
+    ]
+
+
+def encode_cursor(tx) -> str:
+    raw = json.dumps([tx.date.isoformat(), tx.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        date_str, tx_id = json.loads(raw)
+        return datetime.fromisoformat(date_str), tx_id
+    except Exception:
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+
+
+def before_cursor(cursor: str, T=None):
+    """Keyset predicate for rows after `cursor` in (date desc, id desc) order."""
+    T = T or models.Transaction
+    c_date, c_id = decode_cursor(cursor)
+    # Expanded row-value comparison; MSSQL has no (a, b) < (x, y)
+    return or_(T.date < c_date, and_(T.date == c_date, T.id < c_id))
+
+
+def transaction_ids_for_account(account_id: str, T=None):
+    """Selectable of ids of every transaction referencing `account_id`."""
+    T = T or models.Transaction
+    return union(*(select(T.id).where(col == account_id) for col in _account_columns(T)))
+
+
+def account_transactions_page(account_id: str, *criteria, limit: int, T=None):
+    """Newest-first page of transactions touching `account_id`, as plain columns.
+
+    Every branch is ordered and limited on its own index, so the outer sort only
+    sees at most 3 * limit rows regardless of the account's history. `T` is the
+    transaction entity to read (the archive's has the same columns and indexes).
+    """
+    T = T or models.Transaction
+    branches = [
+        select(
+            select(T)
+            .where(col == account_id, *criteria)
+            .order_by(T.date.desc(), T.id.desc())
+            .limit(limit)
+            .subquery()
+        )
+        for col in _account_columns(T)
+    ]
+    tx = aliased(T, union(*branches).subquery())
+    return select(*columns(tx, TRANSACTION_FIELDS)).order_by(tx.date.desc(), tx.id.desc()).limit(limit)
+
+
+def latest_transaction_date(account_id: str):
+    """Scalar select of the newest transaction date touching `account_id`."""
+    T = models.Transaction
+    per_column = union_all(
+        *(select(func.max(T.date).label("date")).where(col == account_id) for col in _account_columns())
+    ).subquery()
+    return select(func.max(per_column.c.date))
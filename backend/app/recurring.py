@@ -0,0 +1,203 @@
+"""Recurring transactions.
+
+Occurrence n of a rule falls on start_date + n periods (monthly rules keep the
+start day, clamped to short months) and is always posted as transaction
+`rr-<rule id>-<n>`. Posting an occurrence twice is a primary key hit rather
+than a double post, whichever worker or retry gets there first.
+
+`run_due` posts everything that is due, catch-up after downtime included, in
+bulk. Per batch of rules it issues:
+- one indexed query on (status, next_run) to pick the due rules;
+- one query for the occurrence ids that already exist;
+- one query for the referenced accounts;
+- per user, one version bump, one multi-row INSERT and the ledger's single
+  balance UPDATE per account;
+- one executemany that advances the rules.
+`Scheduler` runs it on an interval from the app's lifespan.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+import asyncio, calendar, logging
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import bindparam, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import archive, ledger, models, schemas, versions
+from .config import section
+
+logger = logging.getLogger(__name__)
+
+ID_CHUNK = 1000  # ids per IN list; MSSQL caps a statement at 2100 parameters
+
+
+def occurrence(cadence: str, start: datetime, n: int) -> datetime:
+    if cadence == 'daily':
+        return start + timedelta(days=n)
+    if cadence == 'weekly':
+        return start + timedelta(weeks=n)
+    month = start.month - 1 + n
+    year, month = start.year + month // 12, month % 12 + 1
+    return start.replace(year=year, month=month, day=min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def transaction_id(rule_id: str, n: int) -> str:
+    return f"rr-{rule_id}-{n}"
+
+
+def fast_forward(rule, now: datetime) -> tuple:
+    """(runs, next_run) of the first occurrence at or after `now`, skipping the ones in between."""
+    n, when = rule.runs, rule.next_run or occurrence(rule.cadence, rule.start_date, rule.runs)
+    while when < now:
+        n += 1
+        when = occurrence(rule.cadence, rule.start_date, n)
+    return n, when
+
+
+def references(account_id: str):
+    """Criterion for the rules that post to or from `account_id`."""
+    R = models.RecurringRule
+    return or_(R.account_id == account_id, R.from_account_id == account_id, R.to_account_id == account_id)
+
+
+def _accounts(rule) -> set:
+    return {a for a in (rule.account_id, rule.from_account_id, rule.to_account_id) if a}
+
+
+def _in_chunks(db: Session, column, ids: list) -> set:
+    found = set()
+    for i in range(0, len(ids), ID_CHUNK):
+        found.update(db.scalars(select(column).where(column.in_(ids[i:i + ID_CHUNK]))))
+    return found
+
+
+def _post_batch(db: Session, rules: list, now: datetime, max_posts: int, stats: dict) -> None:
+    R, T, A = models.RecurringRule, models.Transaction, models.Account
+    account_ids = list(set().union(*(_accounts(rule) for rule in rules)))
+    accounts = {row.id: row for row in db.execute(select(A.id, A.user_id, A.status).where(A.id.in_(account_ids)))}
+
+    pending, updates = [], []
+    for rule in rules:
+        problem = next((
+            f"account {acc} is {accounts[acc].status}" if acc in accounts and accounts[acc].user_id == rule.user_id
+            else f"account {acc} not found"
+            for acc in sorted(_accounts(rule))
+            if acc not in accounts or accounts[acc].user_id != rule.user_id or accounts[acc].status != 'active'
+        ), None)
+        if problem:
+            updates.append({"_id": rule.id, "_runs": rule.runs, "_next": rule.next_run,
+                            "_status": "paused", "_reason": problem})
+            stats["paused"] += 1
+            continue
+        n, when = rule.runs, rule.next_run
+        while when <= now and (rule.end_date is None or when <= rule.end_date) and len(pending) < max_posts:
+            pending.append((rule, n, when))
+            n += 1
+            when = occurrence(rule.cadence, rule.start_date, n)
+        finished = rule.end_date is not None and when > rule.end_date
+        updates.append({"_id": rule.id, "_runs": n, "_next": None if finished else when,
+                        "_status": "finished" if finished else "active", "_reason": None})
+
+    candidates = [transaction_id(rule.id, n) for rule, n, _ in pending]
+    existing = _in_chunks(db, T.id, candidates) | archive.existing(candidates)
+    by_user = defaultdict(list)
+    for rule, n, when in pending:
+        tx_id = transaction_id(rule.id, n)
+        if tx_id in existing:
+            stats["duplicates"] += 1
+            continue
+        by_user[rule.user_id].append(schemas.TransactionCreate(
+            id=tx_id, date=when, type=rule.type, amount=rule.amount, description=rule.description,
+            account_id=rule.account_id, from_account_id=rule.from_account_id, to_account_id=rule.to_account_id,
+        ))
+
+    for user_id, batch in by_user.items():
+        version = versions.touch(db, user_id, accounts=set().union(*(_accounts(tx) for tx in batch)))
+        db.execute(insert(T.__table__), [{**tx.model_dump(), "user_id": user_id, "version": version} for tx in batch])
+        ledger.post_many(db, user_id, batch)
+        stats["posted"] += len(batch)
+
+    rt = R.__table__
+    db.execute(
+        update(rt)
+        .where(rt.c.id == bindparam("_id"))
+        .values(runs=bindparam("_runs"), next_run=bindparam("_next"),
+                status=bindparam("_status"), paused_reason=bindparam("_reason")),
+        updates,
+    )
+    stats["rules"] += len(rules)
+
+
+def run_due(db: Session, now: datetime = None, batch_size: int = 200, max_posts: int = 5000) -> dict:
+    """Post every occurrence due by `now`, committing once per batch of rules.
+
+    A rule with more than `max_posts` occurrences outstanding is left due with
+    its next_run moved forward, so the following batch picks it up again.
+    """
+    R = models.RecurringRule
+    now = now or datetime.utcnow()
+    stats = {"rules": 0, "posted": 0, "duplicates": 0, "paused": 0}
+    while True:
+        rules = db.execute(
+            select(R.__table__)
+            .where(R.status == 'active', R.next_run <= now)
+            .order_by(R.next_run)
+            .limit(batch_size)
+        ).all()
+        if not rules:
+            return stats
+        _post_batch(db, rules, now, max_posts, stats)
+        db.commit()
+
+
+def run_once() -> dict:
+    from .database import SessionLocal
+
+    cfg = section("recurring")
+    with SessionLocal() as db:
+        try:
+            return run_due(db, batch_size=int(cfg.get("batch_size", 200)))
+        except IntegrityError:
+            # Another worker posted the same occurrences first; the next tick skips them
+            db.rollback()
+            logger.info("Recurring run lost a race with another worker; retrying next tick")
+            return {}
+
+
+class Scheduler:
+    """Calls `run_once` on a worker thread every `interval` seconds, starting immediately."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._loop(), name="recurring-scheduler")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                stats = await run_in_threadpool(run_once)
+                if stats.get("posted") or stats.get("paused"):
+                    logger.info("Recurring run: %s", stats)
+            except Exception:
+                logger.exception("Recurring run failed")
+            await asyncio.sleep(self.interval)
+
+
+def scheduler() -> Scheduler:
+    """A scheduler configured from the recurring section, or None when disabled."""
+    cfg = section("recurring")
+    if not cfg.get("enabled", True):
+        return None
+    return Scheduler(float(cfg.get("interval_seconds", 60)))
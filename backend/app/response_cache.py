@@ -0,0 +1,90 @@
+"""Per-user cache of encoded account responses and data versions.
+
+`GET /accounts/`, `/accounts/closed` and `/accounts/{id}` bodies are cached as
+bytes under a key made of the user, the resource and the user's data version.
+Every write on any worker bumps that version, so a body cached by one worker
+is never served after another worker's write. The backend is chosen by the
+`cache` settings section: a byte-bounded in-process LRU (`memory`) or a
+Redis-compatible server (`redis`).
+
+The data version itself (what every ETag and 304 comes from) is never
+cached: it is read from the database on each request, one primary-key lookup
+and still no list query on a hit. A cached copy could be written back with an
+old version by a reader that loaded it just before a write committed.
+
+Entries name the dependencies they are built from, and writes evict exactly
+those:
+
+  user:<id>      the user's data version and account lists; every
+                 `versions.touch` for the user
+  account:<id>   one account's detail; touches naming the account, and any
+                 ledger entry posted to it (so a transaction evicts its
+                 accounts, not all of the user's)
+
+Writes only mark their dependencies on the session (`stale`). The marks are
+evicted once it commits and dropped if it rolls back, so a reader can never
+cache the state of a write that was not committed. With the memory backend
+eviction only frees memory early; the versioned keys are what keep bodies
+current across workers.
+"""
+from functools import lru_cache
+from typing import Awaitable, Callable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .cache import RedisCache, SizedLRU
+from .config import section
+
+_MARKS = "response_cache.stale"
+
+
+@lru_cache(maxsize=1)
+def backend():
+    """The configured cache, or None when `cache.enabled` is false."""
+    cfg = section("cache")
+    if not cfg.get("enabled", True):
+        return None
+    ttl = float(cfg.get("ttl_seconds", 30))
+    if cfg.get("backend", "memory") == "redis":
+        return RedisCache(cfg.get("redis_url", "redis://localhost:6379/0"), ttl)
+    return SizedLRU(int(cfg.get("max_bytes", 32 * 1024 * 1024)), ttl)
+
+
+async def fetch(key: str, build: Callable[[], Awaitable[bytes]], users=(), accounts=()) -> bytes:
+    """The cached bytes for `key`, else `await build()`, stored under the given dependencies."""
+    cache = backend()
+    if cache is None:
+        return await build()
+    value = cache.get(key)
+    if value is None:
+        generation = cache.generation
+        value = await build()
+        cache.set(key, value, [f"user:{u}" for u in users] + [f"account:{a}" for a in accounts], generation)
+    return value
+
+
+def stale(db: Session, users=(), accounts=()) -> None:
+    """Mark entries the session's pending write changes; evicted when it commits."""
+    if backend() is None:
+        return
+    marks = db.info.setdefault(_MARKS, set())
+    marks.update(f"user:{u}" for u in users)
+    marks.update(f"account:{a}" for a in accounts)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict(session) -> None:
+    marks = session.info.pop(_MARKS, None)
+    if marks:
+        backend().evict(*marks)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session) -> None:
+    session.info.pop(_MARKS, None)
+
+
+def snapshot() -> dict:
+    cache = backend()
+    return {"enabled": False} if cache is None else {"enabled": True, **cache.snapshot()}
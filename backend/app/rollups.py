@@ -0,0 +1,190 @@
+"""Per-account daily and monthly rollups of the ledger.
+
+Each `account_rollups` row holds one account's flows for a day or month plus its
+balance at the end of that period. Rows only exist for periods with activity;
+readers carry the previous closing balance forward across quiet periods.
+
+`apply` runs in the same DB transaction as the ledger rows it summarizes, so
+reports never see a transaction without its rollup. `rebuild` recomputes the
+table from the ledger.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+
+PERIODS = ("day", "month")
+FLOW_COLUMNS = ("deposits", "withdrawals", "transfers_in", "transfers_out", "adjustments")
+
+# Which column a ledger leg lands in, and the sign that makes it a positive amount
+_KIND_COLUMN = {
+    "deposit": ("deposits", 1),
+    "withdrawal": ("withdrawals", -1),
+    "transfer_in": ("transfers_in", 1),
+    "transfer_out": ("transfers_out", -1),
+    "opening": ("adjustments", 1),
+    "adjustment": ("adjustments", 1),
+}
+
+
+def period_start(period: str, when) -> date:
+    day = when.date() if isinstance(when, datetime) else when
+    return day if period == "day" else day.replace(day=1)
+
+
+def next_period(period: str, start: date) -> date:
+    if period == "day":
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _group(entries) -> dict:
+    """{(account_id, user_id, period): {period_start: {column: amount, "net": amount}}}"""
+    groups = defaultdict(lambda: defaultdict(lambda: defaultdict(Decimal)))
+    for e in entries:
+        column, sign = _KIND_COLUMN[e["kind"]]
+        amount = Decimal(str(e["amount"]))
+        for period in PERIODS:
+            bucket = groups[(e["account_id"], e["user_id"], period)][period_start(period, e["effective_date"])]
+            bucket[column] += sign * amount
+            bucket["net"] += amount
+    return groups
+
+
+def apply(db: Session, entries) -> None:
+    """Fold freshly inserted ledger entries into the rollups.
+
+    Per touched period: bump its row (or insert it on top of the previous
+    closing balance), then shift the closing balance of any later rows. Entries
+    dated today only touch the current rows; backdated ones also touch the
+    rows after them. Entries spanning several periods of one account (imports,
+    recurring catch-up) go through `_apply_span` in a fixed number of statements.
+    """
+    R = models.AccountRollup
+    for (account_id, user_id, period), buckets in _group(entries).items():
+        buckets = {start: flows for start, flows in buckets.items() if any(flows.values())}
+        if len(buckets) > 1:
+            _apply_span(db, account_id, user_id, period, buckets)
+            continue
+        key = (R.account_id == account_id, R.period == period)
+        for start in sorted(buckets):
+            flows = buckets[start]
+            net = flows.pop("net")
+            bumped = db.execute(
+                update(R)
+                .where(*key, R.period_start == start)
+                .values(closing_balance=R.closing_balance + net,
+                        **{c: getattr(R, c) + v for c, v in flows.items()})
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not bumped:
+                previous = db.execute(
+                    select(R.closing_balance).where(*key, R.period_start < start)
+                    .order_by(R.period_start.desc()).limit(1)
+                ).scalar()
+                db.execute(insert(R.__table__), [{
+                    "account_id": account_id, "user_id": user_id, "period": period, "period_start": start,
+                    **{c: flows.get(c, Decimal(0)) for c in FLOW_COLUMNS},
+                    "closing_balance": Decimal(str(previous or 0)) + net,
+                }])
+            if net:
+                db.execute(
+                    update(R)
+                    .where(*key, R.period_start > start)
+                    .values(closing_balance=R.closing_balance + net)
+                    .execution_options(synchronize_session=False)
+                )
+
+
+def _apply_span(db: Session, account_id: str, user_id: str, period: str, buckets: dict) -> None:
+    """Many periods of one account at once: two reads, then one executemany UPDATE for
+    the existing rows in the span, one multi-row INSERT for the new ones and one
+    UPDATE shifting the rows after it."""
+    R = models.AccountRollup
+    t = R.__table__
+    key = (R.account_id == account_id, R.period == period)
+    first, last = min(buckets), max(buckets)
+    existing = dict(db.execute(
+        select(R.period_start, R.closing_balance).where(*key, R.period_start >= first, R.period_start <= last)
+    ).all())
+    base = Decimal(0)  # closing balance of the latest existing row so far, before these entries
+    if first not in existing:
+        previous = db.execute(
+            select(R.closing_balance).where(*key, R.period_start < first).order_by(R.period_start.desc()).limit(1)
+        ).scalar()
+        base = Decimal(str(previous or 0))
+
+    cumulative = Decimal(0)
+    bumps, rows = [], []
+    for start in sorted(set(buckets) | set(existing)):
+        flows = buckets.get(start, {})
+        cumulative += flows.get("net", 0)
+        if start in existing:
+            base = Decimal(str(existing[start]))
+            if cumulative or flows:
+                bumps.append({"_start": start, "_net": cumulative,
+                              **{f"_{c}": flows.get(c, Decimal(0)) for c in FLOW_COLUMNS}})
+        else:
+            rows.append({
+                "account_id": account_id, "user_id": user_id, "period": period, "period_start": start,
+                **{c: flows.get(c, Decimal(0)) for c in FLOW_COLUMNS},
+                "closing_balance": base + cumulative,
+            })
+
+    if bumps:
+        db.execute(
+            update(t)
+            .where(t.c.account_id == account_id, t.c.period == period, t.c.period_start == bindparam("_start"))
+            .values(closing_balance=t.c.closing_balance + bindparam("_net"),
+                    **{c: t.c[c] + bindparam(f"_{c}") for c in FLOW_COLUMNS}),
+            bumps,
+        )
+    if rows:
+        db.execute(insert(t), rows)
+    if cumulative:
+        db.execute(
+            update(R)
+            .where(*key, R.period_start > last)
+            .values(closing_balance=R.closing_balance + cumulative)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def rebuild(db: Session, batch_size: int = 1000) -> int:
+    """Recompute every rollup row from the ledger, one account at a time.
+
+    Returns the number of rows written.
+    """
+    L, R = models.LedgerEntry, models.AccountRollup
+    db.execute(delete(R))
+    account_ids = db.execute(select(L.account_id).distinct()).scalars().all()
+    written, pending = 0, []
+    for account_id in account_ids:
+        entries = db.execute(
+            select(L.account_id, L.user_id, L.kind, L.amount, L.effective_date)
+            .where(L.account_id == account_id)
+            .order_by(L.effective_date, L.id)
+        ).mappings().all()
+        for (_, user_id, period), buckets in _group(entries).items():
+            closing = Decimal(0)
+            for start in sorted(buckets):
+                flows = buckets[start]
+                closing += flows.pop("net")
+                pending.append({
+                    "account_id": account_id, "user_id": user_id, "period": period, "period_start": start,
+                    **{c: flows.get(c, Decimal(0)) for c in FLOW_COLUMNS},
+                    "closing_balance": closing,
+                })
+        if len(pending) >= batch_size:
+            db.execute(insert(R.__table__), pending)
+            written += len(pending)
+            pending = []
+    if pending:
+        db.execute(insert(R.__table__), pending)
+        written += len(pending)
+    db.commit()
+    return written
@@ -1,60 +1,113 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-
-from .. import schemas, models
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from .. import schemas, models, queries, archive, jobs, ledger, recurring, response_cache, versions, fastjson
 from ..database import get_db
-from ..dependencies import get_current_user
-
-# Type hints
-from ..models import User
+from ..dependencies import Principal, conditional_get, get_current_principal
 
 
 router = APIRouter()
 
 
+async def _owned_account(db: AsyncSession, account_id: str, user_id: str, writable: bool = False) -> models.Account:
+    """The user's account; with `writable`, 409 while a delete job is tearing it down."""
+    account = await db.get(models.Account, account_id)
+    if not account:
+        raise HTTPException(status_code=404, detail='Account not found')
+    if account.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if writable and account.status == 'deleting':
+        raise HTTPException(status_code=409, detail='Account is being deleted')
+    return account
+
+
 @router.get('/', response_model=List[schemas.Account])
-def list_accounts(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def list_accounts(
+    response: Response,
+    version: int = Depends(conditional_get),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
-    return (
-        db.query(models.Account)
-        .filter(models.Account.user_id == current_user.id, models.Account.status == "active")
-        .all()
-    )
+    async def load() -> bytes:
+        result = await db.execute(
+            select(*queries.columns(models.Account, queries.ACCOUNT_FIELDS))
+            .where(models.Account.user_id == current_user.id, models.Account.status == "active")
+        )
+        return fastjson.dumps(fastjson.rows(result))
+
+    body = await response_cache.fetch(f"{current_user.id}:{version}:accounts:active", load, users=[current_user.id])
+    return fastjson.respond(body, response)
 
 
 # New endpoint to fetch closed accounts
 @router.get('/closed', response_model=List[schemas.Account])
-def list_closed_accounts(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def list_closed_accounts(
+    response: Response,
+    version: int = Depends(conditional_get),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
-    return (
-        db.query(models.Account)
-        .filter(models.Account.user_id == current_user.id, models.Account.status == "closed")
-        .all()
-    )
+    async def load() -> bytes:
+        result = await db.execute(
+            select(*queries.columns(models.Account, queries.ACCOUNT_FIELDS))
+            .where(models.Account.user_id == current_user.id, models.Account.status == "closed")
+        )
+        return fastjson.dumps(fastjson.rows(result))
+
+    body = await response_cache.fetch(f"{current_user.id}:{version}:accounts:closed", load, users=[current_user.id])
+    return fastjson.respond(body, response)
 
 
 @router.get('/{account_id}', response_model=schemas.Account)
-def get_account(account_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    account = db.query(models.Account).get(account_id)
-    if not account:
-        raise HTTPException(status_code=404, detail='Account not found')
-    if account.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Forbidden")
-    return account
+async def get_account(
+    account_id: str,
+    response: Response,
+    version: int = Depends(conditional_get),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    # Only owned accounts are cached, under the owner's key; 403/404 are never cached
+    async def load() -> bytes:
+        account = await _owned_account(db, account_id, current_user.id)
+        return fastjson.dumps(schemas.Account.model_validate(account).model_dump())
+
+    body = await response_cache.fetch(f"{current_user.id}:{version}:account:{account_id}", load, accounts=[account_id])
+    return fastjson.respond(body, response)
+
+
+@router.get('/{account_id}/transactions', response_model=schemas.TransactionPage, dependencies=[Depends(conditional_get)])
+async def list_account_transactions(
+    account_id: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    await _owned_account(db, account_id, current_user.id)
+
+    def build(T):
+        criteria = [queries.before_cursor(cursor, T)] if cursor else []
+        return queries.account_transactions_page(account_id, *criteria, limit=limit + 1, T=T)
+
+    rows = (await db.execute(build(models.Transaction))).all()
+    if archive.enabled():
+        rows = await run_in_threadpool(archive.extend, rows, limit, build)
+    next_cursor = queries.encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return fastjson.respond({"items": fastjson.rows(rows[:limit]), "next_cursor": next_cursor}, response)
 
 
 @router.post('/', response_model=schemas.Account, status_code=201)
-def create_account(
+async def create_account(
     payload: schemas.AccountCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
-    if db.query(models.Account).get(payload.id):
+    if await db.get(models.Account, payload.id):
         raise HTTPException(status_code=409, detail='Account id already exists')
     account = models.Account(
         id=payload.id,
@@ -68,89 +121,119 @@ def create_account(
         user_id=current_user.id,
     )
     db.add(account)
-    db.commit()
-    db.refresh(account)
+    await db.flush()
+    await db.run_sync(ledger.open_account, account)
+    await db.run_sync(versions.touch, current_user.id, account)
+    await db.commit()
+    await db.refresh(account)
     return account
 
 
 @router.patch('/{account_id}', response_model=schemas.Account)
-def update_account(
+async def update_account(
     account_id: str,
     payload: schemas.AccountUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
-    account = db.query(models.Account).get(account_id)
-    if not account:
-        raise HTTPException(status_code=404, detail='Account not found')
-    if account.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Forbidden")
-    for field, value in payload.dict(exclude_unset=True).items():
+    account = await _owned_account(db, account_id, current_user.id, writable=True)
+    changes = payload.dict(exclude_unset=True)
+    # Balance edits go through the ledger so the cached balance stays reconcilable
+    if changes.get('balance') is not None:
+        await db.run_sync(ledger.adjust, account, changes.pop('balance'))
+    changes.pop('balance', None)
+    for field, value in changes.items():
         setattr(account, field, value)
-    db.commit()
-    db.refresh(account)
+    await db.run_sync(versions.touch, current_user.id, account)
+    await db.commit()
+    await db.refresh(account)
     return account
 
 
-@router.delete('/{account_id}', status_code=204)
-def delete_account(account_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    account = db.query(models.Account).get(account_id)
-    if not account:
-        raise HTTPException(status_code=404, detail='Account not found')
-    if account.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Forbidden")
+@router.delete('/{account_id}', status_code=204, responses={202: {"model": schemas.Job}})
+async def delete_account(account_id: str, db: AsyncSession = Depends(get_db), current_user: Principal = Depends(get_current_principal)):
+    """Delete the account and every transaction touching it.
+
+    Small accounts go in this request (204). Past one job chunk of
+    transactions the delete becomes a background job and the response is 202
+    with the job, so a long history never holds the write lock for long.
+    """
+    account = await _owned_account(db, account_id, current_user.id)
+    if account.status == 'deleting':
+        raise HTTPException(status_code=409, detail='Account is already being deleted')
+    if await db.run_sync(jobs.exceeds_chunk, account_id):
+        job = await db.run_sync(jobs.create, current_user.id, 'delete_accounts', [account_id])
+        await db.commit()
+        await db.refresh(job)
+        jobs.start(job.id)
+        return JSONResponse(
+            schemas.Job.model_validate(job).model_dump(mode='json'),
+            status_code=202,
+            headers={"Location": f"/jobs/{job.id}"},
+        )
+
+    archived = await run_in_threadpool(archive.account_transaction_ids, account_id)
+    await db.run_sync(versions.touch, current_user.id, deleted={
+        'account': [account_id],
+        'transaction': queries.transaction_ids_for_account(account_id),
+    })
+    if archived:
+        await db.run_sync(versions.touch, current_user.id, deleted={'transaction': archived})
 
     # Delete all transactions referencing this account to avoid FK conflicts
-    db.query(models.Transaction).filter(
-        (models.Transaction.account_id == account_id) |
-        (models.Transaction.from_account_id == account_id) |
-        (models.Transaction.to_account_id == account_id)
-    ).delete(synchronize_session=False)
-
-    db.delete(account)
-    db.commit()
+    await db.execute(
+        delete(models.Transaction)
+        .where(models.Transaction.id.in_(queries.transaction_ids_for_account(account_id)))
+        .execution_options(synchronize_session=False)
+    )
+    # The only case where ledger rows are removed: the account itself is gone
+    for table in (models.LedgerEntry, models.AccountRollup):
+        await db.execute(
+            delete(table)
+            .where(table.account_id == account_id)
+            .execution_options(synchronize_session=False)
+        )
+    await db.execute(
+        delete(models.RecurringRule).where(recurring.references(account_id)).execution_options(synchronize_session=False)
+    )
+
+    await db.delete(account)
+    await db.commit()
+    await run_in_threadpool(archive.forget, archived)
     return None
 
 
 # Endpoint to mark account as closed
 @router.patch('/{account_id}/close', response_model=schemas.Account)
-def close_account(
+async def close_account(
     account_id: str,
     payload: schemas.AccountClose,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
-    account = db.query(models.Account).get(account_id)
-    if not account:
-        raise HTTPException(status_code=404, detail='Account not found')
-    if account.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Forbidden")
+    account = await _owned_account(db, account_id, current_user.id, writable=True)
     if account.status == "closed":
         raise HTTPException(status_code=400, detail='Account already closed')
     account.status = "closed"
     account.closed_reason = payload.reason
-    db.commit()
-    db.refresh(account)
+    await db.run_sync(versions.touch, current_user.id, account)
+    await db.commit()
+    await db.refresh(account)
     return account
 
 # Restore account endpoint
 @router.patch('/{account_id}/restore', response_model=schemas.Account)
-def restore_account(
+async def restore_account(
     account_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
 ):
-    account = db.query(models.Account).get(account_id)
-    if not account:
-        raise HTTPException(status_code=404, detail='Account not found')
-    if account.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail='Forbidden')
+    account = await _owned_account(db, account_id, current_user.id, writable=True)
     if account.status == 'active':
         raise HTTPException(status_code=400, detail='Account already active')
     account.status = 'active'
     account.closed_reason = None
-    db.commit()
-    db.refresh(account)
+    await db.run_sync(versions.touch, current_user.id, account)
+    await db.commit()
+    await db.refresh(account)
     return account
-
-
@@ -1,18 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordRequestForm
 import uuid
 
-from .. import models, schemas, auth
+from .. import models, schemas, auth, hashing
 from ..database import get_db
-from ..dependencies import get_current_user
+from ..dependencies import Principal, get_current_principal, get_current_user, invalidate_user
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+# bcrypt runs on the bounded hash pool (see hashing.py), never on the event
+# loop or a request-threadpool slot.
+
+
+async def _user_by_email(db: AsyncSession, email: str):
+    return (await db.scalars(select(models.User).where(models.User.email == email))).first()
+
 
 @router.post("/register", response_model=schemas.UserOut, status_code=201)
-def register(payload: schemas.UserCreate, db: Session = Depends(get_db)):
-    if db.query(models.User).filter(models.User.email == payload.email).first():
+async def register(payload: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+    if await _user_by_email(db, payload.email):
         raise HTTPException(status_code=409, detail="Email already registered")
     user = models.User(
         id=str(uuid.uuid4()),
@@ -20,23 +28,45 @@ def register(payload: schemas.UserCreate, db: Session = Depends(get_db)):
         last_name=payload.last_name,
         email=payload.email,
     )
-    user.set_password(payload.password)
+    user.password_hash = await hashing.hash_password(payload.password)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
 @router.post("/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
-    if user is None or not user.verify_password(form_data.password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user = await _user_by_email(db, form_data.username)
+    if user is None or not await hashing.verify_password(form_data.password, user.password_hash):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-    access_token = auth.create_access_token({"sub": user.id})
+    # Transparently move old hashes to the configured cost while we have the plaintext
+    if auth.needs_rehash(user.password_hash):
+        user.password_hash = await hashing.hash_password(form_data.password)
+        await db.commit()
+    access_token = auth.create_access_token({"sub": user.id, "ver": user.token_version or 0})
     return schemas.Token(access_token=access_token)
 
 
 # Get current user
 @router.get("/me", response_model=schemas.UserOut)
-def get_me(current_user: models.User = Depends(get_current_user)):
+async def get_me(current_user=Depends(get_current_user)):
     return current_user
+
+
+# Change password; revokes every previously issued token
+@router.post("/password", response_model=schemas.Token)
+async def change_password(
+    payload: schemas.PasswordChange,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    user = await db.get(models.User, current_user.id)
+    if not await hashing.verify_password(payload.current_password, user.password_hash):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    user.password_hash = await hashing.hash_password(payload.new_password)
+    user.token_version = (user.token_version or 0) + 1
+    await db.commit()
+    invalidate_user(user.id)
+    access_token = auth.create_access_token({"sub": user.id, "ver": user.token_version})
+    return schemas.Token(access_token=access_token)
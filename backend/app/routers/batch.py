@@ -0,0 +1,262 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from datetime import datetime
+
+from .. import schemas, models, queries, archive, jobs, ledger, recurring, versions
+from ..database import get_db
+from ..dependencies import Principal, get_current_principal
+
+
+router = APIRouter()
+
+TX_ACCOUNT_FIELDS = ('account_id', 'from_account_id', 'to_account_id')
+
+
+class _Batch:
+    """Applies ops against accounts/transactions preloaded in one IN query each."""
+
+    def __init__(self, db: Session, user_id: str, ops):
+        A, T = models.Account, models.Transaction
+        self.db, self.user_id = db, user_id
+        account_ids = {op.id for op in ops if op.entity == 'account'}
+        account_ids |= {op.data[f] for op in ops if op.entity == 'transaction' for f in TX_ACCOUNT_FIELDS if op.data.get(f)}
+        tx_ids = {op.id for op in ops if op.entity == 'transaction'}
+        self.accounts = {a.id: a for a in db.scalars(select(A).where(A.id.in_(account_ids)))} if account_ids else {}
+        self.transactions = {t.id: t for t in db.scalars(select(T).where(T.id.in_(tx_ids)))} if tx_ids else {}
+        self.archived_ids = archive.existing(tx_ids)  # taken ids, but read-only
+        self.touched = set()   # accounts whose row changed
+        self.created = []      # new transactions, stamped with the batch version
+        self.last_dates = set()  # accounts that lost a transaction
+        self.deleted = {'account': [], 'transaction': []}
+        self.archived = []     # archived transactions to purge once committed
+        self.jobs = {}         # account id -> delete job to start once committed
+
+    def account(self, account_id: str) -> models.Account:
+        account = self.accounts.get(account_id)
+        if account is None:
+            raise HTTPException(status_code=404, detail='Account not found')
+        if account.user_id != self.user_id:
+            raise HTTPException(status_code=403, detail="Forbidden")
+        if account.status == 'deleting':
+            raise HTTPException(status_code=409, detail='Account is being deleted')
+        return account
+
+    def transaction(self, tx_id: str) -> models.Transaction:
+        tx = self.transactions.get(tx_id)
+        if tx is None:
+            raise HTTPException(status_code=404, detail='Transaction not found')
+        if tx.user_id != self.user_id:
+            raise HTTPException(status_code=403, detail="Forbidden")
+        return tx
+
+    def moved(self, deltas) -> None:
+        # Balances moved with atomic UPDATEs; reload them lazily if read again
+        for account_id in deltas:
+            self.db.expire(self.accounts[account_id], ['balance', 'last_tx_date'])
+        self.touched.update(deltas)
+
+    # Accounts
+
+    def create_account(self, op):
+        if op.id in self.accounts:
+            raise HTTPException(status_code=409, detail='Account id already exists')
+        payload = schemas.AccountCreate(id=op.id, **op.data)
+        account = models.Account(
+            id=payload.id,
+            name=payload.name,
+            type=payload.type,
+            stash_type=payload.stash_type,
+            balance=payload.balance,
+            goal_amount=payload.goal_amount,
+            goal_date=payload.goal_date,
+            goal_frequency=payload.goal_frequency,
+            user_id=self.user_id,
+        )
+        self.db.add(account)
+        self.db.flush()
+        ledger.open_account(self.db, account)
+        self.accounts[account.id] = account
+        self.touched.add(account.id)
+
+    def update_account(self, op):
+        account = self.account(op.id)
+        changes = schemas.AccountUpdate(**op.data).dict(exclude_unset=True)
+        if changes.get('balance') is not None:
+            ledger.adjust(self.db, account, changes.pop('balance'))
+            self.moved([account.id])
+        changes.pop('balance', None)
+        for field, value in changes.items():
+            setattr(account, field, value)
+        self.touched.add(account.id)
+
+    def close_account(self, op):
+        account = self.account(op.id)
+        payload = schemas.AccountClose(**op.data)
+        if account.status == "closed":
+            raise HTTPException(status_code=400, detail='Account already closed')
+        account.status = "closed"
+        account.closed_reason = payload.reason
+        self.touched.add(account.id)
+
+    def restore_account(self, op):
+        account = self.account(op.id)
+        if account.status == 'active':
+            raise HTTPException(status_code=400, detail='Account already active')
+        account.status = 'active'
+        account.closed_reason = None
+        self.touched.add(account.id)
+
+    def delete_account(self, op):
+        account = self.account(op.id)
+        db = self.db
+        db.flush()
+        if jobs.exceeds_chunk(db, account.id):
+            # Too long a history for the batch's transaction, as on DELETE
+            # /accounts/{id}: the account is marked deleting with the batch and
+            # a background job removes it once committed
+            self.jobs[account.id] = jobs.create(db, self.user_id, 'delete_accounts', [account.id])
+            db.refresh(account)
+            return
+        tx_ids = db.scalars(queries.transaction_ids_for_account(account.id)).all()
+        self.deleted['account'].append(account.id)
+        self.deleted['transaction'].extend(tx_ids)
+        archived = archive.account_transaction_ids(account.id)
+        self.deleted['transaction'].extend(archived)
+        self.archived.extend(archived)
+        if tx_ids:
+            db.execute(
+                delete(models.Transaction)
+                .where(models.Transaction.id.in_(tx_ids))
+                .execution_options(synchronize_session=False)
+            )
+            for tx_id in tx_ids:
+                tx = self.transactions.pop(tx_id, None)
+                if tx is not None:
+                    db.expunge(tx)
+            self.created = [tx for tx in self.created if tx.id in self.transactions]
+        for table in (models.LedgerEntry, models.AccountRollup):
+            db.execute(
+                delete(table)
+                .where(table.account_id == account.id)
+                .execution_options(synchronize_session=False)
+            )
+        db.execute(
+            delete(models.RecurringRule).where(recurring.references(account.id)).execution_options(synchronize_session=False)
+        )
+        db.delete(account)
+        db.flush()
+        del self.accounts[account.id]
+        self.touched.discard(account.id)
+        self.last_dates.discard(account.id)
+
+    # Transactions
+
+    def create_transaction(self, op):
+        if op.id in self.transactions or op.id in self.archived_ids:
+            raise HTTPException(status_code=409, detail='Transaction id exists')
+        payload = schemas.TransactionCreate(id=op.id, **op.data)
+        if payload.type in ('deposit', 'withdrawal') and not payload.account_id:
+            raise HTTPException(status_code=400, detail='account_id required for deposit/withdrawal')
+        if payload.type == 'transfer' and not (payload.from_account_id and payload.to_account_id):
+            raise HTTPException(status_code=400, detail='from_account_id and to_account_id required for transfer')
+        for field in TX_ACCOUNT_FIELDS:
+            if getattr(payload, field):
+                self.account(getattr(payload, field))
+
+        tx = models.Transaction(
+            id=payload.id,
+            date=payload.date or datetime.utcnow(),
+            type=payload.type,
+            amount=payload.amount,
+            description=payload.description,
+            account_id=payload.account_id,
+            from_account_id=payload.from_account_id,
+            to_account_id=payload.to_account_id,
+            user_id=self.user_id,
+        )
+        self.db.add(tx)
+        self.db.flush()
+        self.moved(ledger.post(self.db, tx))
+        self.transactions[tx.id] = tx
+        self.created.append(tx)
+
+    def delete_transaction(self, op):
+        tx = self.transaction(op.id)
+        affected = ledger.reverse(self.db, tx)
+        self.moved(affected)
+        self.last_dates.update(affected)
+        self.deleted['transaction'].append(tx.id)
+        self.db.delete(tx)
+        self.db.flush()
+        del self.transactions[tx.id]
+        if tx in self.created:
+            self.created.remove(tx)
+
+    def finish(self) -> None:
+        db = self.db
+        for account_id in self.last_dates:
+            self.accounts[account_id].last_tx_date = db.scalar(queries.latest_transaction_date(account_id))
+        versions.touch(db, self.user_id, *self.created, accounts=self.touched, deleted=self.deleted)
+        db.flush()
+        if self.touched:
+            A = models.Account
+            db.scalars(
+                select(A).where(A.id.in_(self.touched)).execution_options(populate_existing=True)
+            ).all()
+
+
+def _apply(db: Session, user_id: str, ops) -> tuple:
+    """Apply the ops; returns the response and the batch, for its post-commit work."""
+    batch = _Batch(db, user_id, ops)
+    for index, op in enumerate(ops):
+        handler = getattr(batch, f"{op.op}_{op.entity}", None)
+        try:
+            if handler is None:
+                raise HTTPException(status_code=400, detail=f"Unsupported operation: {op.op} {op.entity}")
+            handler(op)
+        except HTTPException as exc:
+            raise HTTPException(status_code=exc.status_code, detail={"index": index, "detail": exc.detail})
+        except ValidationError as exc:
+            raise HTTPException(status_code=422, detail={"index": index, "detail": exc.errors(include_url=False, include_context=False)})
+    batch.finish()
+
+    results = []
+    for op in ops:
+        result = {"op": op.op, "entity": op.entity, "id": op.id}
+        if op.entity == 'account' and op.id in batch.accounts:
+            result["account"] = schemas.Account.model_validate(batch.accounts[op.id])
+            if op.op == 'delete' and op.id in batch.jobs:
+                result["job"] = schemas.Job.model_validate(batch.jobs[op.id])
+        elif op.entity == 'transaction' and op.id in batch.transactions:
+            result["transaction"] = schemas.Transaction.model_validate(batch.transactions[op.id])
+        results.append(result)
+    return {"results": results}, batch
+
+
+@router.post('', response_model=schemas.BatchResponse)
+async def apply_batch(
+    payload: schemas.BatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """Apply an ordered list of account/transaction ops in one DB transaction.
+
+    Supported: create/update/delete/close/restore on accounts, create/delete on
+    transactions. Either every op is applied or none is; a failing op rolls the
+    batch back and the error detail carries its `index`. Results come back in
+    op order and show each row as it stands after the whole batch.
+
+    Deleting an account with more than one job chunk of transactions marks it
+    `deleting` in the batch and hands the rest to a background job, returned
+    in that op's `job`.
+    """
+    result, batch = await db.run_sync(_apply, current_user.id, payload.ops)
+    await db.commit()
+    await run_in_threadpool(archive.forget, batch.archived)
+    for job in batch.jobs.values():
+        jobs.start(job.id)
+    return result
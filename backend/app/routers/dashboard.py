@@ -0,0 +1,126 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import and_, extract, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import math
+
+from .. import schemas, models
+from ..database import get_db
+from ..dependencies import Principal, get_current_principal
+
+
+router = APIRouter()
+
+PERIOD_DAYS = {'daily': 1, 'weekly': 7, 'monthly': 30}
+
+
+def _months_between(start: date, end: date) -> int:
+    return (end.year - start.year) * 12 + (end.month - start.month)
+
+
+def _goal_progress(row, today: date) -> dict:
+    """Per-period savings target and catch-up owed, as the dashboard displays them."""
+    balance, goal = Decimal(row.balance or 0), Decimal(row.goal_amount)
+    frequency = row.goal_frequency or 'monthly'
+    remaining = max(Decimal(0), goal - balance)
+    days_left = max(0, (row.goal_date - today).days)
+    periods_left = math.ceil(days_left / PERIOD_DAYS.get(frequency, 30)) or 1
+    per_period = remaining / periods_left
+
+    missed = 0
+    if row.goal_frequency and row.last_tx_date:
+        last = row.last_tx_date.date()
+        if frequency == 'monthly':
+            missed = _months_between(last, today) - 1
+        else:
+            missed = (today - last).days // PERIOD_DAYS[frequency] - 1
+    return {
+        "account_id": row.id,
+        "name": row.name,
+        "balance": float(balance),
+        "goal_amount": float(goal),
+        "goal_date": row.goal_date,
+        "goal_frequency": row.goal_frequency,
+        "progress": float(min(Decimal(1), max(Decimal(0), balance / goal))) if goal > 0 else 1.0,
+        "remaining": float(remaining),
+        "per_period": round(float(per_period), 2),
+        "catch_up": round(float(per_period * missed), 2) if missed > 0 else 0.0,
+        "on_track": missed <= 0,
+    }
+
+
+def _summary(db: Session, user_id: str, recent: int, months: int) -> dict:
+    A, T = models.Account, models.Transaction
+    today = datetime.utcnow().date()
+    active = and_(A.user_id == user_id, A.status == 'active')
+
+    stash_rows = db.execute(
+        select(A.stash_type, func.sum(A.balance), func.count())
+        .where(active)
+        .group_by(A.stash_type)
+        .order_by(A.stash_type)
+    ).all()
+
+    goal_rows = db.execute(
+        select(A.id, A.name, A.balance, A.goal_amount, A.goal_date, A.goal_frequency, A.last_tx_date)
+        .where(active, A.goal_amount.is_not(None), A.goal_date.is_not(None))
+    ).all()
+
+    recent_rows = db.scalars(
+        select(T).where(T.user_id == user_id).order_by(T.date.desc(), T.id.desc()).limit(recent)
+    ).all() if recent else []
+
+    # Transfers move money between the user's own accounts, so only deposits and
+    # withdrawals count as cash flow; both seek ix_transactions_user_type_date_id
+    first = today.replace(day=1)
+    for _ in range(months - 1):
+        first = (first - timedelta(days=1)).replace(day=1)
+    year, month = extract('year', T.date), extract('month', T.date)
+    flow_rows = db.execute(
+        select(year, month, T.type, func.sum(T.amount))
+        .where(T.user_id == user_id, T.type.in_(('deposit', 'withdrawal')), T.date >= first)
+        .group_by(year, month, T.type)
+    ).all()
+
+    flows = {}
+    for y, m, tx_type, total in flow_rows:
+        flows[(int(y), int(m), tx_type)] = float(total or 0)
+    monthly, cursor = [], first
+    for _ in range(months):
+        key = (cursor.year, cursor.month)
+        monthly.append({
+            "month": f"{cursor.year:04d}-{cursor.month:02d}",
+            "inflow": flows.get(key + ('deposit',), 0.0),
+            "outflow": flows.get(key + ('withdrawal',), 0.0),
+        })
+        cursor = (cursor.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+    stash_totals = [
+        {"stash_type": stash, "total": float(total or 0), "accounts": count}
+        for stash, total, count in stash_rows
+    ]
+    return {
+        "net_worth": float(sum((total or 0 for _, total, _ in stash_rows), Decimal(0))),
+        "stash_totals": stash_totals,
+        "goals": [_goal_progress(row, today) for row in goal_rows],
+        "recent": recent_rows,
+        "monthly": monthly,
+    }
+
+
+@router.get('/summary', response_model=schemas.DashboardSummary)
+async def dashboard_summary(
+    recent: int = Query(10, ge=0, le=100),
+    months: int = Query(12, ge=1, le=60),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """Everything the dashboard's first paint needs, aggregated in the database.
+
+    Four small statements (stash totals, goal accounts, recent transactions,
+    monthly cash flow) run in a single session hop; none scale with the size of
+    the user's history beyond the requested window.
+    """
+    return await db.run_sync(_summary, current_user.id, recent, months)
@@ -0,0 +1,104 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from datetime import date, datetime, timedelta
+
+from .. import schemas, models
+from ..cache import TTLCache
+from ..database import get_db
+from ..dependencies import Principal, get_current_principal
+from .dashboard import PERIOD_DAYS
+
+
+router = APIRouter()
+
+# account id -> (account version, as-of date, window, projection). Any write that
+# touches the account bumps its version, so a hit is always current for the day.
+_projections = TTLCache(maxsize=4096, ttl=24 * 3600)
+
+
+def _project(db: Session, accounts: list, today: date, window_days: int) -> list:
+    """Projections for many accounts at once from their daily rollups in the trailing window."""
+    import numpy as np  # ~60ms; only paid by the first projection, not at worker start
+
+    R = models.AccountRollup
+    index = {a.id: i for i, a in enumerate(accounts)}
+    flows = db.execute(
+        select(R.account_id, R.deposits + R.transfers_in - R.withdrawals - R.transfers_out)
+        .where(R.account_id.in_(list(index)), R.period == 'day', R.period_start > today - timedelta(days=window_days))
+    ).all()
+
+    # Net saved per account over the window; one bincount instead of a loop per account
+    saved = np.bincount(
+        np.fromiter((index[acc] for acc, _ in flows), dtype=np.intp, count=len(flows)),
+        weights=np.fromiter((float(net or 0) for _, net in flows), dtype=float, count=len(flows)),
+        minlength=len(accounts),
+    )
+    rate = saved / window_days  # per day
+    balance = np.array([float(a.balance or 0) for a in accounts])
+    goal = np.array([float(a.goal_amount) for a in accounts])
+    period = np.array([PERIOD_DAYS.get(a.goal_frequency or 'monthly', 30) for a in accounts], dtype=float)
+    days_left = np.array([max(0, (a.goal_date - today).days) for a in accounts], dtype=float)
+
+    remaining = np.maximum(goal - balance, 0)
+    periods_left = np.maximum(np.ceil(days_left / period), 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_needed = np.where(remaining <= 0, 0, np.where(rate > 0, np.ceil(remaining / rate), np.inf))
+    on_track = days_needed <= days_left
+
+    return [
+        {
+            "account_id": a.id,
+            "name": a.name,
+            "balance": balance[i],
+            "goal_amount": goal[i],
+            "goal_date": a.goal_date,
+            "goal_frequency": a.goal_frequency,
+            "remaining": round(float(remaining[i]), 2),
+            "periods_left": int(periods_left[i]),
+            "required_per_period": round(float(remaining[i] / periods_left[i]), 2),
+            "trailing_per_period": round(float(rate[i] * period[i]), 2),
+            "projected_date": today + timedelta(days=int(days_needed[i])) if np.isfinite(days_needed[i]) else None,
+            "on_track": bool(on_track[i]),
+        }
+        for i, a in enumerate(accounts)
+    ]
+
+
+def _projections_for(db: Session, user_id: str, window_days: int) -> dict:
+    A = models.Account
+    today = datetime.utcnow().date()
+    accounts = db.execute(
+        select(A.id, A.name, A.balance, A.goal_amount, A.goal_date, A.goal_frequency, A.version)
+        .where(and_(A.user_id == user_id, A.status == 'active', A.goal_amount.is_not(None), A.goal_date.is_not(None)))
+        .order_by(A.goal_date, A.id)
+    ).all()
+
+    results, stale = {}, []
+    for a in accounts:
+        cached = _projections.get(a.id)
+        if cached is not None and cached[:3] == (a.version, today, window_days):
+            results[a.id] = cached[3]
+        else:
+            stale.append(a)
+    if stale:
+        for a, projection in zip(stale, _project(db, stale, today, window_days)):
+            _projections.set(a.id, (a.version, today, window_days, projection))
+            results[a.id] = projection
+    return {"as_of": today, "window_days": window_days, "goals": [results[a.id] for a in accounts]}
+
+
+@router.get('/projections', response_model=schemas.GoalProjections)
+async def goal_projections(
+    window_days: int = Query(90, ge=7, le=730),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """Required contribution, projected completion and on-track status for every goal.
+
+    The projection extrapolates the net amount saved into each account over the
+    last `window_days` (from the daily rollups). Accounts whose version has not
+    changed since their last projection today are served from memory.
+    """
+    return await db.run_sync(_projections_for, current_user.id, window_days)
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from .. import schemas, models, jobs
+from ..database import get_db
+from ..dependencies import Principal, get_current_principal
+from .transactions import _owned_accounts
+
+
+router = APIRouter()
+
+
+@router.post('/', response_model=schemas.Job, status_code=202)
+async def create_job(
+    payload: schemas.JobCreate,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """Close, restore or delete many accounts in the background; poll the Location for progress."""
+    if payload.kind == 'close_accounts' and not payload.reason:
+        raise HTTPException(status_code=400, detail='reason required for close_accounts')
+    await db.run_sync(_owned_accounts, current_user.id, set(payload.account_ids))
+    job = await db.run_sync(jobs.create, current_user.id, payload.kind, payload.account_ids, payload.reason)
+    await db.commit()
+    await db.refresh(job)
+    jobs.start(job.id)
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job
+
+
+@router.get('/', response_model=List[schemas.Job])
+async def list_jobs(db: AsyncSession = Depends(get_db), current_user: Principal = Depends(get_current_principal)):
+    J = models.Job
+    return (await db.scalars(
+        select(J).where(J.user_id == current_user.id).order_by(J.created_at.desc()).limit(50)
+    )).all()
+
+
+@router.get('/{job_id}', response_model=schemas.Job)
+async def get_job(job_id: str, db: AsyncSession = Depends(get_db), current_user: Principal = Depends(get_current_principal)):
+    job = await db.get(models.Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail='Job not found')
+    if job.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return job
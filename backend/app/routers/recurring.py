@@ -0,0 +1,114 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from .. import schemas, models, recurring
+from ..database import get_db
+from ..dependencies import Principal, get_current_principal
+from .transactions import _owned_accounts
+
+
+router = APIRouter()
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Stored naive, like every other timestamp; the scheduler compares against utcnow()
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+async def _owned_rule(db: AsyncSession, rule_id: str, user_id: str) -> models.RecurringRule:
+    rule = await db.get(models.RecurringRule, rule_id)
+    if not rule:
+        raise HTTPException(status_code=404, detail='Recurring rule not found')
+    if rule.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return rule
+
+
+@router.get('/', response_model=List[schemas.RecurringRule])
+async def list_rules(db: AsyncSession = Depends(get_db), current_user: Principal = Depends(get_current_principal)):
+    R = models.RecurringRule
+    return (await db.scalars(select(R).where(R.user_id == current_user.id).order_by(R.next_run, R.id))).all()
+
+
+@router.post('/', response_model=schemas.RecurringRule, status_code=201)
+async def create_rule(
+    payload: schemas.RecurringRuleCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """Define a recurring transaction; the scheduler posts it from `start_date` on.
+
+    A start date in the past is caught up on the scheduler's next run.
+    """
+    if payload.type in ('deposit', 'withdrawal') and not payload.account_id:
+        raise HTTPException(status_code=400, detail='account_id required for deposit/withdrawal')
+    if payload.type == 'transfer' and not (payload.from_account_id and payload.to_account_id):
+        raise HTTPException(status_code=400, detail='from_account_id and to_account_id required for transfer')
+    if await db.get(models.RecurringRule, payload.id):
+        raise HTTPException(status_code=409, detail='Recurring rule id already exists')
+    account_ids = {a for a in (payload.account_id, payload.from_account_id, payload.to_account_id) if a}
+    await db.run_sync(_owned_accounts, current_user.id, account_ids)
+
+    start = _utc(payload.start_date) or datetime.utcnow()
+    rule = models.RecurringRule(
+        id=payload.id,
+        user_id=current_user.id,
+        type=payload.type,
+        amount=payload.amount,
+        description=payload.description,
+        account_id=payload.account_id,
+        from_account_id=payload.from_account_id,
+        to_account_id=payload.to_account_id,
+        cadence=payload.cadence,
+        start_date=start,
+        end_date=_utc(payload.end_date),
+        runs=0,
+        next_run=start,
+        status='active',
+    )
+    db.add(rule)
+    await db.commit()
+    await db.refresh(rule)
+    return rule
+
+
+@router.patch('/{rule_id}', response_model=schemas.RecurringRule)
+async def update_rule(
+    rule_id: str,
+    payload: schemas.RecurringRuleUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """Change a rule's amount, description or end date, or pause/resume it.
+
+    Resuming skips the occurrences that fell while the rule was not active.
+    """
+    rule = await _owned_rule(db, rule_id, current_user.id)
+    changes = payload.dict(exclude_unset=True)
+    status = changes.pop('status', None)
+    if 'end_date' in changes:
+        changes['end_date'] = _utc(changes['end_date'])
+    for field, value in changes.items():
+        setattr(rule, field, value)
+    if status == 'active' and rule.status != 'active':
+        rule.runs, rule.next_run = recurring.fast_forward(rule, datetime.utcnow())
+        rule.status, rule.paused_reason = 'active', None
+    elif status == 'paused' and rule.status == 'active':
+        rule.status = 'paused'
+    await db.commit()
+    await db.refresh(rule)
+    return rule
+
+
+@router.delete('/{rule_id}', status_code=204)
+async def delete_rule(rule_id: str, db: AsyncSession = Depends(get_db), current_user: Principal = Depends(get_current_principal)):
+    """Stop the rule; transactions it already posted are kept."""
+    rule = await _owned_rule(db, rule_id, current_user.id)
+    await db.delete(rule)
+    await db.commit()
+    return None
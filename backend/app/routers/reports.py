@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Literal, Optional
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from .. import schemas, models, rollups
+from ..database import get_db
+from ..dependencies import Principal, get_current_principal
+
+
+router = APIRouter()
+
+MAX_POINTS = 1000
+
+
+def _timeseries(db: Session, user_id: str, granularity: str, start: date, end: date, account_id: Optional[str]) -> dict:
+    A, R = models.Account, models.AccountRollup
+
+    # Closing balance of each account going into the window: one PK seek per account
+    opening = (
+        select(R.closing_balance)
+        .where(R.account_id == A.id, R.period == granularity, R.period_start < start)
+        .order_by(R.period_start.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    accounts = select(A.id, opening).where(A.user_id == user_id)
+    rows = select(R).where(R.user_id == user_id, R.period == granularity, R.period_start.between(start, end))
+    if account_id:
+        accounts = accounts.where(A.id == account_id)
+        rows = rows.where(R.account_id == account_id)
+
+    last = {acc: Decimal(str(closing or 0)) for acc, closing in db.execute(accounts)}
+    by_period = {}
+    for r in db.scalars(rows.order_by(R.period_start)):
+        by_period.setdefault(r.period_start, []).append(r)
+
+    balance = sum(last.values(), Decimal(0))
+    points, cursor = [], start
+    while cursor <= end:
+        point = {"period_start": cursor}
+        for r in by_period.get(cursor, ()):
+            for column in rollups.FLOW_COLUMNS:
+                point[column] = point.get(column, 0) + float(getattr(r, column))
+            closing = Decimal(str(r.closing_balance))
+            balance += closing - last.get(r.account_id, Decimal(0))
+            last[r.account_id] = closing
+        point["net"] = (point.get("deposits", 0) + point.get("transfers_in", 0) + point.get("adjustments", 0)
+                        - point.get("withdrawals", 0) - point.get("transfers_out", 0))
+        point["balance"] = float(balance)
+        points.append(point)
+        cursor = rollups.next_period(granularity, cursor)
+    return {"granularity": granularity, "start": start, "end": end, "points": points}
+
+
+@router.get('/timeseries', response_model=schemas.Timeseries)
+async def timeseries(
+    granularity: Literal['day', 'month'] = 'month',
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    account_id: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """Flows and closing balances per day or month, read only from the rollups.
+
+    Cost depends on the window and the number of accounts, not on how much
+    history precedes the window.
+    """
+    end = rollups.period_start(granularity, end or datetime.utcnow().date())
+    if start is None:
+        # Last 31 days or last 12 months
+        start = end - timedelta(days=30)
+        if granularity == 'month':
+            start = end
+            for _ in range(11):
+                start = (start - timedelta(days=1)).replace(day=1)
+    start = rollups.period_start(granularity, start)
+    if start > end:
+        raise HTTPException(status_code=400, detail='start must not be after end')
+    days = (end - start).days
+    if (days if granularity == 'day' else days // 28) >= MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f'At most {MAX_POINTS} points per request')
+    return await db.run_sync(_timeseries, current_user.id, granularity, start, end, account_id)
@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Optional
+import base64, json
+
+from .. import schemas, models
+from ..database import get_db
+from ..dependencies import Principal, get_current_principal
+
+
+router = APIRouter()
+
+
+# Cursor state: {"v": synced version} or, mid-way through a round,
+# {"v": base, "u": version the round ends at, "k": [version, id] of the last transaction sent}
+def _encode(state: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(',', ':')).encode()).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> dict:
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        int(state["v"])
+        return state
+    except Exception:
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+
+
+def _changes(db: Session, user_id: str, since: Optional[dict], limit: int) -> dict:
+    U, A, T, D = models.User, models.Account, models.Transaction, models.Tombstone
+    current = db.scalar(select(U.data_version).where(U.id == user_id)) or 0
+
+    if since is None:
+        # Bootstrap: every account plus a cursor to poll from; transaction
+        # history is read through the paginated listing instead
+        accounts = db.scalars(select(A).where(A.user_id == user_id)).all()
+        return {"accounts": accounts, "cursor": _encode({"v": current})}
+
+    base, upto, key = since["v"], since.get("u", current), since.get("k")
+    if base > current:
+        raise HTTPException(status_code=410, detail='Cursor is ahead of the server; sync again without since')
+
+    result = {}
+    if key is None:
+        # First page of a round: accounts and deletes are small, send them whole
+        result["accounts"] = db.scalars(
+            select(A).where(A.user_id == user_id, A.version > base, A.version <= upto)
+        ).all()
+        deleted = {"accounts": [], "transactions": []}
+        for entity, entity_id in db.execute(
+            select(D.entity, D.entity_id)
+            .where(D.user_id == user_id, D.version > base, D.version <= upto)
+            .order_by(D.id)
+        ):
+            deleted[entity + "s"].append(entity_id)
+        result["deleted"] = deleted
+        after = T.version > base
+    else:
+        after = or_(T.version > key[0], and_(T.version == key[0], T.id > key[1]))
+
+    txs = db.scalars(
+        select(T)
+        .where(T.user_id == user_id, after, T.version <= upto)
+        .order_by(T.version, T.id)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(txs) > limit
+    txs = txs[:limit]
+    result["transactions"] = txs
+    result["has_more"] = has_more
+    result["cursor"] = _encode(
+        {"v": base, "u": upto, "k": [txs[-1].version, txs[-1].id]} if has_more else {"v": upto}
+    )
+    return result
+
+
+@router.get('', response_model=schemas.SyncChanges)
+async def sync_changes(
+    since: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=5000),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """Accounts and transactions changed after `since`, plus ids deleted since then.
+
+    Without `since`, returns every account and a cursor for the current state.
+    Clients apply `deleted` before upserting `accounts`/`transactions`, then
+    call again with the returned cursor; `has_more` means the round is not
+    finished yet.
+    """
+    state = _decode(since) if since else None
+    return await db.run_sync(_changes, current_user.id, state, limit)
@@ -1,28 +1,131 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Optional, Literal
 from datetime import datetime
+import io, tempfile
 
-from .. import schemas, models
-from decimal import Decimal
-from ..database import get_db
-from ..dependencies import get_current_user
-
-# Type hints
-from ..models import User
+from .. import schemas, models, queries, ledger, importer, exporter, archive, search, versions, fastjson
+from ..database import SessionLocal, get_db
+from ..dependencies import Principal, conditional_get, get_current_principal
 
 
 router = APIRouter()
 
 
-@router.get('/', response_model=List[schemas.Transaction])
-def list_transactions(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return db.query(models.Transaction).filter(models.Transaction.user_id == current_user.id).all()
+@router.get('/', response_model=schemas.TransactionPage, dependencies=[Depends(conditional_get)])
+async def list_transactions(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    account_id: Optional[str] = None,
+    tx_type: Optional[Literal['deposit', 'withdrawal', 'transfer']] = Query(None, alias='type'),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """Newest-first page of the user's transactions, keyed on (date, id).
+
+    Plain columns encoded directly; the response_model documents the shape.
+    Pages reaching past the archive watermark are completed from the archive.
+    """
+    def build(T):
+        criteria = [T.user_id == current_user.id]
+        if tx_type:
+            criteria.append(T.type == tx_type)
+        if start:
+            criteria.append(T.date >= start)
+        if end:
+            criteria.append(T.date < end)
+        if cursor:
+            criteria.append(queries.before_cursor(cursor, T))
+        if account_id:
+            return queries.account_transactions_page(account_id, *criteria, limit=limit + 1, T=T)
+        return (
+            select(*queries.columns(T, queries.TRANSACTION_FIELDS))
+            .where(*criteria).order_by(T.date.desc(), T.id.desc()).limit(limit + 1)
+        )
+
+    rows = (await db.execute(build(models.Transaction))).all()
+    if archive.enabled():
+        rows = await run_in_threadpool(archive.extend, rows, limit, build)
+    next_cursor = queries.encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return fastjson.respond({"items": fastjson.rows(rows[:limit]), "next_cursor": next_cursor}, response)
+
+
+def _import(user_id, lines, fmt, account_id, chunk_size):
+    with SessionLocal() as db:
+        return importer.import_stream(db, user_id, lines, fmt, account_id, chunk_size)
+
+
+@router.post('/bulk', response_model=schemas.ImportResult)
+async def bulk_import(
+    request: Request,
+    fmt: Literal['csv', 'ofx'] = Query('csv', alias='format'),
+    account_id: Optional[str] = None,
+    chunk_size: int = Query(1000, ge=1, le=2000),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """Import a raw CSV or OFX request body in chunks.
+
+    The body is spooled (to disk past 1 MiB) rather than held in memory, then
+    parsed and written chunk by chunk on a worker thread with its own sync
+    session, keeping the CPU-bound parsing off the event loop.
+    """
+    if fmt == 'ofx' and not account_id:
+        raise HTTPException(status_code=400, detail='account_id required for OFX imports')
+    with tempfile.SpooledTemporaryFile(max_size=1 << 20) as spool:
+        async for part in request.stream():
+            spool.write(part)
+        spool.seek(0)
+        lines = io.TextIOWrapper(spool, encoding='utf-8-sig', newline='')
+        return await run_in_threadpool(_import, current_user.id, lines, fmt, account_id, chunk_size)
+
+
+@router.get('/export')
+async def export_transactions(
+    fmt: Literal['ndjson', 'csv'] = Query('ndjson', alias='format'),
+    gzip: bool = False,
+    current_user: Principal = Depends(get_current_principal),
+):
+    """Stream the user's whole history, oldest first, as NDJSON or CSV (optionally gzipped)."""
+    filename = f"transactions.{fmt}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        exporter.export(current_user.id, fmt, gzip),
+        media_type="application/gzip" if gzip else exporter.CONTENT_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
-@router.get('/{tx_id}', response_model=schemas.Transaction)
-def get_transaction(tx_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    tx = db.query(models.Transaction).get(tx_id)
+@router.get('/search', response_model=schemas.TransactionSearch)
+async def search_transactions(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    """Best-ranked transactions whose description matches `q`.
+
+    Words are matched first (the last one as a prefix, so it works while
+    typing); when nothing matches, a trigram search tolerates typos.
+    `mode` says which one answered.
+    """
+    page = await db.run_sync(search.search, current_user.id, q, limit, cursor)
+    return fastjson.respond(page, response)
+
+
+@router.get('/{tx_id}', response_model=schemas.Transaction, dependencies=[Depends(conditional_get)])
+async def get_transaction(tx_id: str, db: AsyncSession = Depends(get_db), current_user: Principal = Depends(get_current_principal)):
+    tx = await db.get(models.Transaction, tx_id)
+    if not tx and archive.enabled():
+        tx = await run_in_threadpool(archive.get, tx_id)
     if not tx:
         raise HTTPException(status_code=404, detail='Transaction not found')
     if tx.user_id != current_user.id:
@@ -30,21 +133,23 @@ def get_transaction(tx_id: str, db: Session = Depends(get_db), current_user: Use
     return tx
 
 
-@router.post('/', response_model=schemas.Transaction, status_code=201)
-def create_transaction(
-    payload: schemas.TransactionCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
-    if db.query(models.Transaction).get(payload.id):
-        raise HTTPException(status_code=409, detail='Transaction id exists')
+def _owned_accounts(db: Session, user_id: str, account_ids) -> None:
+    """One query for every referenced account.
 
-    # Validate relationships
-    if payload.type in ('deposit', 'withdrawal') and not payload.account_id:
-        raise HTTPException(status_code=400, detail='account_id required for deposit/withdrawal')
-    if payload.type == 'transfer' and not (payload.from_account_id and payload.to_account_id):
-        raise HTTPException(status_code=400, detail='from_account_id and to_account_id required for transfer')
+    404 if any is missing, 403 if any is not the user's, 409 if a delete job
+    is tearing any of them down.
+    """
+    A = models.Account
+    rows = db.execute(select(A.id, A.user_id, A.status).where(A.id.in_(account_ids))).all()
+    if len(rows) < len(account_ids):
+        raise HTTPException(status_code=404, detail='Account not found')
+    if any(row.user_id != user_id for row in rows):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if any(row.status == 'deleting' for row in rows):
+        raise HTTPException(status_code=409, detail='Account is being deleted')
 
+
+def _create(db: Session, user_id: str, payload: schemas.TransactionCreate) -> schemas.Transaction:
     tx = models.Transaction(
         id=payload.id,
         date=payload.date or datetime.utcnow(),
@@ -54,79 +159,76 @@ def create_transaction(
         account_id=payload.account_id,
         from_account_id=payload.from_account_id,
         to_account_id=payload.to_account_id,
-        user_id=current_user.id,
+        user_id=user_id,
     )
+    _owned_accounts(db, user_id, {acc for acc, _, _ in ledger.legs(tx)})
+    if archive.existing([tx.id]):
+        raise HTTPException(status_code=409, detail='Transaction id exists')
+
+    # Version first, so the INSERT and the balance UPDATEs carry it without a second write
+    version = versions.touch(db, user_id, tx)
     db.add(tx)
+    try:
+        db.flush()
+    except IntegrityError:
+        # Primary key conflict; the caller's session is rolled back on close
+        raise HTTPException(status_code=409, detail='Transaction id exists')
+    ledger.post(db, tx, version=version)
+    # Built before commit: nothing is expired, so no refresh round trip
+    return schemas.Transaction.model_validate(tx)
+
+
+def _delete(db: Session, user_id: str, tx_id: str) -> None:
+    T, A = models.Transaction, models.Account
+    owned = (T.id == tx_id, T.user_id == user_id)
+    if db.get_bind().dialect.delete_returning:
+        tx = db.execute(
+            delete(T).where(*owned).returning(*T.__table__.c).execution_options(synchronize_session=False)
+        ).first()
+    else:
+        tx = db.execute(select(T.__table__).where(*owned)).first()
+        if tx is not None:
+            db.execute(delete(T).where(*owned).execution_options(synchronize_session=False))
+    if tx is None:
+        # Only the failure path pays for telling missing, archived and foreign apart
+        owner = db.scalar(select(T.user_id).where(T.id == tx_id))
+        archived = archive.get(tx_id) if owner is None else None
+        if archived is not None and archived.user_id == user_id:
+            raise HTTPException(status_code=409, detail='Transaction is archived and read-only')
+        if owner is None and archived is None:
+            raise HTTPException(status_code=404, detail='Transaction not found')
+        raise HTTPException(status_code=403, detail="Forbidden")
 
-    amt = Decimal(str(tx.amount))
-
-    zero = Decimal('0')
-
-    # Adjust balances
-    if tx.type == 'deposit' and tx.account_id:
-        acc = db.query(models.Account).get(tx.account_id)
-        acc.balance = (acc.balance or zero) + amt
-        acc.last_tx_date = tx.date
-    elif tx.type == 'withdrawal' and tx.account_id:
-        acc = db.query(models.Account).get(tx.account_id)
-        acc.balance = (acc.balance or zero) - amt
-        acc.last_tx_date = tx.date
-    elif tx.type == 'transfer' and tx.from_account_id and tx.to_account_id:
-        from_acc = db.query(models.Account).get(tx.from_account_id)
-        to_acc = db.query(models.Account).get(tx.to_account_id)
-        from_acc.balance = (from_acc.balance or zero) - amt
-        to_acc.balance = (to_acc.balance or zero) + amt
-        from_acc.last_tx_date = tx.date
-        to_acc.last_tx_date = tx.date
-
-    db.commit()
-    db.refresh(tx)
-    return tx
+    version = versions.touch(db, user_id, deleted={'transaction': [tx_id]})
+    for account_id in ledger.reverse(db, tx, version=version):
+        db.execute(
+            update(A)
+            .where(A.id == account_id)
+            .values(last_tx_date=queries.latest_transaction_date(account_id).scalar_subquery())
+            .execution_options(synchronize_session=False)
+        )
 
 
-@router.delete('/{tx_id}', status_code=204)
-def delete_transaction(tx_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    tx = db.query(models.Transaction).get(tx_id)
-    if not tx:
-        raise HTTPException(status_code=404, detail='Transaction not found')
-    if tx.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Forbidden")
+@router.post('/', response_model=schemas.Transaction, status_code=201)
+async def create_transaction(
+    payload: schemas.TransactionCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+):
+    # Validate relationships
+    if payload.type in ('deposit', 'withdrawal') and not payload.account_id:
+        raise HTTPException(status_code=400, detail='account_id required for deposit/withdrawal')
+    if payload.type == 'transfer' and not (payload.from_account_id and payload.to_account_id):
+        raise HTTPException(status_code=400, detail='from_account_id and to_account_id required for transfer')
 
-    amt = Decimal(str(tx.amount))
-    zero = Decimal('0')
-
-    # Reverse balances & recompute last_tx_date
-    affected_ids = []
-    if tx.type == 'deposit' and tx.account_id:
-        acc = db.query(models.Account).get(tx.account_id)
-        acc.balance = (acc.balance or zero) - amt
-        affected_ids.append(acc.id)
-    elif tx.type == 'withdrawal' and tx.account_id:
-        acc = db.query(models.Account).get(tx.account_id)
-        acc.balance = (acc.balance or zero) + amt
-        affected_ids.append(acc.id)
-    elif tx.type == 'transfer' and tx.from_account_id and tx.to_account_id:
-        from_acc = db.query(models.Account).get(tx.from_account_id)
-        to_acc = db.query(models.Account).get(tx.to_account_id)
-        from_acc.balance = (from_acc.balance or zero) + amt
-        to_acc.balance = (to_acc.balance or zero) - amt
-        affected_ids.extend([from_acc.id, to_acc.id])
-
-    # Delete and commit first to free row
-    db.delete(tx)
-    db.commit()
-
-    # Recompute last_tx_date for affected accounts
-    for acc_id in set(affected_ids):
-        latest = db.query(models.Transaction.date).filter(
-            (models.Transaction.account_id == acc_id) |
-            (models.Transaction.from_account_id == acc_id) |
-            (models.Transaction.to_account_id == acc_id)
-        ).order_by(models.Transaction.date.desc()).first()
-        acc = db.query(models.Account).get(acc_id)
-        acc.last_tx_date = latest[0] if latest else None
-
-    db.commit()
-    return None
+    tx = await db.run_sync(_create, current_user.id, payload)
+    await db.commit()
+    return tx
 
 
+@router.delete('/{tx_id}', status_code=204)
+async def delete_transaction(tx_id: str, db: AsyncSession = Depends(get_db), current_user: Principal = Depends(get_current_principal)):
+    # Delete, reverse balances and recompute last_tx_date in one commit
+    await db.run_sync(_delete, current_user.id, tx_id)
+    await db.commit()
+    return None
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, Literal
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional, Literal
 from datetime import datetime, date
 
 
@@ -71,6 +71,127 @@ class Transaction(TransactionBase):
         from_attributes = True
 
 
+class TransactionPage(BaseModel):
+    items: List[Transaction]
+    next_cursor: Optional[str] = None
+
+
+class TransactionSearch(TransactionPage):
+    mode: Literal['words', 'fuzzy', 'like']
+
+
+class RecurringRuleBase(BaseModel):
+    type: Literal['deposit','withdrawal','transfer']
+    amount: float
+    description: str
+    account_id: Optional[str] = None
+    from_account_id: Optional[str] = None
+    to_account_id: Optional[str] = None
+    cadence: Literal['daily','weekly','monthly']
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
+
+class RecurringRuleCreate(RecurringRuleBase):
+    id: str
+
+
+class RecurringRuleUpdate(BaseModel):
+    amount: Optional[float] = None
+    description: Optional[str] = None
+    end_date: Optional[datetime] = None
+    status: Optional[Literal['active','paused']] = None
+
+
+class RecurringRule(RecurringRuleBase):
+    id: str
+    start_date: datetime
+    runs: int
+    next_run: Optional[datetime] = None
+    status: str
+    paused_reason: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ImportRowError(BaseModel):
+    row: int
+    detail: str
+
+
+class ImportResult(BaseModel):
+    imported: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    errors: List[ImportRowError] = []  # first few rejected rows only
+
+
+class StashTotal(BaseModel):
+    stash_type: str
+    total: float
+    accounts: int
+
+
+class GoalProgress(BaseModel):
+    account_id: str
+    name: str
+    balance: float
+    goal_amount: float
+    goal_date: date
+    goal_frequency: Optional[str] = None
+    progress: float  # 0..1
+    remaining: float
+    per_period: float  # to save each goal_frequency period to hit the goal on time
+    catch_up: float  # owed for periods missed since the last transaction
+    on_track: bool
+
+
+class MonthlyFlow(BaseModel):
+    month: str  # YYYY-MM
+    inflow: float
+    outflow: float
+
+
+class DashboardSummary(BaseModel):
+    net_worth: float
+    stash_totals: List[StashTotal]
+    goals: List[GoalProgress]
+    recent: List[Transaction]
+    monthly: List[MonthlyFlow]
+
+
+class TimeseriesPoint(BaseModel):
+    period_start: date
+    deposits: float = 0
+    withdrawals: float = 0
+    transfers_in: float = 0
+    transfers_out: float = 0
+    adjustments: float = 0
+    net: float = 0
+    balance: float  # closing balance across the selected accounts
+
+
+class Timeseries(BaseModel):
+    granularity: Literal['day', 'month']
+    start: date
+    end: date
+    points: List[TimeseriesPoint]
+
+
+class SyncDeleted(BaseModel):
+    accounts: List[str] = []
+    transactions: List[str] = []
+
+
+class SyncChanges(BaseModel):
+    accounts: List[Account] = []
+    transactions: List[Transaction] = []
+    deleted: SyncDeleted = SyncDeleted()
+    cursor: str  # pass back as ?since= to get the next changes
+    has_more: bool = False
+
+
 class UserBase(BaseModel):
     first_name: str
     last_name: str
@@ -86,6 +207,11 @@ class UserLogin(BaseModel):
     password: str
 
 
+class PasswordChange(BaseModel):
+    current_password: str
+    new_password: str
+
+
 class UserOut(UserBase):
     id: str
 
@@ -103,3 +229,70 @@ class AccountClose(BaseModel):
     reason: str
 
 
+
+
+class JobCreate(BaseModel):
+    kind: Literal['close_accounts', 'restore_accounts', 'delete_accounts']
+    account_ids: List[str] = Field(..., min_length=1, max_length=1000)
+    reason: Optional[str] = None  # closed_reason for close_accounts
+
+
+class Job(BaseModel):
+    id: str
+    kind: str
+    status: str
+    total: int
+    done: int
+    rows: int
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class BatchOp(BaseModel):
+    op: Literal['create', 'update', 'delete', 'close', 'restore']
+    entity: Literal['account', 'transaction']
+    id: str
+    data: Dict[str, Any] = {}  # the body the single-item endpoint would take, without id
+
+
+class BatchRequest(BaseModel):
+    ops: List[BatchOp] = Field(..., min_length=1, max_length=500)
+
+
+class BatchResult(BaseModel):
+    op: str
+    entity: str
+    id: str
+    account: Optional[Account] = None  # state after the whole batch
+    transaction: Optional[Transaction] = None
+    job: Optional[Job] = None  # account deletes too large for the batch's transaction
+
+
+class BatchResponse(BaseModel):
+    results: List[BatchResult]
+
+
+class GoalProjection(BaseModel):
+    account_id: str
+    name: str
+    balance: float
+    goal_amount: float
+    goal_date: date
+    goal_frequency: Optional[str] = None
+    remaining: float
+    periods_left: int
+    required_per_period: float  # to save each goal_frequency period to finish on time
+    trailing_per_period: float  # net saved per period at the trailing rate
+    projected_date: Optional[date] = None  # None when the trailing rate is not positive
+    on_track: bool
+
+
+class GoalProjections(BaseModel):
+    as_of: date
+    window_days: int
+    goals: List[GoalProjection]
@@ -0,0 +1,181 @@
+"""Full-text search over transaction descriptions.
+
+On SQLite two FTS5 tables mirror `transactions.description`: one tokenized on
+words (bm25-ranked, prefix match on the last term) and one on trigrams, used
+as a fuzzy fallback when the words find nothing, so typos and partial words
+still match. Triggers on `transactions` keep both in step with every insert,
+update and delete in the same DB transaction, whichever code path writes the
+row (ORM handlers, the bulk importer, account deletes).
+
+Each row also carries `owner` (the hex of its user id) as an indexed column,
+so a query only walks the posting lists of the caller's rows. The FTS rowid
+is the transaction's rowid; after a VACUUM run `python -m app.cli
+rebuild-search`. Other backends fall back to a LIKE scan of the user's rows.
+"""
+from typing import Optional
+import logging, re
+
+from fastapi import HTTPException
+from sqlalchemy import inspect, select, text
+from sqlalchemy.orm import Session
+
+from . import models, queries
+
+logger = logging.getLogger(__name__)
+
+WORDS = "transactions_fts"
+TRIGRAMS = "transactions_fts_trigram"
+TABLES = {WORDS: "unicode61 remove_diacritics 2", TRIGRAMS: "trigram"}
+MAX_FUZZY = 500  # trigram candidates re-ranked by similarity
+MIN_SIMILARITY = 0.3  # share of the query's trigrams a fuzzy hit must contain
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _triggers() -> list:
+    columns = "rowid, description, owner, tx_id"
+    new = "new.rowid, new.description, hex(new.user_id), new.id"
+    insert = " ".join(f"INSERT INTO {t}({columns}) VALUES ({new});" for t in TABLES)
+    delete = " ".join(f"DELETE FROM {t} WHERE rowid = old.rowid;" for t in TABLES)
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS transactions_fts_ai AFTER INSERT ON transactions BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS transactions_fts_ad AFTER DELETE ON transactions BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS transactions_fts_au AFTER UPDATE OF description, user_id ON transactions "
+        f"BEGIN {delete} {insert} END",
+    ]
+
+
+def _fill(conn) -> None:
+    for table in TABLES:
+        conn.execute(text(
+            f"INSERT INTO {table}(rowid, description, owner, tx_id) "
+            f"SELECT rowid, description, hex(user_id), id FROM transactions"
+        ))
+
+
+def ensure_index(bind) -> None:
+    """Create the FTS tables and triggers if missing, filling new tables from `transactions`."""
+    if bind.dialect.name != "sqlite":
+        return
+    existing = set(inspect(bind).get_table_names())
+    try:
+        with bind.begin() as conn:
+            for table, tokenizer in TABLES.items():
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} "
+                    f"USING fts5(description, owner, tx_id UNINDEXED, tokenize='{tokenizer}')"
+                ))
+            for ddl in _triggers():
+                conn.execute(text(ddl))
+            if not existing.issuperset(TABLES):
+                _fill(conn)
+    except Exception as exc:  # SQLite built without FTS5 / trigram (< 3.34)
+        logger.warning("Transaction search index unavailable, falling back to LIKE: %s", exc)
+
+
+def rebuild(bind) -> int:
+    """Refill both FTS tables from `transactions`; returns the number of rows indexed."""
+    ensure_index(bind)
+    with bind.begin() as conn:
+        for table in TABLES:
+            conn.execute(text(f"DELETE FROM {table}"))
+        _fill(conn)
+        return conn.execute(text(f"SELECT count(*) FROM {WORDS}")).scalar_one()
+
+
+_available = None
+
+
+def available(db: Session) -> bool:
+    global _available
+    if _available is None:
+        bind = db.get_bind()
+        _available = bind.dialect.name == "sqlite" and WORDS in inspect(bind).get_table_names()
+    return _available
+
+
+def _trigrams(tokens) -> set:
+    return {t[i:i + 3] for t in tokens if len(t) >= 3 for i in range(len(t) - 2)}
+
+
+def _rows(db: Session, ids: list) -> list:
+    T = models.Transaction
+    if not ids:
+        return []
+    found = {r["id"]: r for r in (row._asdict() for row in db.execute(
+        select(*queries.columns(T, queries.TRANSACTION_FIELDS)).where(T.id.in_(ids))
+    ))}
+    return [found[i] for i in ids if i in found]
+
+
+def _words(db: Session, owner: str, tokens: list, limit: int, offset: int) -> list:
+    terms = [f'"{t}"' for t in tokens[:-1]] + [f'"{tokens[-1]}"*']
+    return db.execute(text(
+        f"SELECT tx_id FROM {WORDS} WHERE {WORDS} MATCH :match AND owner = :owner "
+        f"ORDER BY rank LIMIT :limit OFFSET :offset"
+    ), {"match": f'owner : "{owner}" AND description : ({" ".join(terms)})',
+        "owner": owner, "limit": limit, "offset": offset}).scalars().all()
+
+
+def _fuzzy(db: Session, owner: str, tokens: list) -> list:
+    grams = _trigrams(tokens)
+    if not grams:
+        return []
+    terms = " OR ".join(f'"{g}"' for g in sorted(grams))
+    rows = db.execute(text(
+        f"SELECT tx_id, description FROM {TRIGRAMS} WHERE {TRIGRAMS} MATCH :match AND owner = :owner "
+        f"ORDER BY rank LIMIT :limit"
+    ), {"match": f'owner : "{owner}" AND description : ({terms})',
+        "owner": owner, "limit": MAX_FUZZY}).all()
+    scored = []
+    for tx_id, description in rows:
+        score = len(grams & _trigrams(_TOKEN.findall(description.lower()))) / len(grams)
+        if score >= MIN_SIMILARITY:
+            scored.append((-score, tx_id))
+    return [tx_id for _, tx_id in sorted(scored)]
+
+
+def _like(db: Session, user_id: str, q: str, limit: int, offset: int) -> list:
+    T = models.Transaction
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return db.scalars(
+        select(T.id)
+        .where(T.user_id == user_id, T.description.ilike(f"%{escaped}%", escape="\\"))
+        .order_by(T.date.desc(), T.id.desc())
+        .limit(limit)
+        .offset(offset)
+    ).all()
+
+
+def _decode_cursor(cursor: str):
+    mode, _, offset = cursor.partition(":")
+    if mode not in ("words", "fuzzy", "like") or not offset.isdigit():
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+    return mode, int(offset)
+
+
+def search(db: Session, user_id: str, q: str, limit: int, cursor: Optional[str] = None) -> dict:
+    """A ranked page of the user's transactions matching `q`.
+
+    Word matches come first; only when there are none does the query go to the
+    trigram table. The cursor records which of the two a page came from.
+    """
+    mode, offset = _decode_cursor(cursor) if cursor else (None, 0)
+    tokens = [t.lower() for t in _TOKEN.findall(q)]
+    if not tokens:
+        return {"items": [], "next_cursor": None, "mode": mode or "words"}
+
+    if not available(db):
+        mode, ids = "like", _like(db, user_id, q.strip(), limit + 1, offset)
+    else:
+        owner = user_id.encode("utf-8").hex().upper()
+        ids = []
+        if mode in (None, "words"):
+            ids = _words(db, owner, tokens, limit + 1, offset)
+            mode = "words" if ids or mode else "fuzzy"
+        if mode == "fuzzy":
+            # Pages are cut from the bounded, re-ranked candidate list
+            ids = _fuzzy(db, owner, tokens)[offset:offset + limit + 1]
+
+    next_cursor = f"{mode}:{offset + limit}" if len(ids) > limit else None
+    return {"items": _rows(db, ids[:limit]), "next_cursor": next_cursor, "mode": mode}
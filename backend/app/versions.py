@@ -0,0 +1,79 @@
+"""Per-user data versions.
+
+Every write to a user's accounts or transactions bumps `users.data_version` in
+the same DB transaction, so the version (plus the user id) identifies exactly
+one state of everything the list/detail endpoints can return. The rows a write
+touches are stamped with the new version and deletes leave a tombstone, which
+is what `GET /sync` reads to hand out deltas.
+"""
+from datetime import datetime
+
+from sqlalchemy import insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from . import models, response_cache
+
+
+def bump(user_id: str):
+    """UPDATE ... RETURNING the user's incremented data version."""
+    U = models.User
+    return (
+        update(U)
+        .where(U.id == user_id)
+        .values(data_version=U.data_version + 1, data_modified_at=datetime.utcnow())
+        .returning(U.data_version)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def touch(db: Session, user_id: str, *objects, accounts=(), deleted=None) -> int:
+    """Bump the user's version and stamp everything this write changed with it.
+
+    `objects` are ORM rows (stamped on flush), `accounts` ids of accounts whose
+    balance moved, and `deleted` maps an entity name to the ids (a list or a
+    select of ids) about to be removed. The user's cached responses, and
+    those of the accounts named, are evicted on commit. Returns the new version.
+    """
+    version = db.execute(bump(user_id)).scalar_one()
+    for obj in objects:
+        obj.version = version
+    deleted_accounts = (deleted or {}).get('account', ())
+    response_cache.stale(db, users=[user_id], accounts=[
+        *accounts,
+        *(deleted_accounts if isinstance(deleted_accounts, (list, tuple, set)) else ()),
+        *(obj.id for obj in objects if isinstance(obj, models.Account)),
+    ])
+    if accounts:
+        A = models.Account
+        db.execute(
+            update(A)
+            .where(A.id.in_(list(accounts)))
+            .values(version=version)
+            .execution_options(synchronize_session=False)
+        )
+    now = datetime.utcnow()
+    for entity, ids in (deleted or {}).items():
+        _tombstone(db, user_id, entity, ids, version, now)
+    return version
+
+
+def _tombstone(db: Session, user_id, entity, ids, version, now) -> None:
+    T = models.Tombstone
+    if isinstance(ids, (list, tuple, set)):
+        if ids:
+            db.execute(insert(T.__table__), [
+                {"user_id": user_id, "entity": entity, "entity_id": i, "version": version, "deleted_at": now}
+                for i in ids
+            ])
+        return
+    sub = ids.subquery()
+    db.execute(
+        insert(T.__table__).from_select(
+            ["user_id", "entity", "entity_id", "version", "deleted_at"],
+            select(literal(user_id), literal(entity), sub.c[0], literal(version), literal(now)),
+        )
+    )
+
+
+def etag(user_id: str, version: int) -> str:
+    return f'W/"{user_id}.{version}"'
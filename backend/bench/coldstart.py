@@ -0,0 +1,73 @@
+"""Import-to-first-request time of a fresh worker process.
+
+    python -m bench.coldstart [--runs 10] [--migrate]
+
+Each run starts a new interpreter against an already-migrated SQLite file and
+reports, in milliseconds:
+  import   `import app.main` (module-level create_app included)
+  startup  the lifespan hook (settings, engine, optional DDL)
+  first    the first request, GET /health/db, which opens a connection
+  process  wall time of the whole child process, interpreter start included
+Medians over --runs are printed. --migrate runs the startup DDL check too
+(startup.migrate: true), which is what every worker did before it was optional.
+"""
+import argparse, json, os, statistics, subprocess, sys, tempfile, time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import asyncio, json, time
+import httpx  # the client is not part of the app's start-up cost
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+
+async def main():
+    application = app.main.app
+    async with application.router.lifespan_context(application):
+        t2 = time.perf_counter()
+        transport = httpx.ASGITransport(app=application)
+        async with httpx.AsyncClient(transport=transport, base_url="http://coldstart") as client:
+            response = await client.get("/health/db")
+        assert response.status_code == 200, response.text
+        t3 = time.perf_counter()
+    return t2, t3
+
+t2, t3 = asyncio.run(main())
+print(json.dumps({"import": t1 - t0, "startup": t2 - t1, "first": t3 - t2}))
+"""
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.coldstart")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--migrate", action="store_true", help="run the schema check at startup")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="money-saver-coldstart-")
+    settings = os.path.join(workdir, "settings.yaml")
+    with open(settings, "w", encoding="utf-8") as f:
+        f.write(f"startup:\n  migrate: {'true' if args.migrate else 'false'}\n")
+    env = {**os.environ, "MONEY_SAVER_SETTINGS": settings,
+           "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'coldstart.db')}"}
+    subprocess.run([sys.executable, "-m", "app.cli", "migrate"], cwd=BACKEND, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+
+    samples = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", CHILD], cwd=BACKEND, env=env, check=True,
+                             capture_output=True, text=True).stdout
+        sample = json.loads(out.strip().splitlines()[-1])
+        sample["process"] = time.perf_counter() - start
+        samples.append(sample)
+
+    print(f"{'phase':<8} {'median ms':>10} {'min ms':>8} {'max ms':>8}   ({args.runs} runs, migrate={args.migrate})")
+    for phase in ("import", "startup", "first", "process"):
+        values = [s[phase] * 1000 for s in samples]
+        print(f"{phase:<8} {statistics.median(values):>10.1f} {min(values):>8.1f} {max(values):>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""In-process load test of the real ASGI app.
+
+    python -m bench.load [--users 5] [--accounts 4] [--years 2] [--per-day 3]
+                         [--clients 8] [--requests 200] [--login-requests 20]
+                         [--async] [--db PATH] [--save FILE] [--baseline FILE] [--threshold 0.25]
+
+Seeds a throwaway SQLite file (or --db) with synthetic users, accounts and
+years of transactions, then drives `app.main.create_app()` through httpx's
+ASGI transport with --clients concurrent clients per scenario:
+
+  login               POST /auth/login (bcrypt bound; fewer requests)
+  list_accounts       GET /accounts/
+  list_transactions   GET /transactions/?limit=100
+  create_transaction  POST /transactions/      } one pair per iteration, so
+  delete_transaction  DELETE /transactions/id  } the seeded balances hold
+  delete_account      DELETE /accounts/id (each one freshly created with 20 transactions)
+
+Reports p50/p95/p99 latency, throughput and the mean query count (read from
+the Server-Timing header). --save writes the report as JSON; --baseline
+compares against a saved report and exits 1 when a scenario's p50/p95 grew by
+more than --threshold or it issues more queries than before.
+"""
+import argparse, asyncio, itertools, json, os, re, sys, tempfile, time, uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+_parser = argparse.ArgumentParser(prog="python -m bench.load")
+_parser.add_argument("--users", type=int, default=5)
+_parser.add_argument("--accounts", type=int, default=4, help="accounts per user")
+_parser.add_argument("--years", type=float, default=2, help="years of history per account")
+_parser.add_argument("--per-day", type=int, default=3, help="transactions per account per day")
+_parser.add_argument("--clients", type=int, default=8, help="concurrent clients per scenario")
+_parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+_parser.add_argument("--login-requests", type=int, default=20)
+_parser.add_argument("--async", dest="async_mode", action="store_true", help="run the app on aiosqlite")
+_parser.add_argument("--db", help="SQLite file to seed (default: a temporary file)")
+_parser.add_argument("--save", help="write the report to this JSON file")
+_parser.add_argument("--baseline", help="compare against a report saved with --save")
+_parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative latency growth")
+
+
+def _configure(args) -> str:
+    # Must run before any app import (app.config reads MONEY_SAVER_SETTINGS on import)
+    # and before database.init() builds the engine from DATABASE_URL
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix="money-saver-bench-"), "bench.db")
+    os.environ["MONEY_SAVER_SETTINGS"] = os.devnull
+    os.environ["DATABASE_URL"] = f"sqlite{'+aiosqlite' if args.async_mode else ''}:///{path}"
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return path
+
+
+PASSWORD = "bench-password"
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def seed(args) -> list:
+    """Users, accounts and history written straight through the ledger; returns the users."""
+    from sqlalchemy import insert
+    from app import auth, ledger, models
+    from app.database import SessionLocal, sync_schema
+
+    sync_schema()
+    password_hash = auth.hash_password(PASSWORD)
+    days = int(args.years * 365)
+    start = datetime.utcnow() - timedelta(days=days)
+    users = []
+    with SessionLocal() as db:
+        for u in range(args.users):
+            user_id = f"bench-{u}"
+            email = f"user{u}@bench.local"
+            db.execute(insert(models.User.__table__), [{"id": user_id, "first_name": "Bench", "last_name": str(u),
+                                                          "email": email, "password_hash": password_hash}])
+            account_ids = [f"{user_id}-a{a}" for a in range(args.accounts)]
+            db.execute(insert(models.Account.__table__), [
+                {"id": acc, "name": f"Account {a}", "type": "Checking", "balance": 0, "status": "active",
+                 "stash_type": "Bank", "user_id": user_id}
+                for a, acc in enumerate(account_ids)
+            ])
+            rows = []
+            for a, acc in enumerate(account_ids):
+                for n in range(days * args.per_day):
+                    date = start + timedelta(minutes=n * 1440 // args.per_day)
+                    row = {"id": f"{acc}-t{n}", "date": date, "amount": 1 + (n * 7919 % 50000) / 100,
+                           "description": f"bench {n}", "user_id": user_id,
+                           "account_id": None, "from_account_id": None, "to_account_id": None}
+                    if n % 10 == 9 and len(account_ids) > 1:
+                        row.update(type="transfer", from_account_id=acc, to_account_id=account_ids[(a + 1) % len(account_ids)])
+                    else:
+                        row.update(type="deposit" if n % 3 else "withdrawal", account_id=acc)
+                        if row["type"] == "deposit":
+                            row["amount"] *= 2
+                    rows.append(row)
+            for i in range(0, len(rows), 5000):
+                chunk = rows[i:i + 5000]
+                db.execute(insert(models.Transaction.__table__), chunk)
+                ledger.post_many(db, user_id, [SimpleNamespace(**r) for r in chunk])
+            db.commit()
+            users.append({"id": user_id, "email": email, "accounts": account_ids, "transactions": len(rows)})
+    return users
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+
+    async def call(self, name, client, method, url, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - start
+        match = SERVER_TIMING_QUERIES.search(response.headers.get("server-timing", ""))
+        self.samples.setdefault(name, []).append(
+            (elapsed, int(match.group(1)) if match else 0, response.status_code < 400)
+        )
+        return response
+
+
+async def run_scenario(scenario, clients: int, total: int, users: list, recorder: Recorder) -> float:
+    """Run `total` iterations across `clients` workers; returns the wall time."""
+    counter = itertools.count()
+
+    async def worker(w: int) -> None:
+        user = users[w % len(users)]
+        while next(counter) < total:
+            await scenario(user, recorder)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(clients)))
+    return time.perf_counter() - start
+
+
+def scenarios(client):
+    async def login(user, rec):
+        await rec.call("login", client, "POST", "/auth/login", data={"username": user["email"], "password": PASSWORD})
+
+    async def list_accounts(user, rec):
+        await rec.call("list_accounts", client, "GET", "/accounts/", headers=user["headers"])
+
+    async def list_transactions(user, rec):
+        await rec.call("list_transactions", client, "GET", "/transactions/", params={"limit": 100}, headers=user["headers"])
+
+    async def create_delete_transaction(user, rec):
+        tx_id = uuid.uuid4().hex
+        await rec.call("create_transaction", client, "POST", "/transactions/", headers=user["headers"], json={
+            "id": tx_id, "type": "deposit", "amount": 12.5, "description": "bench", "account_id": user["accounts"][0],
+        })
+        await rec.call("delete_transaction", client, "DELETE", f"/transactions/{tx_id}", headers=user["headers"])
+
+    async def delete_account(user, rec):
+        account_id = uuid.uuid4().hex
+        ops = [{"op": "create", "entity": "account", "id": account_id,
+                "data": {"name": "Doomed", "type": "Checking", "balance": 100}}]
+        ops += [{"op": "create", "entity": "transaction", "id": f"{account_id}-{n}",
+                 "data": {"type": "deposit", "amount": 1, "description": "bench", "account_id": account_id}}
+                for n in range(20)]
+        await client.post("/batch", json={"ops": ops}, headers=user["headers"])
+        await rec.call("delete_account", client, "DELETE", f"/accounts/{account_id}", headers=user["headers"])
+
+    return [
+        ("login", login, ["login"]),
+        ("list_accounts", list_accounts, ["list_accounts"]),
+        ("list_transactions", list_transactions, ["list_transactions"]),
+        ("create_delete_transaction", create_delete_transaction, ["create_transaction", "delete_transaction"]),
+        ("delete_account", delete_account, ["delete_account"]),
+    ]
+
+
+def percentile(ordered: list, q: float) -> float:
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))]
+
+
+def summarize(samples: list, wall: float) -> dict:
+    latencies = sorted(s[0] for s in samples)
+    return {
+        "n": len(samples),
+        "errors": sum(1 for s in samples if not s[2]),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "rps": round(len(samples) / wall, 1),
+        "queries": round(sum(s[1] for s in samples) / len(samples), 2),
+    }
+
+
+async def run(args, users) -> dict:
+    import httpx
+    from app import database
+    from app.main import create_app
+
+    app = create_app()
+    # Unhandled app errors come back as 500s and are counted, not raised
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for user in users:
+            r = await client.post("/auth/login", data={"username": user["email"], "password": PASSWORD})
+            user["headers"] = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        for name, scenario, recorded in scenarios(client):
+            recorder = Recorder()
+            total = args.login_requests if name == "login" else args.requests
+            wall = await run_scenario(scenario, args.clients, total, users, recorder)
+            for key in recorded:
+                results[key] = summarize(recorder.samples[key], wall)
+    if database.async_engine is not None:
+        # aiosqlite connections run on non-daemon threads; close them or exit hangs
+        await database.async_engine.dispose()
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    for name, now in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            if before[metric] and now[metric] > before[metric] * (1 + threshold):
+                regressions.append(f"{name}: {metric} {before[metric]} -> {now[metric]}")
+        if now["queries"] > before["queries"]:
+            regressions.append(f"{name}: queries {before['queries']} -> {now['queries']}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    args = _parser.parse_args(argv)
+    path = _configure(args)
+
+    t = time.perf_counter()
+    users = seed(args)
+    total_tx = sum(u["transactions"] for u in users)
+    print(f"seeded {len(users)} users, {len(users) * args.accounts} accounts, {total_tx} transactions "
+          f"in {time.perf_counter() - t:.1f}s ({path})")
+
+    results = asyncio.run(run(args, users))
+
+    print(f"{'scenario':<20} {'n':>5} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rps':>8} {'queries':>8}")
+    for name, r in results.items():
+        print(f"{name:<20} {r['n']:>5} {r['errors']:>4} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+              f"{r['p99_ms']:>9.2f} {r['rps']:>8.1f} {r['queries']:>8.2f}")
+
+    report = {"config": {k: v for k, v in vars(args).items() if k not in ("save", "baseline", "db")},
+              "results": results}
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"no regressions against {args.baseline} (threshold {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
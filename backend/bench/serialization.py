@@ -0,0 +1,90 @@
+"""Response-model path vs. plain-column fast path for transaction lists.
+
+    python -m bench.serialization [--rows 1000 10000 100000] [--repeat 3]
+
+Seeds an in-memory SQLite database, then for each row count times:
+  model: ORM entities -> response_model validation -> jsonable dict -> json.dumps
+         (what FastAPI does for `response_model=List[schemas.Transaction]`)
+  fast:  column select -> row dicts -> fastjson.dumps
+Both bodies are checked to be byte-identical before timing.
+"""
+import argparse, json, os, sys, time
+from datetime import datetime, timedelta
+from typing import List
+
+# Never touch the configured database; the models only need an importable engine
+os.environ.setdefault("MONEY_SAVER_SETTINGS", os.devnull)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app import fastjson, models, queries, schemas
+from app.database import Base
+
+
+def seed(engine, n: int) -> None:
+    Base.metadata.create_all(engine)
+    start = datetime(2020, 1, 1)
+    with Session(engine) as db:
+        db.execute(insert(models.User.__table__), [{"id": "u", "first_name": "B", "last_name": "M",
+                                                      "email": "bench@example.com", "password_hash": "x"}])
+        db.execute(insert(models.Account.__table__), [{"id": "a", "name": "A", "type": "Checking", "balance": 0,
+                                                         "status": "active", "stash_type": "Bank", "user_id": "u"}])
+        db.execute(insert(models.Transaction.__table__), [
+            {"id": f"t{i:07d}", "date": start + timedelta(minutes=i), "type": "deposit",
+             "amount": (i % 10000) / 100, "description": f"row {i}", "account_id": "a", "user_id": "u"}
+            for i in range(n)
+        ])
+        db.commit()
+
+
+def model_path(db, adapter) -> bytes:
+    T = models.Transaction
+    rows = db.scalars(select(T).where(T.user_id == "u").order_by(T.date.desc(), T.id.desc())).all()
+    validated = adapter.validate_python(rows, from_attributes=True)
+    content = adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(db) -> bytes:
+    T = models.Transaction
+    stmt = (select(*queries.columns(T, queries.TRANSACTION_FIELDS))
+            .where(T.user_id == "u").order_by(T.date.desc(), T.id.desc()))
+    return fastjson.dumps(fastjson.rows(db.execute(stmt)))
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return min(times)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.serialization")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    adapter = TypeAdapter(List[schemas.Transaction])
+    encoder = "orjson" if fastjson.orjson is not None else "json"
+    print(f"{'rows':>8} {'model ms':>10} {'fast ms':>10} {'speedup':>8}   (fast encoder: {encoder})")
+    for n in args.rows:
+        engine = create_engine("sqlite://")
+        seed(engine, n)
+        with Session(engine) as db:
+            assert model_path(db, adapter) == fast_path(db), "wire formats differ"
+            model = best_of(lambda: model_path(db, adapter), args.repeat)
+            fast = best_of(lambda: fast_path(db), args.repeat)
+        print(f"{n:>8} {model * 1000:>10.1f} {fast * 1000:>10.1f} {model / fast:>7.1f}x")
+        engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -91,3 +91,188 @@ BEGIN
     ALTER TABLE dbo.accounts ADD closed_reason NVARCHAR(500) NULL;
 END;
 GO
+
+-- Keyset pagination indexes for transaction listing (user, date, id)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'ix_transactions_user_date_id' AND object_id = OBJECT_ID(N'dbo.transactions'))
+BEGIN
+    CREATE INDEX ix_transactions_user_date_id ON dbo.transactions (user_id, [date], id);
+END;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'ix_transactions_user_type_date_id' AND object_id = OBJECT_ID(N'dbo.transactions'))
+BEGIN
+    CREATE INDEX ix_transactions_user_type_date_id ON dbo.transactions (user_id, [type], [date], id);
+END;
+GO
+
+-- Per-account-column indexes; "all transactions touching account X" is a UNION of three seeks
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'ix_transactions_account_date_id' AND object_id = OBJECT_ID(N'dbo.transactions'))
+BEGIN
+    CREATE INDEX ix_transactions_account_date_id ON dbo.transactions (account_id, [date], id);
+END;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'ix_transactions_from_account_date_id' AND object_id = OBJECT_ID(N'dbo.transactions'))
+BEGIN
+    CREATE INDEX ix_transactions_from_account_date_id ON dbo.transactions (from_account_id, [date], id);
+END;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'ix_transactions_to_account_date_id' AND object_id = OBJECT_ID(N'dbo.transactions'))
+BEGIN
+    CREATE INDEX ix_transactions_to_account_date_id ON dbo.transactions (to_account_id, [date], id);
+END;
+GO
+
+-- Append-only ledger: one row per balance leg; accounts.balance is the materialized sum
+IF OBJECT_ID(N'dbo.ledger_entries', N'U') IS NULL
+BEGIN
+    CREATE TABLE dbo.ledger_entries (
+        id BIGINT IDENTITY(1,1) NOT NULL CONSTRAINT PK_ledger_entries PRIMARY KEY,
+        account_id NVARCHAR(64) NOT NULL CONSTRAINT FK_ledger_entries_account REFERENCES dbo.accounts(id),
+        user_id NVARCHAR(64) NOT NULL CONSTRAINT FK_ledger_entries_user REFERENCES dbo.users(id),
+        transaction_id NVARCHAR(64) NULL,
+        kind NVARCHAR(20) NOT NULL,
+        amount DECIMAL(12,2) NOT NULL,
+        effective_date DATETIME2 NOT NULL,
+        posted_at DATETIME2 NOT NULL CONSTRAINT DF_ledger_entries_posted_at DEFAULT (SYSUTCDATETIME())
+    );
+    CREATE INDEX ix_ledger_entries_account_id_id ON dbo.ledger_entries (account_id, id);
+END;
+GO
+
+-- Opening entry lookup (ledger._backdate_openings)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'ix_ledger_entries_account_kind' AND object_id = OBJECT_ID(N'dbo.ledger_entries'))
+BEGIN
+    CREATE INDEX ix_ledger_entries_account_kind ON dbo.ledger_entries (account_id, kind);
+END;
+GO
+
+-- Token epoch: bumping it revokes every token issued earlier
+IF COL_LENGTH('dbo.users','token_version') IS NULL
+BEGIN
+    ALTER TABLE dbo.users ADD token_version INT NOT NULL CONSTRAINT DF_users_token_version DEFAULT (0);
+END;
+GO
+
+-- Per-user account lookups (dashboard aggregates, active/closed lists)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'ix_accounts_user_status' AND object_id = OBJECT_ID(N'dbo.accounts'))
+BEGIN
+    CREATE INDEX ix_accounts_user_status ON dbo.accounts (user_id, status);
+END;
+GO
+
+-- Per-account daily/monthly rollups maintained alongside ledger_entries
+IF OBJECT_ID(N'dbo.account_rollups', N'U') IS NULL
+BEGIN
+    CREATE TABLE dbo.account_rollups (
+        account_id NVARCHAR(64) NOT NULL CONSTRAINT FK_account_rollups_account REFERENCES dbo.accounts(id),
+        period NVARCHAR(10) NOT NULL,
+        period_start DATE NOT NULL,
+        user_id NVARCHAR(64) NOT NULL CONSTRAINT FK_account_rollups_user REFERENCES dbo.users(id),
+        deposits DECIMAL(14,2) NOT NULL CONSTRAINT DF_account_rollups_deposits DEFAULT (0),
+        withdrawals DECIMAL(14,2) NOT NULL CONSTRAINT DF_account_rollups_withdrawals DEFAULT (0),
+        transfers_in DECIMAL(14,2) NOT NULL CONSTRAINT DF_account_rollups_transfers_in DEFAULT (0),
+        transfers_out DECIMAL(14,2) NOT NULL CONSTRAINT DF_account_rollups_transfers_out DEFAULT (0),
+        adjustments DECIMAL(14,2) NOT NULL CONSTRAINT DF_account_rollups_adjustments DEFAULT (0),
+        closing_balance DECIMAL(14,2) NOT NULL CONSTRAINT DF_account_rollups_closing_balance DEFAULT (0),
+        CONSTRAINT PK_account_rollups PRIMARY KEY (account_id, period, period_start)
+    );
+    CREATE INDEX ix_account_rollups_user_period_start ON dbo.account_rollups (user_id, period, period_start);
+END;
+GO
+
+-- Per-user change counter behind ETag / If-None-Match on the list endpoints
+IF COL_LENGTH('dbo.users','data_version') IS NULL
+BEGIN
+    ALTER TABLE dbo.users ADD data_version INT NOT NULL CONSTRAINT DF_users_data_version DEFAULT (0);
+    ALTER TABLE dbo.users ADD data_modified_at DATETIME2 NULL;
+END;
+GO
+
+-- Delta sync: per-row write versions and tombstones for deletes
+IF COL_LENGTH('dbo.accounts','version') IS NULL
+BEGIN
+    ALTER TABLE dbo.accounts ADD version INT NOT NULL CONSTRAINT DF_accounts_version DEFAULT (0);
+END;
+GO
+
+IF COL_LENGTH('dbo.transactions','version') IS NULL
+BEGIN
+    ALTER TABLE dbo.transactions ADD version INT NOT NULL CONSTRAINT DF_transactions_version DEFAULT (0);
+END;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'ix_accounts_user_version' AND object_id = OBJECT_ID(N'dbo.accounts'))
+BEGIN
+    CREATE INDEX ix_accounts_user_version ON dbo.accounts (user_id, version);
+END;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'ix_transactions_user_version_id' AND object_id = OBJECT_ID(N'dbo.transactions'))
+BEGIN
+    CREATE INDEX ix_transactions_user_version_id ON dbo.transactions (user_id, version, id);
+END;
+GO
+
+IF OBJECT_ID(N'dbo.tombstones', N'U') IS NULL
+BEGIN
+    CREATE TABLE dbo.tombstones (
+        id BIGINT IDENTITY(1,1) NOT NULL CONSTRAINT PK_tombstones PRIMARY KEY,
+        user_id NVARCHAR(64) NOT NULL CONSTRAINT FK_tombstones_user REFERENCES dbo.users(id),
+        entity NVARCHAR(20) NOT NULL,
+        entity_id NVARCHAR(64) NOT NULL,
+        version INT NOT NULL,
+        deleted_at DATETIME2 NOT NULL CONSTRAINT DF_tombstones_deleted_at DEFAULT (SYSUTCDATETIME())
+    );
+    CREATE INDEX ix_tombstones_user_version ON dbo.tombstones (user_id, version);
+END;
+GO
+
+-- Recurring transactions, posted by the in-process scheduler
+IF OBJECT_ID(N'dbo.recurring_rules', N'U') IS NULL
+BEGIN
+    CREATE TABLE dbo.recurring_rules (
+        id NVARCHAR(64) NOT NULL CONSTRAINT PK_recurring_rules PRIMARY KEY,
+        user_id NVARCHAR(64) NOT NULL CONSTRAINT FK_recurring_rules_user REFERENCES dbo.users(id),
+        [type] NVARCHAR(20) NOT NULL CONSTRAINT CK_recurring_rules_type CHECK ([type] IN ('deposit','withdrawal','transfer')),
+        amount DECIMAL(12,2) NOT NULL,
+        [description] NVARCHAR(500) NOT NULL,
+        account_id NVARCHAR(64) NULL CONSTRAINT FK_recurring_rules_account REFERENCES dbo.accounts(id),
+        from_account_id NVARCHAR(64) NULL CONSTRAINT FK_recurring_rules_from_account REFERENCES dbo.accounts(id),
+        to_account_id NVARCHAR(64) NULL CONSTRAINT FK_recurring_rules_to_account REFERENCES dbo.accounts(id),
+        cadence NVARCHAR(10) NOT NULL,
+        start_date DATETIME2 NOT NULL,
+        end_date DATETIME2 NULL,
+        runs INT NOT NULL CONSTRAINT DF_recurring_rules_runs DEFAULT (0),
+        next_run DATETIME2 NULL,
+        status NVARCHAR(20) NOT NULL CONSTRAINT DF_recurring_rules_status DEFAULT ('active'),
+        paused_reason NVARCHAR(255) NULL
+    );
+    CREATE INDEX ix_recurring_rules_status_next_run ON dbo.recurring_rules (status, next_run);
+    CREATE INDEX ix_recurring_rules_user_id ON dbo.recurring_rules (user_id);
+END;
+GO
+
+-- Background jobs (bulk account close/restore/delete)
+IF OBJECT_ID(N'dbo.jobs', N'U') IS NULL
+BEGIN
+    CREATE TABLE dbo.jobs (
+        id NVARCHAR(64) NOT NULL CONSTRAINT PK_jobs PRIMARY KEY,
+        user_id NVARCHAR(64) NOT NULL CONSTRAINT FK_jobs_user REFERENCES dbo.users(id),
+        kind NVARCHAR(32) NOT NULL,
+        params NVARCHAR(MAX) NOT NULL,
+        status NVARCHAR(20) NOT NULL CONSTRAINT DF_jobs_status DEFAULT ('queued'),
+        total INT NOT NULL CONSTRAINT DF_jobs_total DEFAULT (0),
+        done INT NOT NULL CONSTRAINT DF_jobs_done DEFAULT (0),
+        [rows] INT NOT NULL CONSTRAINT DF_jobs_rows DEFAULT (0),
+        error NVARCHAR(500) NULL,
+        created_at DATETIME2 NOT NULL CONSTRAINT DF_jobs_created_at DEFAULT (SYSUTCDATETIME()),
+        started_at DATETIME2 NULL,
+        updated_at DATETIME2 NOT NULL CONSTRAINT DF_jobs_updated_at DEFAULT (SYSUTCDATETIME()),
+        finished_at DATETIME2 NULL
+    );
+    CREATE INDEX ix_jobs_status_updated_at ON dbo.jobs (status, updated_at);
+    CREATE INDEX ix_jobs_user_created_at ON dbo.jobs (user_id, created_at);
+END;
+GO
@@ -0,0 +1,61 @@
+"""Shared fixtures: an app on a throwaway SQLite database, and a statement counter.
+
+Settings and the database URL are read when the app's lifespan starts, so they
+are pointed at a temporary directory before `app.main` is imported.
+"""
+import contextlib
+import os
+import pathlib
+import tempfile
+
+import pytest
+from sqlalchemy import event
+
+_tmp = pathlib.Path(tempfile.mkdtemp(prefix="money-saver-tests-"))
+(_tmp / "settings.yaml").write_text(
+    "recurring:\n  enabled: false\n"
+    "cache:\n  enabled: false\n"   # every request must reach the database to be counted
+)
+os.environ["MONEY_SAVER_SETTINGS"] = str(_tmp / "settings.yaml")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp / 'test.db'}"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import database  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def headers(client):
+    user = dict(first_name="Test", last_name="User", email="test@example.com", password="pw")
+    client.post("/auth/register", json=user)
+    token = client.post("/auth/login", data=dict(username=user["email"], password=user["password"])).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    client.get("/auth/me", headers=headers)  # warm the user cache, as on any later request
+    return headers
+
+
+@pytest.fixture
+def count_queries():
+    """Context manager yielding a list that collects every statement sent to the database."""
+    @contextlib.contextmanager
+    def counting():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = database.init()
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+    return counting
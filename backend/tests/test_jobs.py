@@ -0,0 +1,66 @@
+"""Background account jobs: recovery of orphaned jobs."""
+from datetime import datetime, timedelta
+import itertools, time
+
+from sqlalchemy import select, update
+
+from app import database, jobs, models
+
+_ids = itertools.count()
+
+
+def _wait(job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with database.SessionLocal() as db:
+            status = db.scalar(select(models.Job.status).where(models.Job.id == job_id))
+        if status in ("succeeded", "failed"):
+            return status
+        time.sleep(0.05)
+    return status
+
+
+def _orphaned_delete(client, headers, silent_for):
+    """A delete job left `running` by a worker that died `silent_for` ago."""
+    account_id = f"jobs-acct-{next(_ids)}"
+    client.post("/accounts/", json=dict(id=account_id, name=account_id, type="Checking", balance=0), headers=headers)
+    with database.SessionLocal() as db:
+        user_id = db.scalar(select(models.Account.user_id).where(models.Account.id == account_id))
+        job = jobs.create(db, user_id, "delete_accounts", [account_id])
+        job.status = "running"
+        db.commit()
+        db.execute(update(models.Job).where(models.Job.id == job.id).values(updated_at=datetime.utcnow() - silent_for))
+        db.commit()
+        return job.id, account_id
+
+
+def test_sweep_picks_up_a_job_orphaned_after_startup(client, headers):
+    job_id, account_id = _orphaned_delete(client, headers, timedelta(seconds=jobs.settings()["stale_seconds"] + 1))
+    assert jobs.sweep() == 1
+    assert _wait(job_id) == "succeeded"
+    assert client.get(f"/accounts/{account_id}", headers=headers).status_code == 404
+
+
+def test_sweep_leaves_recent_and_own_jobs_alone(client, headers):
+    job_id, _ = _orphaned_delete(client, headers, timedelta(seconds=1))
+    assert jobs.sweep() == 0
+    stale_id, _ = _orphaned_delete(client, headers, timedelta(days=1))
+    jobs._submitted.add(stale_id)  # still being worked on by this process
+    try:
+        assert jobs.sweep() == 0
+    finally:
+        jobs._submitted.discard(stale_id)
+    with database.SessionLocal() as db:
+        statuses = db.scalars(select(models.Job.status).where(models.Job.id.in_([job_id, stale_id]))).all()
+    assert statuses == ["running", "running"]
+
+
+def test_restore_job_clears_the_closing_reason(client, headers):
+    account_id = f"jobs-acct-{next(_ids)}"
+    client.post("/accounts/", json=dict(id=account_id, name=account_id, type="Checking", balance=0), headers=headers)
+    for kind in ("close_accounts", "restore_accounts"):
+        response = client.post("/jobs/", json=dict(kind=kind, account_ids=[account_id], reason="moved banks"), headers=headers)
+        assert response.status_code == 202
+        assert _wait(response.json()["id"]) == "succeeded"
+    account = client.get(f"/accounts/{account_id}", headers=headers).json()
+    assert (account["status"], account["closed_reason"]) == ("active", None)
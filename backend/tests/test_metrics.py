@@ -0,0 +1,27 @@
+"""Telemetry endpoints stay valid JSON whatever has been observed."""
+from app import database, instrumentation, metrics
+
+
+def test_overflow_quantiles_are_reported_as_inf_string():
+    histogram = metrics.Histogram()
+    histogram.observe(12.0)  # past the top 10s bucket
+    snapshot = histogram.snapshot()
+    assert snapshot["p50"] == snapshot["p99"] == "+Inf"
+    assert snapshot["buckets"]["+Inf"] == 1
+
+
+def test_pool_wait_above_top_bucket_keeps_endpoints_up(client, headers):
+    database.init()
+    database.pool_stats["sync"].wait.observe(12.0)
+    for path in ("/metrics", "/health/db"):
+        response = client.get(path, headers=headers)
+        assert response.status_code == 200, path
+    assert response.json()["pools"]["sync"]["wait_seconds"]["p99"] == "+Inf"
+
+
+def test_slow_request_keeps_metrics_up(client, headers):
+    # A bulk import can run for well past the top bucket
+    instrumentation._route_metrics("POST /transactions/bulk").observe({"handler": 18.0, "total": 18.5}, 40)
+    response = client.get("/metrics", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["routes"]["POST /transactions/bulk"]["total_seconds"]["p50"] == "+Inf"
@@ -0,0 +1,129 @@
+"""Round trips of the transaction write and list paths.
+
+Each test pins the statements a request sends, so a pre-check, a per-account
+reload or a refresh creeping back in fails here. Rollup maintenance is
+counted separately: it is per leg and bounded, not part of the handler.
+"""
+import itertools
+
+import pytest
+
+_ids = itertools.count()
+
+
+def _split(statements):
+    """(handler statements as 'VERB table', number of rollup statements)."""
+    handler, rollups = [], 0
+    for statement in statements:
+        if "account_rollups" in statement:
+            rollups += 1
+            continue
+        words = statement.split()
+        verb = words[0]
+        table = {"SELECT": None, "UPDATE": words[1], "DELETE": words[2], "INSERT": words[2]}[verb]
+        if table is None:
+            table = words[words.index("FROM") + 1] if "FROM" in words else ""
+        handler.append(f"{verb} {table}")
+    return handler, rollups
+
+
+@pytest.fixture
+def accounts(client, headers):
+    """Two fresh accounts, so rollup buckets and balances start empty for every test."""
+    ids = [f"qc-acct-{next(_ids)}" for _ in range(2)]
+    for account_id in ids:
+        client.post("/accounts/", json=dict(id=account_id, name=account_id, type="Checking", balance=0), headers=headers)
+    return ids
+
+
+def _deposit(client, headers, account_id, tx_id=None):
+    tx_id = tx_id or f"qc-tx-{next(_ids)}"
+    return client.post("/transactions/", json=dict(
+        id=tx_id, type="deposit", amount=5, description="qc", account_id=account_id,
+    ), headers=headers)
+
+
+def test_create_deposit(client, headers, count_queries, accounts):
+    with count_queries() as statements:
+        response = _deposit(client, headers, accounts[0])
+    assert response.status_code == 201
+    handler, rollups = _split(statements)
+    # One ownership-checked account fetch, no existence pre-check, no refresh;
+    # the ledger looks up the opening entry in case the deposit is backdated
+    assert handler == [
+        "SELECT accounts",
+        "UPDATE users",
+        "INSERT transactions",
+        "INSERT ledger_entries",
+        "UPDATE accounts",
+        "SELECT ledger_entries",
+    ]
+    assert rollups <= 8
+
+
+def test_create_transfer_fetches_both_accounts_at_once(client, headers, count_queries, accounts):
+    with count_queries() as statements:
+        response = client.post("/transactions/", json=dict(
+            id=f"qc-tx-{next(_ids)}", type="transfer", amount=5, description="qc",
+            from_account_id=accounts[0], to_account_id=accounts[1],
+        ), headers=headers)
+    assert response.status_code == 201
+    handler, rollups = _split(statements)
+    assert handler == [
+        "SELECT accounts",
+        "UPDATE users",
+        "INSERT transactions",
+        "INSERT ledger_entries",
+        "UPDATE accounts",
+        "UPDATE accounts",
+        "SELECT ledger_entries",
+    ]
+    assert rollups <= 16
+
+
+def test_create_conflict_is_caught_on_insert(client, headers, count_queries, accounts):
+    _deposit(client, headers, accounts[0], "qc-dup")
+    with count_queries() as statements:
+        response = _deposit(client, headers, accounts[0], "qc-dup")
+    assert response.status_code == 409
+    assert _split(statements) == (["SELECT accounts", "UPDATE users", "INSERT transactions"], 0)
+
+
+def test_delete(client, headers, count_queries, accounts):
+    tx_id = _deposit(client, headers, accounts[0]).json()["id"]
+    with count_queries() as statements:
+        response = client.delete(f"/transactions/{tx_id}", headers=headers)
+    assert response.status_code == 204
+    handler, rollups = _split(statements)
+    # DELETE ... RETURNING replaces the lookup; one balance UPDATE and one
+    # last_tx_date UPDATE for the account, and a single commit
+    assert handler == [
+        "DELETE transactions",
+        "UPDATE users",
+        "INSERT tombstones",
+        "INSERT ledger_entries",
+        "UPDATE accounts",
+        "UPDATE accounts",
+    ]
+    assert rollups <= 8
+
+
+def test_delete_missing_costs_one_lookup(client, headers, count_queries):
+    with count_queries() as statements:
+        response = client.delete("/transactions/qc-missing", headers=headers)
+    assert response.status_code == 404
+    assert _split(statements) == (["DELETE transactions", "SELECT transactions"], 0)
+
+
+@pytest.mark.parametrize("listing", ["all", "type", "account"])
+def test_list_is_one_query_plus_version(client, headers, count_queries, accounts, listing):
+    for _ in range(3):
+        _deposit(client, headers, accounts[0])
+    params = {"all": {}, "type": {"type": "deposit"}, "account": {"account_id": accounts[0]}}[listing]
+    with count_queries() as statements:
+        response = client.get("/transactions/", params={**params, "limit": 2}, headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 2
+    # The ETag's data version, then a single keyset page
+    assert len(statements) == 2
+    assert "data_version" in statements[0]
@@ -0,0 +1,51 @@
+"""The account response cache never serves a state older than the last committed write."""
+import itertools
+
+import pytest
+from sqlalchemy import event, select, update
+
+from app import cache, database, models, response_cache, versions
+
+_ids = itertools.count()
+
+
+@pytest.fixture
+def cached(monkeypatch):
+    """The memory backend for one test (the suite otherwise runs with the cache off)."""
+    backend = cache.SizedLRU()
+    monkeypatch.setattr(response_cache, "backend", lambda: backend)
+    return backend
+
+
+def test_write_between_version_read_and_cache_fill_is_seen_next(client, headers, cached):
+    account_id = f"rc-acct-{next(_ids)}"
+    client.post("/accounts/", json=dict(id=account_id, name="before", type="Checking", balance=0), headers=headers)
+    client.get("/accounts/", headers=headers)
+
+    def rename(db):
+        user_id = db.scalar(select(models.Account.user_id).where(models.Account.id == account_id))
+        versions.touch(db, user_id, accounts=[account_id])
+        db.execute(update(models.Account).where(models.Account.id == account_id).values(name="after"))
+        db.commit()
+
+    written = []
+
+    def write_after_version_read(conn, cursor, statement, parameters, context, executemany):
+        # Another request's write commits right after this reader loaded the version
+        if "data_version" in statement and statement.lstrip().startswith("SELECT") and not written:
+            written.append(True)
+            with database.SessionLocal() as db:
+                rename(db)
+
+    engine = database.init()
+    event.listen(engine, "after_cursor_execute", write_after_version_read)
+    try:
+        racing = client.get("/accounts/", headers=headers)
+    finally:
+        event.remove(engine, "after_cursor_execute", write_after_version_read)
+    assert written and racing.status_code == 200
+
+    fresh = client.get("/accounts/", headers=headers)
+    assert fresh.headers["etag"] != racing.headers["etag"]
+    assert {a["id"]: a["name"] for a in fresh.json()}[account_id] == "after"
+    assert client.get("/accounts/", headers={**headers, "If-None-Match": racing.headers["etag"]}).status_code == 200
@@ -68,8 +68,9 @@ export async function restoreAccount(id: string): Promise<Account> {
     return request<Account>(`/accounts/${id}/restore`, { method: 'PATCH' });
 }
 
-export async function deleteAccount(id: string): Promise<void> {
-	await request<void>(`/accounts/${id}`, { method: 'DELETE' });
+// Large accounts are deleted by a background job, returned for polling
+export async function deleteAccount(id: string): Promise<Job | undefined> {
+	return request<Job | undefined>(`/accounts/${id}`, { method: 'DELETE' });
 }
 
 // Transactions
@@ -84,8 +85,204 @@ export type Transaction = {
 	to_account_id?: string;
 };
 
-export async function fetchTransactions(): Promise<Transaction[]> {
-	return request<Transaction[]>('/transactions/');
+export type TransactionPage = {
+	items: Transaction[];
+	next_cursor: string | null;
+};
+
+export type TransactionQuery = {
+	limit?: number;
+	cursor?: string;
+	account_id?: string;
+	type?: Transaction['type'];
+	start?: string;
+	end?: string;
+};
+
+function toQueryString(params: Record<string, string | number | undefined>): string {
+	const qs = new URLSearchParams();
+	for (const [k, v] of Object.entries(params)) {
+		if (v !== undefined && v !== null && v !== '') qs.set(k, String(v));
+	}
+	const s = qs.toString();
+	return s ? `?${s}` : '';
+}
+
+export async function fetchTransactions(query: TransactionQuery = {}): Promise<TransactionPage> {
+	return request<TransactionPage>(`/transactions/${toQueryString(query)}`);
+}
+
+export async function fetchAccountTransactions(
+	accountId: string,
+	query: { limit?: number; cursor?: string } = {}
+): Promise<TransactionPage> {
+	return request<TransactionPage>(`/accounts/${accountId}/transactions${toQueryString(query)}`);
+}
+
+export type TransactionSearch = TransactionPage & { mode: 'words' | 'fuzzy' | 'like' };
+
+export async function searchTransactions(
+	q: string,
+	query: { limit?: number; cursor?: string } = {}
+): Promise<TransactionSearch> {
+	return request<TransactionSearch>(`/transactions/search${toQueryString({ q, ...query })}`);
+}
+
+// Dashboard
+export type StashTotal = { stash_type: string; total: number; accounts: number };
+
+export type GoalProgress = {
+	account_id: string;
+	name: string;
+	balance: number;
+	goal_amount: number;
+	goal_date: string;
+	goal_frequency?: 'daily' | 'weekly' | 'monthly';
+	progress: number;
+	remaining: number;
+	per_period: number;
+	catch_up: number;
+	on_track: boolean;
+};
+
+export type MonthlyFlow = { month: string; inflow: number; outflow: number };
+
+export type DashboardSummary = {
+	net_worth: number;
+	stash_totals: StashTotal[];
+	goals: GoalProgress[];
+	recent: Transaction[];
+	monthly: MonthlyFlow[];
+};
+
+export async function fetchDashboardSummary(query: { recent?: number; months?: number } = {}): Promise<DashboardSummary> {
+	return request<DashboardSummary>(`/dashboard/summary${toQueryString(query)}`);
+}
+
+// Reports
+export type TimeseriesPoint = {
+	period_start: string;
+	deposits: number;
+	withdrawals: number;
+	transfers_in: number;
+	transfers_out: number;
+	adjustments: number;
+	net: number;
+	balance: number;
+};
+
+export type Timeseries = {
+	granularity: 'day' | 'month';
+	start: string;
+	end: string;
+	points: TimeseriesPoint[];
+};
+
+export async function fetchTimeseries(
+	query: { granularity?: 'day' | 'month'; start?: string; end?: string; account_id?: string } = {}
+): Promise<Timeseries> {
+	return request<Timeseries>(`/reports/timeseries${toQueryString(query)}`);
+}
+
+// Goal projections (server-side, all goals in one call)
+export type GoalProjection = {
+	account_id: string;
+	name: string;
+	balance: number;
+	goal_amount: number;
+	goal_date: string;
+	goal_frequency?: 'daily' | 'weekly' | 'monthly' | null;
+	remaining: number;
+	periods_left: number;
+	required_per_period: number;
+	trailing_per_period: number;
+	projected_date: string | null;
+	on_track: boolean;
+};
+
+export type GoalProjections = { as_of: string; window_days: number; goals: GoalProjection[] };
+
+export async function fetchGoalProjections(windowDays?: number): Promise<GoalProjections> {
+	return request<GoalProjections>(`/goals/projections${toQueryString({ window_days: windowDays })}`);
+}
+
+// Recurring transactions
+export type RecurringRule = {
+	id: string;
+	type: Transaction['type'];
+	amount: number;
+	description: string;
+	account_id?: string | null;
+	from_account_id?: string | null;
+	to_account_id?: string | null;
+	cadence: 'daily' | 'weekly' | 'monthly';
+	start_date?: string;
+	end_date?: string | null;
+	runs?: number;
+	next_run?: string | null;
+	status?: 'active' | 'paused' | 'finished';
+	paused_reason?: string | null;
+};
+
+export async function fetchRecurringRules(): Promise<RecurringRule[]> {
+	return request<RecurringRule[]>('/recurring/');
+}
+
+export async function createRecurringRule(rule: RecurringRule): Promise<RecurringRule> {
+	return request<RecurringRule>('/recurring/', { method: 'POST', body: JSON.stringify(rule) });
+}
+
+export async function updateRecurringRule(
+	id: string,
+	changes: Partial<Pick<RecurringRule, 'amount' | 'description' | 'end_date'>> & { status?: 'active' | 'paused' }
+): Promise<RecurringRule> {
+	return request<RecurringRule>(`/recurring/${id}`, { method: 'PATCH', body: JSON.stringify(changes) });
+}
+
+export async function deleteRecurringRule(id: string): Promise<void> {
+	await request<void>(`/recurring/${id}`, { method: 'DELETE' });
+}
+
+// Background jobs
+export type Job = {
+	id: string;
+	kind: 'close_accounts' | 'restore_accounts' | 'delete_accounts';
+	status: 'queued' | 'running' | 'succeeded' | 'failed';
+	total: number;
+	done: number;
+	rows: number;
+	error?: string | null;
+	created_at: string;
+	started_at?: string | null;
+	finished_at?: string | null;
+};
+
+export async function startAccountJob(
+	kind: Job['kind'],
+	accountIds: string[],
+	reason?: string
+): Promise<Job> {
+	return request<Job>('/jobs/', {
+		method: 'POST',
+		body: JSON.stringify({ kind, account_ids: accountIds, reason })
+	});
+}
+
+export async function fetchJob(id: string): Promise<Job> {
+	return request<Job>(`/jobs/${id}`);
+}
+
+// Delta sync
+export type SyncChanges = {
+	accounts: any[];
+	transactions: Transaction[];
+	deleted: { accounts: string[]; transactions: string[] };
+	cursor: string;
+	has_more: boolean;
+};
+
+export async function fetchSync(since?: string): Promise<SyncChanges> {
+	return request<SyncChanges>(`/sync${toQueryString({ since })}`);
 }
 
 export async function createTransaction(tx: Transaction): Promise<Transaction> {
@@ -100,3 +297,27 @@ export async function deleteTransaction(id: string): Promise<void> {
 }
 
 
+
+// Batch: several ops in one request and one DB transaction
+export type BatchOp = {
+	op: 'create' | 'update' | 'delete' | 'close' | 'restore';
+	entity: 'account' | 'transaction';
+	id: string;
+	data?: Record<string, unknown>;
+};
+
+export type BatchResult = {
+	op: BatchOp['op'];
+	entity: BatchOp['entity'];
+	id: string;
+	account?: Account | null;
+	transaction?: Transaction | null;
+	job?: Job | null; // large account deletes continue in the background
+};
+
+export async function postBatch(ops: BatchOp[]): Promise<{ results: BatchResult[] }> {
+	return request<{ results: BatchResult[] }>('/batch', {
+		method: 'POST',
+		body: JSON.stringify({ ops })
+	});
+}
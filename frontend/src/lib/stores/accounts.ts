@@ -16,6 +16,23 @@ export type Account = {
 	lastTxDate?: string;
 };
 
+// Map API snake_case to store camelCase
+export function accountFromApi(a: any): Account {
+	return {
+		id: a.id,
+		name: a.name,
+		type: a.type,
+		balance: a.balance,
+		stashType: a.stash_type,
+		goalAmount: a.goal_amount,
+		goalDate: a.goal_date,
+		goalFrequency: a.goal_frequency,
+		lastTxDate: a.last_tx_date,
+		status: a.status,
+		closed_reason: a.closed_reason
+	};
+}
+
 export const accounts = writable<Account[]>([]);
 export const closedAccounts = writable<Account[]>([]);
 
@@ -23,21 +40,7 @@ export async function loadAccounts() {
 	if (!get(auth).token) return;
 	try {
 		const data = await fetchAccounts();
-		// Map API snake_case to store camelCase for goals
-		accounts.set(
-			data.map((a: any) => ({
-				id: a.id,
-				name: a.name,
-				type: a.type,
-				balance: a.balance,
-				stashType: a.stash_type,
-				goalAmount: a.goal_amount,
-				goalDate: a.goal_date,
-				goalFrequency: a.goal_frequency,
-				lastTxDate: a.last_tx_date,
-				status: a.status
-			}))
-		);
+		accounts.set(data.map(accountFromApi));
 	} catch (e) {
 		console.error('Failed to load accounts', e);
 	}
@@ -147,21 +150,7 @@ export async function loadClosedAccounts() {
     if (!get(auth).token) return;
     try {
         const data = await fetchClosedAccounts();
-        closedAccounts.set(
-            data.map((a: any) => ({
-                id: a.id,
-                name: a.name,
-                type: a.type,
-                balance: a.balance,
-                stashType: a.stash_type,
-                goalAmount: a.goal_amount,
-                goalDate: a.goal_date,
-                goalFrequency: a.goal_frequency,
-                lastTxDate: a.last_tx_date,
-                status: a.status,
-                closed_reason: a.closed_reason
-            }))
-        );
+        closedAccounts.set(data.map(accountFromApi));
     } catch (e) {
         console.error('Failed to load closed accounts', e);
     }
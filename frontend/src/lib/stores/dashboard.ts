@@ -0,0 +1,15 @@
+import { writable, get } from 'svelte/store';
+import { fetchDashboardSummary, type DashboardSummary } from '$lib/api';
+import { auth } from '$lib/stores/auth';
+
+// Server-computed totals, goal progress, recent activity and monthly cash flow
+export const dashboard = writable<DashboardSummary | null>(null);
+
+export async function loadDashboard() {
+  if (!get(auth).token) return;
+  try {
+    dashboard.set(await fetchDashboardSummary({ recent: 10, months: 12 }));
+  } catch (e) {
+    console.error('Failed to load dashboard', e);
+  }
+}
@@ -0,0 +1,68 @@
+import { get } from 'svelte/store';
+import { fetchSync, type SyncChanges } from '$lib/api';
+import { auth } from '$lib/stores/auth';
+import { accounts, closedAccounts, accountFromApi, type Account } from './accounts';
+import { transactions, fromApi } from './transactions';
+import { loadDashboard } from './dashboard';
+
+// Server-issued position in the user's change history; null until bootstrapped
+let cursor: string | null = null;
+
+function upsert<T extends { id: string }>(list: T[], items: T[]): T[] {
+  const byId = new Map(items.map((i) => [i.id, i]));
+  const kept = list.map((i) => byId.get(i.id) ?? i);
+  const known = new Set(list.map((i) => i.id));
+  return [...kept, ...items.filter((i) => !known.has(i.id))];
+}
+
+function apply(changes: SyncChanges) {
+  const goneAccounts = new Set(changes.deleted.accounts);
+  const goneTransactions = new Set(changes.deleted.transactions);
+  const changed: Account[] = changes.accounts.map(accountFromApi);
+  const active = changed.filter((a) => a.status === 'active');
+  const closed = changed.filter((a) => a.status === 'closed');
+  const changedIds = new Set(changed.map((a) => a.id));
+
+  // Keep each list's order; accounts that moved between active and closed switch lists,
+  // and accounts being deleted leave both
+  const place = (list: Account[], wanted: Account[]) => {
+    const wantedIds = new Set(wanted.map((a) => a.id));
+    return upsert(list.filter((a) => !goneAccounts.has(a.id) && (!changedIds.has(a.id) || wantedIds.has(a.id))), wanted);
+  };
+  accounts.update((list) => place(list, active));
+  closedAccounts.update((list) => place(list, closed));
+  transactions.update((list) => upsert(list.filter((t) => !goneTransactions.has(t.id)), changes.transactions.map(fromApi)));
+}
+
+// Full account lists plus the cursor that later syncs continue from
+export async function startSync() {
+  if (!get(auth).token) return;
+  try {
+    const res = await fetchSync();
+    const all = res.accounts.map(accountFromApi);
+    accounts.set(all.filter((a) => a.status === 'active'));
+    closedAccounts.set(all.filter((a) => a.status === 'closed'));
+    cursor = res.cursor;
+  } catch (e) {
+    console.error('Failed to start sync', e);
+  }
+}
+
+// Pull only what changed since the last sync
+export async function syncChanges() {
+  if (!get(auth).token) return;
+  if (!cursor) return startSync();
+  try {
+    let changed = false;
+    let res: SyncChanges;
+    do {
+      res = await fetchSync(cursor);
+      changed ||= res.accounts.length + res.transactions.length + res.deleted.accounts.length + res.deleted.transactions.length > 0;
+      apply(res);
+      cursor = res.cursor;
+    } while (res.has_more);
+    if (changed) loadDashboard();
+  } catch (e) {
+    console.error('Failed to sync', e);
+  }
+}
@@ -1,6 +1,6 @@
 import { writable } from 'svelte/store';
 import { accounts } from './accounts';
-import { createTransaction as apiCreateTx, deleteTransaction as apiDeleteTx, fetchTransactions } from '$lib/api';
+import { createTransaction as apiCreateTx, deleteTransaction as apiDeleteTx, fetchTransactions, fetchAccountTransactions } from '$lib/api';
 import { auth } from '$lib/stores/auth';
 import { get } from 'svelte/store';
 
@@ -18,28 +18,57 @@ export type Transaction = {
 };
 
 export const transactions = writable<Transaction[]>([]);
+// Cursor for the next (older) page; null once the full history is loaded
+export const transactionsCursor = writable<string | null>(null);
+// The dashboard paints from /dashboard/summary; full history pages load on demand
+export const transactionsLoaded = writable(false);
+
+const PAGE_SIZE = 100;
+
+export function fromApi(t: any): Transaction {
+  return {
+    id: t.id,
+    date: t.date || new Date().toISOString(),
+    type: t.type,
+    amount: t.amount,
+    description: t.description,
+    accountId: t.account_id,
+    fromAccountId: t.from_account_id,
+    toAccountId: t.to_account_id
+  };
+}
 
 export async function loadTransactions() {
   if (!get(auth).token) return;
   try {
-    const data = await fetchTransactions();
-    transactions.set(
-      data.map((t: any) => ({
-        id: t.id,
-        date: t.date || new Date().toISOString(),
-        type: t.type,
-        amount: t.amount,
-        description: t.description,
-        accountId: t.account_id,
-        fromAccountId: t.from_account_id,
-        toAccountId: t.to_account_id
-      }))
-    );
+    const page = await fetchTransactions({ limit: PAGE_SIZE });
+    transactions.set(page.items.map(fromApi));
+    transactionsCursor.set(page.next_cursor);
+    transactionsLoaded.set(true);
+  } catch (e) {
+    console.error('Failed to load transactions', e);
+  }
+}
+
+export async function loadMoreTransactions() {
+  if (!get(transactionsLoaded)) return loadTransactions();
+  const cursor = get(transactionsCursor);
+  if (!get(auth).token || !cursor) return;
+  try {
+    const page = await fetchTransactions({ limit: PAGE_SIZE, cursor });
+    transactions.update((list) => [...list, ...page.items.map(fromApi)]);
+    transactionsCursor.set(page.next_cursor);
   } catch (e) {
     console.error('Failed to load transactions', e);
   }
 }
 
+// One page of an account's history, fetched from the server-side per-account index
+export async function loadAccountTransactions(accountId: string, cursor?: string) {
+  const page = await fetchAccountTransactions(accountId, { limit: PAGE_SIZE, cursor });
+  return { items: page.items.map(fromApi), nextCursor: page.next_cursor };
+}
+
 function generateId(): string {
   // crypto.randomUUID is not available in all environments
   return typeof crypto !== 'undefined' && 'randomUUID' in crypto
@@ -51,25 +80,27 @@ export function addDeposit(args: { accountId: string; amount: number; descriptio
   const { accountId, amount, description } = args;
   const date = args.date ?? new Date().toISOString();
   const newTx = { id: generateId(), type: 'deposit' as const, account_id: accountId, amount, description, date };
-  void apiCreateTx(newTx as any).catch(console.error);
+  const saved = apiCreateTx(newTx as any).catch(console.error);
   transactions.update((list) => [...list, { id: newTx.id, type: 'deposit', accountId, amount, description, date }]);
   accounts.update((list) => list.map((a) => (a.id === accountId ? { ...a, balance: a.balance + amount } : a)));
+  return saved;
 }
 
 export function addWithdrawal(args: { accountId: string; amount: number; description: string; date?: string }) {
   const { accountId, amount, description } = args;
   const date = args.date ?? new Date().toISOString();
   const newTx = { id: generateId(), type: 'withdrawal' as const, account_id: accountId, amount, description, date };
-  void apiCreateTx(newTx as any).catch(console.error);
+  const saved = apiCreateTx(newTx as any).catch(console.error);
   transactions.update((list) => [...list, { id: newTx.id, type: 'withdrawal', accountId, amount, description, date }]);
   accounts.update((list) => list.map((a) => (a.id === accountId ? { ...a, balance: a.balance - amount } : a)));
+  return saved;
 }
 
 export function addTransfer(args: { fromAccountId: string; toAccountId: string; amount: number; description: string; date?: string }) {
   const { fromAccountId, toAccountId, amount, description } = args;
   const date = args.date ?? new Date().toISOString();
   const newTx = { id: generateId(), type: 'transfer' as const, from_account_id: fromAccountId, to_account_id: toAccountId, amount, description, date };
-  void apiCreateTx(newTx as any).catch(console.error);
+  const saved = apiCreateTx(newTx as any).catch(console.error);
   transactions.update((list) => [...list, { id: newTx.id, type: 'transfer', fromAccountId, toAccountId, amount, description, date }]);
   accounts.update((list) =>
     list.map((a) =>
@@ -80,6 +111,7 @@ export function addTransfer(args: { fromAccountId: string; toAccountId: string;
         : a
     )
   );
+  return saved;
 }
 
 function applyBalanceDeltaFor(tx: Transaction, sign: 1 | -1) {